@@ -4,23 +4,26 @@ Timesheet web application.
 - Timesheet: Mon–Sun week, track clock in/out, overtime and graveyard.
 - Export week to Excel.
 """
+import hashlib
+import hmac
+import io
 import logging
 import os
 import socket
-import smtplib
 from calendar import monthrange, month_name
 from datetime import date, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from io import BytesIO
+from time import monotonic, perf_counter
 
 import flask
 from werkzeug.security import check_password_hash, generate_password_hash
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 
 import config
 import database as db
+import export_jobs as jobs
+import notifications
+import profiling
+import timesheet_export as xlsx
+import timesheet_import
 import timesheet_logic as logic
 
 app = flask.Flask(__name__, static_folder="static", template_folder="templates")
@@ -29,128 +32,39 @@ app.config["BASE_DIR"] = config.BASE_DIR
 
 logger = logging.getLogger(__name__)
 
-DAY_NAMES = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
-
-
-def _get_timeoff_notify_emails():
-    """Return list of email addresses to receive time-off notifications. Only from Admin settings (no config default)."""
-    primary_raw = (db.get_setting("timeoff_notify_email") or "").strip()
-    emails = []
-    for part in primary_raw.replace(";", ",").split(","):
-        email = part.strip()
-        if email and "@" in email and email not in emails:
-            emails.append(email)
-    return emails
-
-
-def _send_timeoff_to_teams(employee_name, from_str, to_str, notes, cancelled=False):
-    """Post a time-off notification to Microsoft Teams via Incoming Webhook. No-op if webhook URL not set."""
-    import json
-    from urllib.request import Request, urlopen
-    from urllib.error import URLError, HTTPError
-
-    webhook_url = (db.get_setting("timeoff_teams_webhook_url") or "").strip()
-    if not webhook_url or not webhook_url.startswith("https://"):
-        if not webhook_url:
-            logger.info("Teams webhook skipped: no URL configured (save URL in Admin → Settings).")
-        else:
-            logger.warning("Teams webhook skipped: URL invalid or not https (length=%d).", len(webhook_url))
-        return
-    if cancelled:
-        title = "Time off request cancelled"
-        text = f"**{employee_name}** has cancelled their time-off request.\n\nType: {notes}\nFrom: {from_str} to {to_str}"
-    else:
-        title = "Time off request"
-        text = f"**{employee_name}** has submitted a time-off request.\n\nType: {notes}\nFrom: {from_str} to {to_str}"
-    # Simple text payload; Teams Incoming Webhook accepts {"text": "..."} for plain/markdown
-    payload = json.dumps({"text": f"### {title}\n\n{text}"}).encode("utf-8")
-    req = Request(webhook_url, data=payload, method="POST", headers={"Content-Type": "application/json"})
-    try:
-        with urlopen(req, timeout=10) as resp:
-            if 200 <= resp.status < 300:
-                logger.info("Time-off Teams notification sent for %s.", employee_name)
-    except (URLError, HTTPError, OSError) as e:
-        logger.warning("Time-off Teams webhook failed: %s", e)
-
-
-def _send_timeoff_notification(employee_name, from_str, to_str, notes):
-    """Send time-off notification: email (if SMTP and admin email configured) and always Teams webhook if configured."""
-    smtp_host = (getattr(config, "SMTP_HOST", None) or "").strip()
-    to_emails = _get_timeoff_notify_emails()
-    if to_emails and smtp_host:
-        subject = f"Time off request: {employee_name} — {notes} ({from_str} to {to_str})"
-        body = (
-            f"An employee has submitted a time-off request.\n\n"
-            f"Employee: {employee_name}\n"
-            f"Type: {notes}\n"
-            f"From: {from_str}\n"
-            f"To: {to_str}\n"
-        )
-        from_addr = (getattr(config, "SMTP_FROM", None) or "").strip() or (getattr(config, "SMTP_USER", None) or "")
-        if not from_addr:
-            from_addr = "timesheet@localhost"
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_addr
-        msg["To"] = ", ".join(to_emails)
-        msg.attach(MIMEText(body, "plain"))
-        try:
-            smtp_port = getattr(config, "SMTP_PORT", 587)
-            use_tls = getattr(config, "SMTP_USE_TLS", True)
-            smtp_user = (getattr(config, "SMTP_USER", None) or "").strip()
-            smtp_password = getattr(config, 'SMTP_PASSWORD', None) or ''
-            with smtplib.SMTP(smtp_host, smtp_port, timeout=15) as smtp:
-                if use_tls:
-                    smtp.starttls()
-                if smtp_user and smtp_password:
-                    smtp.login(smtp_user, smtp_password)
-                smtp.sendmail(from_addr, to_emails, msg.as_string())
-            logger.info("Time-off notification email sent to %s for %s.", to_emails, employee_name)
-        except Exception as e:
-            logger.exception("Time-off email failed: %s", e)
-    elif to_emails and not smtp_host:
-        logger.warning("Time-off email skipped: SMTP not configured. Configure SMTP to send to %s.", to_emails)
-    elif not to_emails:
-        logger.info("Time-off email skipped: no notification email in Admin settings.")
-    _send_timeoff_to_teams(employee_name, from_str, to_str, notes, cancelled=False)
-
-
-def _send_timeoff_cancelled_notification(employee_name, from_str, to_str, notes):
-    """Send cancel notification: email (if SMTP and admin email configured) and always Teams webhook if configured."""
-    smtp_host = (getattr(config, "SMTP_HOST", None) or "").strip()
-    to_emails = _get_timeoff_notify_emails()
-    if to_emails and smtp_host:
-        subject = f"Time off request cancelled: {employee_name} — {notes} ({from_str} to {to_str})"
-        body = (
-            f"An employee has cancelled their time-off request.\n\n"
-            f"Employee: {employee_name}\n"
-            f"Type: {notes}\n"
-            f"From: {from_str}\n"
-            f"To: {to_str}\n"
-        )
-        from_addr = (getattr(config, "SMTP_FROM", None) or "").strip() or (getattr(config, "SMTP_USER", None) or "")
-        if not from_addr:
-            from_addr = "timesheet@localhost"
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_addr
-        msg["To"] = ", ".join(to_emails)
-        msg.attach(MIMEText(body, "plain"))
-        try:
-            smtp_port = getattr(config, "SMTP_PORT", 587)
-            use_tls = getattr(config, "SMTP_USE_TLS", True)
-            smtp_user = (getattr(config, "SMTP_USER", None) or "").strip()
-            smtp_password = getattr(config, "SMTP_PASSWORD", None) or ""
-            with smtplib.SMTP(smtp_host, smtp_port, timeout=15) as smtp:
-                if use_tls:
-                    smtp.starttls()
-                if smtp_user and smtp_password:
-                    smtp.login(smtp_user, smtp_password)
-                smtp.sendmail(from_addr, to_emails, msg.as_string())
-            logger.info("Time-off cancelled notification sent to %s for %s.", to_emails, employee_name)
-        except Exception as e:
-            logger.exception("Time-off cancelled email failed: %s", e)
-    _send_timeoff_to_teams(employee_name, from_str, to_str, notes, cancelled=True)
+# Admin week exports by (week, shift mode), valid while the week's data version is unchanged.
+export_cache = xlsx.WorkbookCache(config.EXPORT_CACHE_MAX_BYTES)
+# Queued admin exports built off the request thread (see /admin/export-jobs).
+export_jobs = jobs.ExportJobs(config.EXPORT_JOB_WORKERS, config.EXPORT_JOB_TTL_SECONDS, config.EXPORT_JOB_MAX_PENDING,
+                              config.EXPORT_JOB_DIR or jobs.default_directory(config.DATABASE_PATH))
+# Sends queued time-off emails / Teams messages from notification_outbox in the background.
+notifier = notifications.OutboxDispatcher(
+    config.NOTIFY_POLL_SECONDS,
+    config.NOTIFY_MAX_ATTEMPTS,
+    config.NOTIFY_RETRY_BASE_SECONDS,
+    config.NOTIFY_RETRY_MAX_SECONDS,
+    config.NOTIFY_SMTP_IDLE_SECONDS,
+)
+# Per-endpoint wall time and SQL figures when TIMESHEET_PROFILE is on (see /admin/metrics).
+request_metrics = profiling.RequestMetrics(config.PROFILE_WINDOW, config.PROFILE_SLOW_SQL_MS)
+
+
+def create_app(start_notifier=True):
+    """
+    Prepare the app for serving and return it: create/migrate the database, make sure an admin account exists, check
+    the export job directory and start the notification sender. Safe to run in several worker processes at once (both
+    database steps take SQLite's write lock), so a WSGI server can start as many workers as there are cores: see wsgi.py.
+    """
+    db.init_db()
+    # Ensure at least one admin exists (recreate if accidentally deleted). Hashing is slow, so only when there is none.
+    if not db.has_admin() and db.ensure_admin("admin", generate_password_hash("admin"), "admin"):
+        print("Default admin created: full name=admin, password=admin (Administrator privileges). Change after first login.")
+    # Refuse to start on a job directory another account could write to (raises RuntimeError).
+    export_jobs.check_directory()
+    if start_notifier:
+        # Send notifications still queued from before a restart; each worker can run one (rows are leased).
+        notifier.wake()
+    return app
 
 
 def _format_time_12h(t):
@@ -177,14 +91,164 @@ def _format_time_12h(t):
         return t
 
 
+def _week_totals_summary(totals, exclude_timeoff=False):
+    """(attendance, overtime_total, total_hours) from an employee_week_totals row; zeros when the employee has no entries that week.
+    exclude_timeoff: drop Sick leave/PTO/Non Pay hours (contractors)."""
+    if not totals:
+        return 0, 0, 0
+    if exclude_timeoff:
+        total_reg = totals["worked_regular_hours"]
+        total_ot = totals["worked_overtime_hours"]
+        return min(total_reg, 40), total_ot, min(total_reg, 40) + total_ot
+    return totals["attendance"], totals["overtime_hours"], totals["total_hours"]
+
+
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _employee_week(employee_id, employee, week_start):
+    """
+    One employee's editable week: (days, attendance, overtime_total, total_hours). days are the 7 entries Mon–Sun (blank
+    where nothing is saved) after compute_weekly_overtime, with day_name. Contractors show no hours on time-off days.
+    """
+    by_date = {e["work_date"]: e for e in db.get_entries_for_week(employee_id, week_start)}
+    days = []
+    for i in range(7):
+        day_iso = (week_start + timedelta(days=i)).isoformat()
+        days.append(by_date.get(day_iso, {
+            "work_date": day_iso,
+            "clock_in": "", "clock_out": "", "lunch_start": "", "lunch_end": "",
+            "regular_hours": 0, "overtime_hours": 0, "is_graveyard": 0, "shift": None, "notes": "",
+        }))
+    # Apply weekly overtime and shift (day/swing/graveyard)
+    computed = logic.compute_weekly_overtime(days)
+    for e in computed:
+        e["day_name"] = DAY_NAMES[date.fromisoformat(e["work_date"]).weekday()]
+    # Contractor: do not show hours in Regular for time-off days (Sick leave, PTO, Non Pay)
+    if employee and (employee.get("employment_type") or "").strip().lower() == "contractor":
+        for d in computed:
+            if d.get("notes") in db.TIME_OFF_NOTES:
+                d["regular_hours"] = 0
+                d["overtime_hours"] = 0
+    total_regular = sum(d["regular_hours"] for d in computed)
+    total_overtime = sum(d["overtime_hours"] for d in computed)
+    attendance = min(total_regular, 40)
+    return computed, attendance, total_overtime, attendance + total_overtime
+
+
+def _week_roster(employees, dates_in_week, entries_by_employee, totals_by_employee):
+    """Roster rows ({employee, days, attendance, overtime_total, total_hours}) for employees over one week, from the
+    week's entries ({employee_id: [entries]}) and employee_week_totals rows ({employee_id: row})."""
+    roster = []
+    for emp in employees:
+        emp_entries = entries_by_employee.get(emp["id"], [])
+        by_date = {e["work_date"]: e for e in emp_entries}
+        emp_days = []
+        for d in dates_in_week:
+            day_iso = d.isoformat()
+            day_entry = by_date.get(day_iso, {
+                "work_date": day_iso,
+                "clock_in": "", "clock_out": "", "lunch_start": "", "lunch_end": "",
+                "regular_hours": 0, "overtime_hours": 0, "is_graveyard": 0, "shift": None, "notes": "",
+            })
+            emp_days.append(day_entry)
+        emp_computed = logic.compute_weekly_overtime(emp_days)
+        is_contractor = (emp.get("employment_type") or "").strip().lower() == "contractor"
+        if is_contractor:
+            for x in emp_computed:
+                if x.get("notes") in db.TIME_OFF_NOTES:
+                    x["regular_hours"] = 0
+                    x["overtime_hours"] = 0
+        attendance, overtime_total, total_hours = _week_totals_summary(
+            totals_by_employee.get(emp["id"]), exclude_timeoff=is_contractor
+        )
+        roster.append({
+            "employee": {"id": emp["id"], "full_name": emp["full_name"]},
+            "days": emp_computed,
+            "attendance": attendance,
+            "overtime_total": overtime_total,
+            "total_hours": total_hours,
+        })
+    return roster
+
+
+# Fields of a computed day returned by the JSON endpoints.
+DAY_JSON_FIELDS = ("work_date", "clock_in", "clock_out", "lunch_start", "lunch_end", "regular_hours", "overtime_hours",
+                   "shift", "is_graveyard", "notes")
+
+
+def _day_json(day):
+    return {k: day.get(k) for k in DAY_JSON_FIELDS}
+
+
+def _build_token():
+    """
+    Identifies the deployed code: size and mtime of the modules and templates that shape week responses. The same in
+    every worker of one deploy; different after a deploy changes any of them.
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(base, name) for name in ("app.py", "database.py", "timesheet_logic.py")]
+    template_dir = os.path.join(base, "templates")
+    if os.path.isdir(template_dir):
+        paths += sorted(os.path.join(template_dir, name) for name in os.listdir(template_dir))
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamp.append(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(stamp).encode("utf-8")).hexdigest()[:12]
+
+
+# Part of every week ETag, so clients revalidate bodies built by an older deploy even when the data is unchanged.
+BUILD_TOKEN = _build_token()
+
+
+def _week_etag(week_start, *parts):
+    """
+    ETag for a response built from one week's data: the build (BUILD_TOKEN), the week's data version (entries,
+    employees, rebuilds, time off) plus the viewer and whatever else selects the content (parts). Any write to the week
+    bumps the version.
+    """
+    version = db.get_range_data_version(week_start, week_start + timedelta(days=6), db.DATA_VERSION_TIMEOFF)
+    raw = "|".join(str(p) for p in (BUILD_TOKEN, week_start.isoformat(), version, flask.session.get("user_id"),
+                                    bool(flask.session.get("is_admin"))) + parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _not_modified(etag):
+    """A 304 response when the request's If-None-Match already has etag, else None."""
+    if flask.request.if_none_match.contains(etag):
+        return _conditional(flask.Response(status=304), etag)
+    return None
+
+
+def _conditional(response, etag):
+    """Tag response with etag; browsers must revalidate (private: per-user content)."""
+    response = flask.make_response(response)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _load_employee(employee_id):
+    """Employee dict by id, fetched at most once per request. The logged-in user is preloaded by login_required/admin_required."""
+    loaded = flask.g.setdefault("employees_by_id", {})
+    if employee_id not in loaded:
+        loaded[employee_id] = db.get_employee_by_id(employee_id)
+    return loaded[employee_id]
+
+
 def login_required(f):
     def wrapped(*args, **kwargs):
         if "user_id" not in flask.session:
             return flask.redirect(flask.url_for("login"))
-        user = db.get_employee_by_id(flask.session["user_id"])
+        user = _load_employee(flask.session["user_id"])
         if not user:
             flask.session.clear()
             return flask.redirect(flask.url_for("login"))
+        flask.g.user = user
         return f(*args, **kwargs)
     wrapped.__name__ = f.__name__
     return wrapped
@@ -194,17 +258,48 @@ def admin_required(f):
     def wrapped(*args, **kwargs):
         if "user_id" not in flask.session:
             return flask.redirect(flask.url_for("login"))
-        user = db.get_employee_by_id(flask.session["user_id"])
+        user = _load_employee(flask.session["user_id"])
         if not user:
             flask.session.clear()
             return flask.redirect(flask.url_for("login"))
         if not user.get("is_admin"):
             flask.abort(403)
+        flask.g.user = user
         return f(*args, **kwargs)
     wrapped.__name__ = f.__name__
     return wrapped
 
 
+if config.PROFILE_REQUESTS:
+    # Registered before the connection hooks: the checkout is part of the measured request, and this teardown runs
+    # after the connection is back in the pool (teardowns run in reverse order), so plan lookups are not counted.
+    @app.before_request
+    def _start_request_profile():
+        flask.g.profile_started = perf_counter()
+        db.profile_start()
+
+    @app.teardown_request
+    def _record_request_profile(exc):
+        statements = db.profile_stop()
+        started = flask.g.pop("profile_started", None)
+        if started is not None:
+            request_metrics.record(flask.request.endpoint or "(no route)", perf_counter() - started, statements)
+
+
+@app.before_request
+def _hold_db_connection():
+    """Check out one pooled SQLite connection for the whole request so every db helper reuses it."""
+    flask.g.db_conn_ctx = db._conn()
+    flask.g.db_conn_ctx.__enter__()
+
+
+@app.teardown_request
+def _release_db_connection(exc):
+    ctx = flask.g.pop("db_conn_ctx", None)
+    if ctx is not None:
+        ctx.__exit__(None, None, None)
+
+
 @app.context_processor
 def inject_can_request_timeoff():
     """Inject can_request_timeoff so nav can show 'Request time off' for all employees."""
@@ -265,7 +360,7 @@ def change_password():
         return flask.render_template("change_password.html", error="New password is required.")
     if new_password != confirm:
         return flask.render_template("change_password.html", error="New password and confirmation do not match.")
-    user = db.get_employee_by_id(flask.session["user_id"])
+    user = flask.g.user
     if not user or not check_password_hash(user["password_hash"], current):
         return flask.render_template("change_password.html", error="Current password is incorrect.")
     with db._conn() as conn:
@@ -277,7 +372,7 @@ def change_password():
 @login_required
 def change_name():
     """Allow employee or admin to change their login username only; full name cannot be changed here."""
-    user = db.get_employee_by_id(flask.session["user_id"])
+    user = flask.g.user
     if not user:
         return flask.redirect(flask.url_for("login"))
     if flask.request.method == "GET":
@@ -299,11 +394,16 @@ def timesheet():
     week_str = flask.request.args.get("week")
     if week_str:
         try:
-            week_start = date.fromisoformat(week_str)
+            week_start = db.get_week_start(date.fromisoformat(week_str))
         except ValueError:
             week_start = db.get_week_start(date.today())
     else:
         week_start = db.get_week_start(date.today())
+    # Unchanged week data, viewer and query string: answer If-None-Match with 304 before building anything.
+    etag = _week_etag(week_start, flask.request.full_path)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
     # Admin can filter by shift (?shift=day|swing|graveyard|combined) and view/edit any employee via ?employee_id=
     shift_filter = (flask.request.args.get("shift") or "").strip().lower()
     if shift_filter not in ("day", "swing", "graveyard", "combined"):
@@ -312,7 +412,7 @@ def timesheet():
     if flask.session.get("is_admin"):
         emp_id_param = flask.request.args.get("employee_id", type=int)
         if emp_id_param is not None:
-            target_user = db.get_employee_by_id(emp_id_param)
+            target_user = _load_employee(emp_id_param)
             if target_user:
                 target_id = emp_id_param
         elif shift_filter and shift_filter != "combined":
@@ -320,47 +420,12 @@ def timesheet():
             emp_in_shift = db.list_employees_for_shift(shift_filter)
             if emp_in_shift:
                 target_id = emp_in_shift[0]["id"]
-    entries = db.get_entries_for_week(target_id, week_start)
-    # Build 7 days (Mon–Sun) with or without entry
     week_end = week_start + timedelta(days=6)
-    by_date = {e["work_date"]: e for e in entries}
-    days = []
-    d = week_start
-    while d <= week_end:
-        day_entry = by_date.get(d.isoformat(), {
-            "work_date": d.isoformat(),
-            "clock_in": "",
-            "clock_out": "",
-            "lunch_start": "",
-            "lunch_end": "",
-            "regular_hours": 0,
-            "overtime_hours": 0,
-            "is_graveyard": 0,
-            "shift": None,
-            "notes": "",
-        })
-        days.append(day_entry)
-        d += timedelta(days=1)
-    # Apply weekly overtime and shift (day/swing/graveyard)
-    computed = logic.compute_weekly_overtime(days)
-    day_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    for e in computed:
-        d = date.fromisoformat(e["work_date"])
-        e["day_name"] = day_names[d.weekday()]
-    # Contractor: do not show hours in Regular for time-off days (Sick leave, PTO, Non Pay)
-    target_employee = db.get_employee_by_id(target_id)
-    if target_employee and (target_employee.get("employment_type") or "").strip().lower() == "contractor":
-        for d in computed:
-            if d.get("notes") in db.TIME_OFF_NOTES:
-                d["regular_hours"] = 0
-                d["overtime_hours"] = 0
+    day_names = DAY_NAMES
+    target_employee = _load_employee(target_id)
+    computed, attendance, overtime_total, total_hours = _employee_week(target_id, target_employee, week_start)
     prev_week = week_start - timedelta(days=7)
     next_week = week_start + timedelta(days=7)
-    total_regular = sum(d["regular_hours"] for d in computed)
-    total_overtime = sum(d["overtime_hours"] for d in computed)
-    attendance = min(total_regular, 40)
-    overtime_total = total_overtime
-    total_hours = attendance + overtime_total
     if flask.session.get("is_admin"):
         employees_for_picker = (
             db.list_employees_for_shift(shift_filter) if (shift_filter and shift_filter != "combined")
@@ -369,33 +434,8 @@ def timesheet():
         all_employees_for_admin = db.list_employees()  # So admin can open any employee's timesheet from roster views
         if shift_filter and shift_filter != "combined" and employees_for_picker and (not target_employee or (target_employee.get("shift") or "").strip().lower() != shift_filter):
             target_id = employees_for_picker[0]["id"]
-            target_employee = db.get_employee_by_id(target_id)
-            entries = db.get_entries_for_week(target_id, week_start)
-            by_date = {e["work_date"]: e for e in entries}
-            days = []
-            d = week_start
-            while d <= week_end:
-                day_entry = by_date.get(d.isoformat(), {
-                    "work_date": d.isoformat(),
-                    "clock_in": "", "clock_out": "", "lunch_start": "", "lunch_end": "",
-                    "regular_hours": 0, "overtime_hours": 0, "is_graveyard": 0, "shift": None, "notes": "",
-                })
-                days.append(day_entry)
-                d += timedelta(days=1)
-            computed = logic.compute_weekly_overtime(days)
-            for e in computed:
-                d = date.fromisoformat(e["work_date"])
-                e["day_name"] = day_names[d.weekday()]
-            if target_employee and (target_employee.get("employment_type") or "").strip().lower() == "contractor":
-                for d in computed:
-                    if d.get("notes") in db.TIME_OFF_NOTES:
-                        d["regular_hours"] = 0
-                        d["overtime_hours"] = 0
-            total_regular = sum(d["regular_hours"] for d in computed)
-            total_overtime = sum(d["overtime_hours"] for d in computed)
-            attendance = min(total_regular, 40)
-            overtime_total = total_overtime
-            total_hours = attendance + overtime_total
+            target_employee = _load_employee(target_id)
+            computed, attendance, overtime_total, total_hours = _employee_week(target_id, target_employee, week_start)
     else:
         employees_for_picker = []
         all_employees_for_admin = []
@@ -405,36 +445,15 @@ def timesheet():
     all_shifts_week = {}  # When admin and no shift: {"day": [...], "swing": [...], "graveyard": [...]}
     dates_in_week = [week_start + timedelta(days=i) for i in range(7)]
 
+    # One range query for the whole week; rosters below look employees up in these maps.
+    week_entries_by_employee = db.get_entries_for_week_by_employee(week_start) if flask.session.get("is_admin") else {}
+    week_totals_by_employee = db.get_week_totals(week_start) if flask.session.get("is_admin") else {}
+
+    def _build_roster(employees):
+        return _week_roster(employees, dates_in_week, week_entries_by_employee, week_totals_by_employee)
+
     def _build_shift_roster(shift_name):
-        roster = []
-        for emp in db.list_employees_for_shift(shift_name):
-            emp_entries = db.get_entries_for_week(emp["id"], week_start)
-            by_date = {e["work_date"]: e for e in emp_entries}
-            emp_days = []
-            for d in dates_in_week:
-                day_iso = d.isoformat()
-                day_entry = by_date.get(day_iso, {
-                    "work_date": day_iso,
-                    "clock_in": "", "clock_out": "", "lunch_start": "", "lunch_end": "",
-                    "regular_hours": 0, "overtime_hours": 0, "is_graveyard": 0, "shift": None, "notes": "",
-                })
-                emp_days.append(day_entry)
-            emp_computed = logic.compute_weekly_overtime(emp_days)
-            if (emp.get("employment_type") or "").strip().lower() == "contractor":
-                for x in emp_computed:
-                    if x.get("notes") in db.TIME_OFF_NOTES:
-                        x["regular_hours"] = 0
-                        x["overtime_hours"] = 0
-            total_reg = sum(x["regular_hours"] for x in emp_computed)
-            total_ot = sum(x["overtime_hours"] for x in emp_computed)
-            roster.append({
-                "employee": {"id": emp["id"], "full_name": emp["full_name"]},
-                "days": emp_computed,
-                "attendance": min(total_reg, 40),
-                "overtime_total": total_ot,
-                "total_hours": min(total_reg, 40) + total_ot,
-            })
-        return roster
+        return _build_roster(db.list_employees_for_shift(shift_name))
 
     if flask.session.get("is_admin") and shift_filter == "combined":
         # Combined view: separate each shift by section rows (no Shift column). All employees working or not.
@@ -442,36 +461,7 @@ def timesheet():
         shift_order = ("day", "swing", "graveyard", "unassigned")
         combined_employees_week_by_shift = {}
         for shift_key in shift_order:
-            roster = []
-            for emp in by_shift.get(shift_key, []):
-                if emp.get("is_admin"):
-                    continue
-                emp_entries = db.get_entries_for_week(emp["id"], week_start)
-                by_date = {e["work_date"]: e for e in emp_entries}
-                emp_days = []
-                for d in dates_in_week:
-                    day_iso = d.isoformat()
-                    day_entry = by_date.get(day_iso, {
-                        "work_date": day_iso,
-                        "clock_in": "", "clock_out": "", "lunch_start": "", "lunch_end": "",
-                        "regular_hours": 0, "overtime_hours": 0, "is_graveyard": 0, "shift": None, "notes": "",
-                    })
-                    emp_days.append(day_entry)
-                emp_computed = logic.compute_weekly_overtime(emp_days)
-                if (emp.get("employment_type") or "").strip().lower() == "contractor":
-                    for x in emp_computed:
-                        if x.get("notes") in db.TIME_OFF_NOTES:
-                            x["regular_hours"] = 0
-                            x["overtime_hours"] = 0
-                total_reg = sum(x["regular_hours"] for x in emp_computed)
-                total_ot = sum(x["overtime_hours"] for x in emp_computed)
-                roster.append({
-                    "employee": {"id": emp["id"], "full_name": emp["full_name"]},
-                    "days": emp_computed,
-                    "attendance": min(total_reg, 40),
-                    "overtime_total": total_ot,
-                    "total_hours": min(total_reg, 40) + total_ot,
-                })
+            roster = _build_roster([emp for emp in by_shift.get(shift_key, []) if not emp.get("is_admin")])
             roster.sort(key=lambda r: (r["employee"]["full_name"] or "").upper())
             combined_employees_week_by_shift[shift_key] = roster
     elif flask.session.get("is_admin") and shift_filter:
@@ -494,7 +484,7 @@ def timesheet():
         is_full_time = emp_type != "contractor"
     # Dates on which this employee has a disapproved time-off request: they cannot choose time-off status in Notes
     dates_timeoff_disapproved = db.get_disapproved_timeoff_dates(target_id, week_start, week_end)
-    return flask.render_template(
+    page = flask.render_template(
         "timesheet.html",
         week_start=week_start,
         week_end=week_end,
@@ -519,47 +509,19 @@ def timesheet():
         dates_in_week=dates_in_week,
         day_names=day_names,
     )
+    return _conditional(page, etag)
 
 
-@app.route("/timesheet/save", methods=["POST"])
-@login_required
-def timesheet_save():
-    data = flask.request.get_json() or {}
-    employee_id = flask.session["user_id"]
-    if flask.session.get("is_admin") and data.get("employee_id") is not None:
-        try:
-            tid = int(data.get("employee_id"))
-            target = db.get_employee_by_id(tid)
-            if target:
-                employee_id = tid
-        except (TypeError, ValueError):
-            pass
-    work_date = (data.get("work_date") or "").strip()
-    if not work_date:
-        return flask.jsonify({"ok": False, "error": "work_date required"}), 400
-    try:
-        date.fromisoformat(work_date)
-    except ValueError:
-        return flask.jsonify({"ok": False, "error": "Invalid date"}), 400
+def _time_entry_values(data, is_contractor):
+    """upsert_time_entry keyword values (clock/lunch times, notes, hours, shift) for one posted day; shared by the save endpoints."""
     clock_in = (data.get("clock_in") or "").strip() or None
     clock_out = (data.get("clock_out") or "").strip() or None
     lunch_start = (data.get("lunch_start") or "").strip() or None
     lunch_end = (data.get("lunch_end") or "").strip() or None
     notes = (data.get("notes") or "").strip() or None
-    # Block setting time-off status (PTO, Sick leave, Non Pay) on dates where the employee's time-off request was disapproved
-    if notes and notes in db.TIME_OFF_NOTES:
-        try:
-            work_d = date.fromisoformat(work_date)
-            disapproved_dates = db.get_disapproved_timeoff_dates(employee_id, work_d, work_d)
-            if work_date in disapproved_dates:
-                return flask.jsonify({"ok": False, "error": "Time-off request was disapproved for this date; you cannot use a time-off status here."}), 400
-        except ValueError:
-            pass
     day_total, _ = logic.day_hours(clock_in or "", clock_out or "", lunch_start, lunch_end)
     shift = logic.classify_shift(clock_in or "", clock_out or "") if (clock_in and clock_out) else None
     is_grav = 1 if shift == "graveyard" else 0
-    target_emp = db.get_employee_by_id(employee_id)
-    is_contractor = target_emp and (target_emp.get("employment_type") or "full_time").strip().lower() == "contractor"
     # Contractors: no hours for any time-off type. Non Pay: no hours. Sick leave/PTO with no clock times: full day (full-time only).
     if is_contractor and notes in ("Sick leave", "PTO", "Non Pay"):
         regular_hours = 0.0
@@ -573,20 +535,192 @@ def timesheet_save():
     else:
         regular_hours = day_total
         overtime_hours = 0.0
+    return {
+        "clock_in": clock_in, "clock_out": clock_out, "lunch_start": lunch_start, "lunch_end": lunch_end, "notes": notes,
+        "regular_hours": regular_hours, "overtime_hours": overtime_hours, "is_graveyard": is_grav, "shift": shift,
+    }
+
+
+# Posted day fields read as text by _time_entry_values: each must be a string or null.
+SAVE_DAY_TEXT_FIELDS = ("clock_in", "clock_out", "lunch_start", "lunch_end", "notes")
+
+
+def _save_target_employee_id(data):
+    """The employee a save applies to: the logged-in user, or (admins only) data["employee_id"] when it names an employee."""
+    employee_id = flask.session["user_id"]
+    if flask.session.get("is_admin") and data.get("employee_id") is not None:
+        try:
+            tid = int(data.get("employee_id"))
+            target = _load_employee(tid)
+            if target:
+                employee_id = tid
+        except (TypeError, ValueError):
+            pass
+    return employee_id
+
+
+def _api_week_start():
+    """Monday of ?week= (any date in the week; default this week), or None when it is not a date."""
+    try:
+        return db.get_week_start(date.fromisoformat(flask.request.args.get("week") or date.today().isoformat()))
+    except ValueError:
+        return None
+
+
+@app.route("/api/timesheet/week")
+@login_required
+def api_timesheet_week():
+    """
+    One employee's computed week as JSON (?week=YYYY-MM-DD, admins may add ?employee_id=): days after weekly overtime
+    plus attendance, overtime and total. ETag from the week's data version; If-None-Match gets 304 without recomputing.
+    """
+    week_start = _api_week_start()
+    if week_start is None:
+        return flask.jsonify({"ok": False, "error": "Invalid week"}), 400
+    employee_id = flask.session["user_id"]
+    if flask.session.get("is_admin") and flask.request.args.get("employee_id") is not None:
+        employee_id = flask.request.args.get("employee_id", type=int)
+    etag = _week_etag(week_start, "timesheet", employee_id)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    employee = _load_employee(employee_id) if employee_id is not None else None
+    if not employee:
+        return flask.jsonify({"ok": False, "error": "Employee not found"}), 404
+    days, attendance, overtime_total, total_hours = _employee_week(employee_id, employee, week_start)
+    return _conditional(flask.jsonify({
+        "ok": True,
+        "week_start": week_start.isoformat(),
+        "employee": {"id": employee["id"], "full_name": employee["full_name"]},
+        "days": [_day_json(d) for d in days],
+        "attendance": attendance,
+        "overtime_total": overtime_total,
+        "total_hours": total_hours,
+    }), etag)
+
+
+@app.route("/api/roster/week")
+@admin_required
+def api_roster_week():
+    """
+    Every employee's computed week as JSON, grouped by shift (day, swing, graveyard, unassigned); ?shift= limits it to one group.
+    Same ETag / If-None-Match handling as /api/timesheet/week.
+    """
+    week_start = _api_week_start()
+    if week_start is None:
+        return flask.jsonify({"ok": False, "error": "Invalid week"}), 400
+    shift = (flask.request.args.get("shift") or "").strip().lower() or None
+    if shift and shift not in ("day", "swing", "graveyard", "unassigned"):
+        return flask.jsonify({"ok": False, "error": "shift must be day, swing, graveyard or unassigned"}), 400
+    etag = _week_etag(week_start, "roster", shift)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    dates_in_week = _week_dates(week_start)
+    entries_by_employee = db.get_entries_for_week_by_employee(week_start)
+    totals_by_employee = db.get_week_totals(week_start)
+    shifts = {}
+    for shift_key, employees in db.list_employees_by_shift().items():
+        if shift and shift_key != shift:
+            continue
+        shifts[shift_key] = [
+            dict(row, days=[_day_json(d) for d in row["days"]])
+            for row in _week_roster(employees, dates_in_week, entries_by_employee, totals_by_employee)
+        ]
+    return _conditional(flask.jsonify({
+        "ok": True,
+        "week_start": week_start.isoformat(),
+        "dates": [d.isoformat() for d in dates_in_week],
+        "shifts": shifts,
+    }), etag)
+
+
+@app.route("/timesheet/save", methods=["POST"])
+@login_required
+def timesheet_save():
+    data = flask.request.get_json() or {}
+    employee_id = _save_target_employee_id(data)
+    work_date = (data.get("work_date") or "").strip()
+    if not work_date:
+        return flask.jsonify({"ok": False, "error": "work_date required"}), 400
+    try:
+        date.fromisoformat(work_date)
+    except ValueError:
+        return flask.jsonify({"ok": False, "error": "Invalid date"}), 400
+    target_emp = _load_employee(employee_id)
+    is_contractor = target_emp and (target_emp.get("employment_type") or "full_time").strip().lower() == "contractor"
+    values = _time_entry_values(data, is_contractor)
+    # Block setting time-off status (PTO, Sick leave, Non Pay) on dates where the employee's time-off request was disapproved
+    if values["notes"] in db.TIME_OFF_NOTES:
+        work_d = date.fromisoformat(work_date)
+        if work_date in db.get_disapproved_timeoff_dates(employee_id, work_d, work_d):
+            return flask.jsonify({"ok": False, "error": "Time-off request was disapproved for this date; you cannot use a time-off status here."}), 400
     with db._conn() as conn:
-        db.upsert_time_entry(
-            conn, employee_id, work_date,
-            clock_in=clock_in, clock_out=clock_out, lunch_start=lunch_start, lunch_end=lunch_end, notes=notes,
-            regular_hours=regular_hours, overtime_hours=overtime_hours, is_graveyard=is_grav, shift=shift,
-        )
+        db.upsert_time_entry(conn, employee_id, work_date, **values)
     return flask.jsonify({"ok": True})
 
 
+@app.route("/timesheet/save-week", methods=["POST"])
+@login_required
+def timesheet_save_week():
+    """
+    Save up to seven days of one week in one transaction. Body: {"week_start", "days": [{work_date, clock_in, clock_out,
+    lunch_start, lunch_end, notes}], "employee_id" (admin only)}. Nothing is written if any day is invalid.
+    Returns the recomputed week (days after weekly overtime, attendance, overtime_total, total_hours) so the page updates in place.
+    """
+    data = flask.request.get_json() or {}
+    if not isinstance(data, dict):
+        return flask.jsonify({"ok": False, "error": "Body must be a JSON object"}), 400
+    employee_id = _save_target_employee_id(data)
+    raw_week_start = data.get("week_start")
+    try:
+        week_start = db.get_week_start(date.fromisoformat(raw_week_start.strip() if isinstance(raw_week_start, str) else ""))
+    except ValueError:
+        return flask.jsonify({"ok": False, "error": "Invalid week_start"}), 400
+    week_end = week_start + timedelta(days=6)
+    posted = data.get("days")
+    if not isinstance(posted, list) or not posted or len(posted) > 7:
+        return flask.jsonify({"ok": False, "error": "days must list 1 to 7 days"}), 400
+    target_emp = _load_employee(employee_id)
+    is_contractor = target_emp and (target_emp.get("employment_type") or "full_time").strip().lower() == "contractor"
+    disapproved_dates = db.get_disapproved_timeoff_dates(employee_id, week_start, week_end)
+    rows = {}
+    for day in posted:
+        raw_date = day.get("work_date") if isinstance(day, dict) else None
+        work_date = raw_date.strip() if isinstance(raw_date, str) else ""
+        try:
+            work_d = date.fromisoformat(work_date)
+        except ValueError:
+            return flask.jsonify({"ok": False, "error": "Invalid date", "work_date": work_date}), 400
+        bad_field = next((k for k in SAVE_DAY_TEXT_FIELDS if not isinstance(day.get(k), (str, type(None)))), None)
+        if bad_field:
+            return flask.jsonify({"ok": False, "error": f"Invalid {bad_field}", "work_date": work_date}), 400
+        if not week_start <= work_d <= week_end:
+            return flask.jsonify({"ok": False, "error": "Date is not in this week", "work_date": work_date}), 400
+        values = _time_entry_values(day, is_contractor)
+        # Block setting time-off status (PTO, Sick leave, Non Pay) on dates where the employee's time-off request was disapproved
+        if values["notes"] in db.TIME_OFF_NOTES and work_date in disapproved_dates:
+            return flask.jsonify({"ok": False, "work_date": work_date,
+                                  "error": f"Time-off request was disapproved for {work_date}; you cannot use a time-off status there."}), 400
+        rows[work_date] = (employee_id, work_date, values["clock_in"], values["clock_out"], values["lunch_start"], values["lunch_end"],
+                           values["regular_hours"], values["overtime_hours"], values["is_graveyard"], values["shift"], values["notes"])
+    with db._conn() as conn:
+        db.upsert_time_entries(conn, list(rows.values()))
+    days, attendance, overtime_total, total_hours = _employee_week(employee_id, target_emp, week_start)
+    return flask.jsonify({
+        "ok": True,
+        "days": [_day_json(d) for d in days],
+        "attendance": attendance,
+        "overtime_total": overtime_total,
+        "total_hours": total_hours,
+    })
+
+
 @app.route("/request-timeoff", methods=["GET", "POST"])
 @login_required
 def request_timeoff():
     """Employee page to request time off (Sick leave, PTO, Non Pay) for a date range. Contractors: 0 hours for all types."""
-    employee = db.get_employee_by_id(flask.session["user_id"])
+    employee = flask.g.user
     is_contractor = employee and (employee.get("employment_type") or "full_time").strip().lower() == "contractor"
     if flask.request.method == "GET":
         my_requests = db.get_employee_timeoff_requests(flask.session["user_id"])
@@ -631,9 +765,12 @@ def request_timeoff():
         hours_per_day = 0
     else:
         hours_per_day = 0 if notes == "Non Pay" else config.REGULAR_HOURS_PER_DAY
-    db.create_timeoff_request(flask.session["user_id"], from_d, to_d, notes, hours_per_day=hours_per_day)
     employee_name = flask.session.get("full_name") or "Unknown"
-    _send_timeoff_notification(employee_name, from_str, to_str, notes)
+    db.create_timeoff_request(
+        flask.session["user_id"], from_d, to_d, notes, hours_per_day=hours_per_day,
+        notifications=notifications.timeoff_notifications(employee_name, from_str, to_str, notes),
+    )
+    notifier.wake()
     flask.flash("Time off request submitted. Status will update when Administrator approves or disapproves.")
     return flask.redirect(flask.url_for("request_timeoff"))
 
@@ -653,8 +790,9 @@ def request_timeoff_cancel(request_id):
     from_str = req.get("from_date") or ""
     to_str = req.get("to_date") or ""
     notes = req.get("notes") or "Time off"
-    if db.discard_timeoff_request(request_id, flask.session["user_id"]):
-        _send_timeoff_cancelled_notification(employee_name, from_str, to_str, notes)
+    messages = notifications.timeoff_notifications(employee_name, from_str, to_str, notes, cancelled=True)
+    if db.discard_timeoff_request(request_id, flask.session["user_id"], notifications=messages):
+        notifier.wake()
         flask.flash("Time off request cancelled. Administrator has been notified.")
     else:
         flask.flash("Could not cancel the request.", "error")
@@ -673,52 +811,10 @@ def admin_employees():
 def admin_employees_export():
     """Export employee list to Excel (Full name, Shift, Status, FA/MTF, Admin, Updated)."""
     employees = db.list_employees()
-    thin = Side(style="thin")
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Employees"
-    ws.merge_cells("A1:H1")
-    title_cell = ws.cell(row=1, column=1, value="Employees")
-    title_cell.font = Font(bold=True)
-    title_cell.fill = yellow_fill
-    title_cell.border = border
-    title_cell.alignment = Alignment(horizontal="center")
-    headers = ["No.", "Full name", "Username", "Shift", "Status", "FA / MTF", "Admin", "Updated"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col, value=h)
-        cell.font = Font(bold=True)
-        cell.fill = grey_fill
-        cell.border = border
-    for idx, e in enumerate(employees, 1):
-        r = 2 + idx
-        shift_val = (e.get("shift") or "").strip()
-        shift_display = shift_val.capitalize() if shift_val in ("day", "swing", "graveyard") else ("—" if not shift_val else shift_val)
-        status = "Contractor" if (e.get("employment_type") or "").strip().lower() == "contractor" else "Full time"
-        fa_mtf = (e.get("fa_mtf") or "").strip().upper() or "—"
-        updated = (e.get("updated_at") or "")[:10] if e.get("updated_at") else "—"
-        ws.cell(row=r, column=1, value=idx)
-        ws.cell(row=r, column=2, value=e.get("full_name") or "")
-        ws.cell(row=r, column=3, value=e.get("username") or "—")
-        ws.cell(row=r, column=4, value=shift_display)
-        ws.cell(row=r, column=5, value=status)
-        ws.cell(row=r, column=6, value=fa_mtf)
-        ws.cell(row=r, column=7, value="Yes" if e.get("is_admin") else "No")
-        ws.cell(row=r, column=8, value=updated)
-        for c in range(1, 9):
-            ws.cell(row=r, column=c).border = border
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
+    wb = xlsx.new_workbook()
+    xlsx.write_employees_sheet(wb, employees)
     filename = f"employees_{date.today().isoformat()}.xlsx"
-    return flask.send_file(
-        buf,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    return flask.send_file(xlsx.save_to_tempfile(wb), as_attachment=True, download_name=filename, mimetype=xlsx.XLSX_MIMETYPE)
 
 
 @app.route("/admin/employees/add", methods=["GET", "POST"])
@@ -736,21 +832,25 @@ def admin_employee_add():
         employment_type = "full_time"
     fa_mtf_raw = (flask.request.form.get("fa_mtf") or "").strip().lower()
     fa_mtf = fa_mtf_raw if fa_mtf_raw in ("fa", "mtf") else None
+    badge_id = (flask.request.form.get("badge_id") or "").strip() or None
     if not password or not full_name or not username:
         return flask.render_template("admin_employee_form.html", employee=None, error="Full name, username, and password required.")
     if db.get_employee_by_username(username):
         return flask.render_template("admin_employee_form.html", employee=None, error="An employee with this username already exists.")
     if db.get_employee_by_full_name(full_name):
         return flask.render_template("admin_employee_form.html", employee=None, error="An employee with this full name already exists.")
+    if badge_id and db.get_employee_by_badge_id(badge_id):
+        return flask.render_template("admin_employee_form.html", employee=None, error="Another employee already has this badge ID.")
     with db._conn() as conn:
-        db.create_employee(conn, username, generate_password_hash(password), full_name, is_admin=is_admin, shift=shift, employment_type=employment_type, fa_mtf=fa_mtf)
+        db.create_employee(conn, username, generate_password_hash(password), full_name, is_admin=is_admin, shift=shift, employment_type=employment_type, fa_mtf=fa_mtf,
+                           badge_id=badge_id)
     return flask.redirect(flask.url_for("admin_employees"))
 
 
 @app.route("/admin/employees/<int:employee_id>/edit", methods=["GET", "POST"])
 @admin_required
 def admin_employee_edit(employee_id):
-    employee = db.get_employee_by_id(employee_id)
+    employee = _load_employee(employee_id)
     if not employee:
         flask.abort(404)
     if flask.request.method == "GET":
@@ -765,6 +865,7 @@ def admin_employee_edit(employee_id):
     fa_mtf_raw = (flask.request.form.get("fa_mtf") or "").strip().lower()
     fa_mtf = fa_mtf_raw if fa_mtf_raw in ("fa", "mtf") else None
     username = (flask.request.form.get("username") or "").strip()
+    badge_id = (flask.request.form.get("badge_id") or "").strip() or None
     if not full_name:
         return flask.render_template("admin_employee_form.html", employee=employee, error="Full name required.")
     if not username:
@@ -772,8 +873,12 @@ def admin_employee_edit(employee_id):
     existing_by_username = db.get_employee_by_username(username)
     if existing_by_username and existing_by_username["id"] != employee_id:
         return flask.render_template("admin_employee_form.html", employee=employee, error="An employee with this username already exists.")
+    existing_by_badge = db.get_employee_by_badge_id(badge_id) if badge_id else None
+    if existing_by_badge and existing_by_badge["id"] != employee_id:
+        return flask.render_template("admin_employee_form.html", employee=employee, error="Another employee already has this badge ID.")
     with db._conn() as conn:
-        kwargs = {"full_name": full_name, "is_admin": is_admin, "shift": shift, "employment_type": employment_type, "fa_mtf": fa_mtf, "username": username}
+        kwargs = {"full_name": full_name, "is_admin": is_admin, "shift": shift, "employment_type": employment_type, "fa_mtf": fa_mtf, "username": username,
+                  "badge_id": badge_id}
         if password:
             kwargs["password_hash"] = generate_password_hash(password)
         db.update_employee(conn, employee_id, **kwargs)
@@ -783,7 +888,7 @@ def admin_employee_edit(employee_id):
 @app.route("/admin/employees/<int:employee_id>/delete", methods=["POST"])
 @admin_required
 def admin_employee_delete(employee_id):
-    employee = db.get_employee_by_id(employee_id)
+    employee = _load_employee(employee_id)
     if not employee:
         flask.abort(404)
     with db._conn() as conn:
@@ -791,6 +896,31 @@ def admin_employee_delete(employee_id):
     return flask.redirect(flask.url_for("admin_employees"))
 
 
+@app.route("/admin/import", methods=["GET", "POST"])
+@admin_required
+def admin_import():
+    """Import clock times from a badge / clock-system export (CSV or XLSX); shows a summary and the rows that were rejected."""
+    if flask.request.method == "GET":
+        return flask.render_template("admin_import.html", result=None)
+    upload = flask.request.files.get("file")
+    if not upload or not upload.filename:
+        return flask.render_template("admin_import.html", result=None, error="Choose a CSV or Excel file to import.")
+    started = monotonic()
+    try:
+        result = timesheet_import.import_file(upload.stream, upload.filename)
+    except ValueError as e:
+        return flask.render_template("admin_import.html", result=None, error=str(e))
+    except Exception:
+        logger.exception("Badge import of %s failed", upload.filename)
+        return flask.render_template("admin_import.html", result=None, error="Could not read that file. Upload a CSV or .xlsx export.")
+    result["seconds"] = monotonic() - started
+    result["filename"] = upload.filename
+    result["reject_csv"] = timesheet_import.reject_report_csv(result["rejects"]) if result["rejects"] else None
+    logger.info("Badge import %s: %d rows, %d days imported, %d rejected in %.2fs", upload.filename, result["rows"],
+                result["imported"], len(result["rejects"]), result["seconds"])
+    return flask.render_template("admin_import.html", result=result)
+
+
 @app.route("/admin/settings", methods=["GET", "POST"])
 @admin_required
 def admin_settings():
@@ -852,7 +982,10 @@ def admin_timeoff():
         to_d = today
     if from_d > to_d:
         from_d, to_d = to_d, from_d
-    all_requests = db.get_all_timeoff_requests()
+    # Request list: first page only; the page fetches more from admin_timeoff_requests on demand.
+    request_filters = _timeoff_request_filters(flask.request.args, from_d, to_d)
+    all_requests, next_before = db.list_timeoff_requests(**request_filters)
+    requests_total = db.count_timeoff_requests(**request_filters)
     entries = db.get_timeoff_entries(from_d, to_d, exclude_admin=True)
     day_names_short = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
     for e in entries:
@@ -888,17 +1021,80 @@ def admin_timeoff():
         date_to_str=to_d.isoformat(),
         pending_requests=pending_requests,
         all_requests=all_requests,
+        requests_total=requests_total,
+        requests_more_url=_timeoff_requests_more_url(flask.request.args, from_d, to_d, next_before),
+        request_filter_args=_timeoff_request_filter_args(flask.request.args),
+        request_employees=[e for e in db.list_employees() if not e.get("is_admin")],
+        timeoff_types=db.TIME_OFF_NOTES,
     )
 
 
+TIMEOFF_REQUEST_FILTER_ARGS = ("req_status", "req_type", "req_employee", "req_overlap")
+
+
+def _timeoff_request_filter_args(values):
+    """The req_* filter args from a query string or form, "" for each one not given."""
+    return {k: (values.get(k) or "").strip() for k in TIMEOFF_REQUEST_FILTER_ARGS}
+
+
+def _timeoff_request_filters(args, from_d, to_d):
+    """list_timeoff_requests keyword filters from the req_* query args. req_overlap=1 keeps requests overlapping from_d..to_d."""
+    status = args.get("req_status")
+    notes = args.get("req_type")
+    overlap = args.get("req_overlap") == "1"
+    return {
+        "status": status if status in db.TIMEOFF_REQUEST_STATUSES else None,
+        "employee_id": args.get("req_employee", type=int),
+        "notes": notes if notes in db.TIME_OFF_NOTES else None,
+        "overlap_from": from_d if overlap else None,
+        "overlap_to": to_d if overlap else None,
+    }
+
+
+def _timeoff_requests_more_url(args, from_d, to_d, next_before):
+    """URL of the next request-list page (same filters), or None on the last page."""
+    if not next_before:
+        return None
+    filter_args = {k: v for k, v in _timeoff_request_filter_args(args).items() if v}
+    return flask.url_for("admin_timeoff_requests", **{"from": from_d.isoformat(), "to": to_d.isoformat()}, **filter_args,
+                         before=f"{next_before[0]}|{next_before[1]}")
+
+
+@app.route("/admin/timeoff/requests")
+@admin_required
+def admin_timeoff_requests():
+    """Next page of the admin request list as JSON: rendered table rows (html) and the URL of the page after it (more_url)."""
+    try:
+        from_d = date.fromisoformat(flask.request.args.get("from") or "")
+        to_d = date.fromisoformat(flask.request.args.get("to") or "")
+    except ValueError:
+        return flask.jsonify({"ok": False, "error": "Invalid date range"}), 400
+    before = None
+    created_at, _, request_id = (flask.request.args.get("before") or "").rpartition("|")
+    if created_at and request_id.isdigit():
+        before = (created_at, int(request_id))
+    rows, next_before = db.list_timeoff_requests(before=before, **_timeoff_request_filters(flask.request.args, from_d, to_d))
+    html = flask.render_template(
+        "_timeoff_request_rows.html", all_requests=rows, date_from_str=from_d.isoformat(), date_to_str=to_d.isoformat(),
+        request_filter_args=_timeoff_request_filter_args(flask.request.args),
+    )
+    return flask.jsonify({
+        "ok": True,
+        "count": len(rows),
+        "html": html,
+        "more_url": _timeoff_requests_more_url(flask.request.args, from_d, to_d, next_before),
+    })
+
+
 def _admin_timeoff_redirect():
-    """Redirect to admin timeoff list, preserving date filter from form if present."""
+    """Redirect to admin timeoff list, preserving the date range and request-list filters posted with the form."""
     from_str = (flask.request.form.get("from") or "").strip()
     to_str = (flask.request.form.get("to") or "").strip()
+    filter_args = {k: v for k, v in _timeoff_request_filter_args(flask.request.form).items() if v}
     url = flask.url_for("admin_timeoff")
-    if from_str or to_str:
+    if from_str or to_str or filter_args:
         from urllib.parse import urlencode
-        url += "?" + urlencode({"from": from_str, "to": to_str})
+        url += "?" + urlencode({"from": from_str, "to": to_str, **filter_args})
     return flask.redirect(url)
 
 
@@ -924,6 +1120,45 @@ def admin_timeoff_reject(request_id):
     return _admin_timeoff_redirect()
 
 
+@app.route("/admin/timeoff/requests/status", methods=["POST"])
+@admin_required
+def admin_timeoff_bulk_status():
+    """
+    Approve or disapprove many requests in one transaction. Form post (checkboxes on the request list) redirects back with a
+    summary; a JSON body {"status": "approved"|"rejected", "ids": [...]} gets {"ok", "results"} with one result per request.
+    """
+    payload = flask.request.get_json(silent=True) if flask.request.is_json else None
+    if payload is not None:
+        status = payload.get("status")
+        raw_ids = payload.get("ids")
+    else:
+        status = flask.request.form.get("status")
+        raw_ids = flask.request.form.getlist("request_id")
+    try:
+        # Only a list: iterating a string such as "123" would give requests 1, 2 and 3.
+        request_ids = [int(i) for i in raw_ids] if isinstance(raw_ids, list) else None
+    except (TypeError, ValueError):
+        request_ids = None
+    if status not in ("approved", "rejected") or request_ids is None:
+        if payload is not None:
+            return flask.jsonify({"ok": False, "error": "status must be approved or rejected and ids a list of request ids"}), 400
+        flask.flash("Could not update requests (invalid selection).", "error")
+        return _admin_timeoff_redirect()
+    results = db.set_timeoff_request_statuses(request_ids, status)
+    if payload is not None:
+        return flask.jsonify({"ok": all(r["ok"] for r in results), "results": results})
+    done = sum(1 for r in results if r["ok"])
+    if not results:
+        flask.flash("No requests selected.", "error")
+    elif status == "approved":
+        flask.flash(f"{done} time off request(s) approved; added to employee timesheets.")
+    else:
+        flask.flash(f"{done} time off request(s) disapproved.")
+    if done < len(results):
+        flask.flash(f"{len(results) - done} selected request(s) could not be updated (not found).", "error")
+    return _admin_timeoff_redirect()
+
+
 @app.route("/admin/timeoff/request/<int:request_id>/discard", methods=["POST"])
 @admin_required
 def admin_timeoff_discard(request_id):
@@ -955,13 +1190,7 @@ def admin_timeoff_notes(request_id):
         flask.flash("Notes saved.")
     else:
         flask.flash("Could not save notes (request not found).", "error")
-    from_str = flask.request.form.get("from") or ""
-    to_str = flask.request.form.get("to") or ""
-    url = flask.url_for("admin_timeoff")
-    if from_str or to_str:
-        from urllib.parse import urlencode
-        url += "?" + urlencode({"from": from_str, "to": to_str})
-    return flask.redirect(url)
+    return _admin_timeoff_redirect()
 
 
 @app.route("/admin/timeoff/calendar")
@@ -977,39 +1206,11 @@ def admin_timeoff_calendar():
         year = today.year
     _, ndays = monthrange(year, month)
     month_start = date(year, month, 1)
-    month_end = date(year, month, ndays)
-    entries = db.get_timeoff_entries(month_start, month_end, exclude_admin=True)
-    request_entries = db.get_timeoff_request_calendar_entries(month_start, month_end, exclude_admin=True)
-    cancelled_set = db.get_cancelled_timeoff_employee_dates(month_start, month_end)
-    # Merge: time_entries (approved full-time) first; then add request days not already present (pending, approved contractors, or cancelled)
-    seen = {(e["work_date"], e["employee_id"]) for e in entries}
-    merged = [dict(e, pending=False, cancelled=False) for e in entries]
-    for e in request_entries:
-        key = (e["work_date"], e["employee_id"])
-        if key not in seen:
-            seen.add(key)
-            merged.append(dict(e, pending=(e["status"] == "pending"), cancelled=(e["status"] == "cancelled")))
-    by_date = {}
-    for e in merged:
-        d_str = e["work_date"]
-        # Mark cancelled if this (employee_id, date) has a cancelled request (so approved-then-cancelled shows strikethrough)
-        is_cancelled = (e["employee_id"], d_str) in cancelled_set or e.get("cancelled", False)
-        by_date.setdefault(d_str, []).append({
-            "full_name": e["full_name"],
-            "fa_mtf": e.get("fa_mtf"),
-            "notes": e["notes"],
-            "pending": e.get("pending", False),
-            "cancelled": is_cancelled,
-        })
-    # Days where 2+ employees on the same shift are off (red-flag conflict); do not count cancelled
-    from collections import defaultdict
-    shift_count_by_date = defaultdict(lambda: defaultdict(int))
-    for e in merged:
-        if e.get("cancelled") or (e["employee_id"], e["work_date"]) in cancelled_set:
-            continue
-        shift = (e.get("shift") or "").strip() or "(no shift)"
-        shift_count_by_date[e["work_date"]][shift] += 1
-    conflict_dates = {d for d, by_shift in shift_count_by_date.items() if any(c >= 2 for c in by_shift.values())}
+    # Each day's entries (pending/cancelled flags) and shift-conflict days, from one cached query.
+    calendar = db.get_timeoff_calendar_month(year, month)
+    by_date = calendar["by_date"]
+    conflict_dates = calendar["conflict_dates"]
+    shift_counts = calendar["shift_counts"]
     # Build grid: weeks (rows) of 7 days; Monday = 0
     pad_left = month_start.weekday()
     cells = [None] * pad_left
@@ -1034,16 +1235,15 @@ def admin_timeoff_calendar():
         next_year=next_year,
         next_month=next_month,
         conflict_dates=conflict_dates,
+        shift_counts=shift_counts,
     )
 
 
-@app.route("/admin/timeoff/export")
-@admin_required
-def admin_timeoff_export():
-    """Export time-off report to Excel."""
+def _timeoff_export_range(args):
+    """(from_d, to_d) from the from/to query args; defaults to this month so far, swapped if reversed."""
     today = date.today()
-    from_str = flask.request.args.get("from") or (today.replace(day=1).isoformat())
-    to_str = flask.request.args.get("to") or today.isoformat()
+    from_str = args.get("from") or (today.replace(day=1).isoformat())
+    to_str = args.get("to") or today.isoformat()
     try:
         from_d = date.fromisoformat(from_str)
         to_d = date.fromisoformat(to_str)
@@ -1052,390 +1252,390 @@ def admin_timeoff_export():
         to_d = today
     if from_d > to_d:
         from_d, to_d = to_d, from_d
+    return from_d, to_d
+
+
+def _build_timeoff_export(from_d, to_d):
+    """Time-off report workbook as (file, download filename)."""
     entries = db.get_timeoff_entries(from_d, to_d, exclude_admin=True)
-    thin = Side(style="thin")
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Time Off"
-    ws.merge_cells("A1:E1")
-    title_cell = ws.cell(row=1, column=1, value=f"Time Off Report — {from_d} to {to_d}")
-    title_cell.font = Font(bold=True)
-    title_cell.fill = yellow_fill
-    title_cell.border = border
-    title_cell.alignment = Alignment(horizontal="center")
-    headers = ["No.", "Employee", "Date", "Day", "Type"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=2, column=col, value=h)
-        cell.font = Font(bold=True)
-        cell.fill = grey_fill
-        cell.border = border
-    for idx, row in enumerate(entries, 1):
-        r = 2 + idx
-        d = date.fromisoformat(row["work_date"])
-        day_name = DAY_NAMES[d.weekday()]
-        ws.cell(row=r, column=1, value=idx)
-        ws.cell(row=r, column=2, value=row["full_name"])
-        ws.cell(row=r, column=3, value=row["work_date"])
-        ws.cell(row=r, column=4, value=day_name)
-        ws.cell(row=r, column=5, value=row["notes"])
-        for c in range(1, 6):
-            ws.cell(row=r, column=c).border = border
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    filename = f"timeoff_{from_d}_{to_d}.xlsx"
-    return flask.send_file(
-        buf,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    wb = xlsx.new_workbook()
+    xlsx.write_timeoff_sheet(wb, entries, from_d, to_d)
+    return xlsx.save_to_tempfile(wb), f"timeoff_{from_d}_{to_d}.xlsx"
 
 
-@app.route("/export/week/<week_start>")
-@login_required
-def export_week(week_start):
+@app.route("/admin/timeoff/export")
+@admin_required
+def admin_timeoff_export():
+    """Export time-off report to Excel."""
+    out, filename = _build_timeoff_export(*_timeoff_export_range(flask.request.args))
+    return flask.send_file(out, as_attachment=True, download_name=filename, mimetype=xlsx.XLSX_MIMETYPE)
+
+
+def _build_days_map_with_attendance(entries, computed):
+    """Build days map with in, out, remark, attendance, overtime per day (for export)."""
+    days_map = {}
+    for e in entries:
+        d = e["work_date"]
+        days_map[d] = {
+            "in": _format_time_12h(e.get("clock_in")),
+            "out": _format_time_12h(e.get("clock_out")),
+            "remark": (e.get("notes") or "").strip(),
+            "attendance": 0.0,
+            "overtime": 0.0,
+        }
+    for c in computed:
+        d = c["work_date"]
+        reg = c.get("regular_hours") or 0
+        ot = c.get("overtime_hours") or 0
+        if d not in days_map:
+            days_map[d] = {"in": "", "out": "", "remark": (c.get("notes") or "").strip(), "attendance": reg, "overtime": ot}
+        else:
+            days_map[d]["attendance"] = reg
+            days_map[d]["overtime"] = ot
+    return days_map
+
+
+def _week_dates(week_start_d):
+    """The 7 dates (Mon–Sun) starting at week_start_d."""
+    return [week_start_d + timedelta(days=i) for i in range(7)]
+
+
+def _admin_export_rows(employees, entries_by_employee, totals_by_employee):
+    """One week's export rows ({full_name, days, attendance, overtime_total, total_hours}) for non-admin employees, sorted by name."""
+    rows = []
+    for emp in employees:
+        if emp.get("is_admin"):
+            continue
+        entries = entries_by_employee.get(emp["id"], [])
+        computed = logic.compute_weekly_overtime(entries)
+        days_map = _build_days_map_with_attendance(entries, computed)
+        attendance, overtime_total, total_hours = _week_totals_summary(totals_by_employee.get(emp["id"]))
+        rows.append({
+            "full_name": emp["full_name"],
+            "days": days_map,
+            "attendance": attendance,
+            "overtime_total": overtime_total,
+            "total_hours": total_hours,
+        })
+    rows.sort(key=lambda r: (r["full_name"] or "").upper())
+    return rows
+
+
+def _build_admin_week_workbook(week_start_d, shift_export):
+    """
+    Admin week export workbook (admins excluded from rows).
+    shift_export: day/swing/graveyard (one sheet), combined (one sheet, shifts separated by section rows),
+    or None (one workbook with Day, Swing, Graveyard sheets).
+    """
+    week_start = week_start_d.isoformat()
+    dates_in_week = _week_dates(week_start_d)
+    # Admin exports cover many employees: load the whole week in one range query up front.
+    week_entries_by_employee = db.get_entries_for_week_by_employee(week_start_d)
+    week_totals_by_employee = db.get_week_totals(week_start_d)
+
+    def _build_employee_rows(employees):
+        return _admin_export_rows(employees, week_entries_by_employee, week_totals_by_employee)
+
+    wb = xlsx.new_workbook()
+    by_shift = db.list_employees_by_shift()
+    if shift_export == "combined":
+        # One sheet, shifts separated by section rows (no Shift column). All employees working or not.
+        rows_per_shift = {shift_key: _build_employee_rows(by_shift.get(shift_key, [])) for shift_key in xlsx.SHIFT_ORDER}
+        xlsx.write_combined_sheet(wb, rows_per_shift, dates_in_week)
+    elif shift_export:
+        label = shift_export.capitalize()
+        xlsx.write_timesheet_sheet(wb, _build_employee_rows(by_shift.get(shift_export, [])), f"Week {week_start}", label, dates_in_week)
+    else:
+        # One workbook with 3 sheets: Day, Swing, Graveyard
+        for shift_name in ("day", "swing", "graveyard"):
+            label = shift_name.capitalize()
+            xlsx.write_timesheet_sheet(wb, _build_employee_rows(by_shift.get(shift_name, [])), label, label, dates_in_week)
+    return wb
+
+
+def _admin_week_export_filename(week_start_d, shift_export):
+    return f"timesheet_week_{week_start_d.isoformat()}_{shift_export or 'all_shifts'}.xlsx"
+
+
+def _build_admin_week_export(week_start_d, shift_export):
+    """
+    Admin week export as (file, download filename). Admin exports depend only on the week and shift mode (not on
+    who asks), so repeat downloads come from export_cache until a write bumps the week's data version.
+    """
+    filename = _admin_week_export_filename(week_start_d, shift_export)
+    cache_key = data_version = None
+    if config.EXPORT_CACHE_MAX_BYTES > 0:
+        cache_key = (week_start_d.isoformat(), shift_export or "all_shifts")
+        data_version = db.get_week_data_version(week_start_d)
+        cached = export_cache.get(cache_key, data_version)
+        if cached is not None:
+            return io.BytesIO(cached), filename
+    out = xlsx.save_to_tempfile(_build_admin_week_workbook(week_start_d, shift_export))
+    if cache_key is not None:
+        export_cache.put(cache_key, data_version, out.read())
+        out.seek(0)
+    return out, filename
+
+
+RANGE_EXPORT_MAX_WEEKS = 53
+
+
+def _build_admin_range_export(from_d, to_d, shift_export, layout):
+    """
+    Multi-week (pay period) export as (file, download filename). The range is widened to whole Monday–Sunday weeks.
+    layout "weeks": one sheet per week (per-day layout; all shifts as section rows unless shift_export is one shift).
+    layout "summary": one sheet of Attendance/Overtime/Total per week plus period totals.
+    Entries come from one range query ordered by employee and date, split into weeks in a single pass.
+    """
+    first_week = db.get_week_start(from_d)
+    last_week = db.get_week_start(to_d)
+    week_starts = []
+    d = first_week
+    while d <= last_week:
+        week_starts.append(d)
+        d += timedelta(days=7)
+    entries_by_employee = db.get_entries_for_range_by_employee(first_week, last_week + timedelta(days=6))
+    totals = db.get_week_totals_for_range(first_week, last_week)
+    entries_by_week = {w.isoformat(): {} for w in week_starts}
+    for employee_id, entries in entries_by_employee.items():
+        for e in entries:
+            entries_by_week[e["week_start"]].setdefault(employee_id, []).append(e)
+    totals_by_week = {w.isoformat(): {} for w in week_starts}
+    for (employee_id, week_key), t in totals.items():
+        totals_by_week[week_key][employee_id] = t
+
+    by_shift = db.list_employees_by_shift()
+    shift_keys = (shift_export,) if shift_export in ("day", "swing", "graveyard") else xlsx.SHIFT_ORDER
+    period = f"{first_week.isoformat()}_{(last_week + timedelta(days=6)).isoformat()}"
+    wb = xlsx.new_workbook()
+    if layout == "summary":
+        period_totals = db.get_period_totals(first_week, last_week)
+        rows_per_shift = {}
+        for shift_key in shift_keys:
+            rows = []
+            for emp in by_shift.get(shift_key, []):
+                if emp.get("is_admin"):
+                    continue
+                weeks = {}
+                for w in week_starts:
+                    weeks[w.isoformat()] = _week_totals_summary(totals_by_week[w.isoformat()].get(emp["id"]))
+                attendance, overtime_total, total_hours = _week_totals_summary(period_totals.get(emp["id"]))
+                rows.append({
+                    "full_name": emp["full_name"],
+                    "weeks": weeks,
+                    "attendance": attendance,
+                    "overtime_total": overtime_total,
+                    "total_hours": total_hours,
+                })
+            rows.sort(key=lambda r: (r["full_name"] or "").upper())
+            rows_per_shift[shift_key] = rows
+        title = f"Time Sheet Summary {first_week.isoformat()} to {(last_week + timedelta(days=6)).isoformat()}"
+        xlsx.write_period_summary_sheet(wb, rows_per_shift, week_starts, title)
+    else:
+        for w in week_starts:
+            week_key = w.isoformat()
+            rows_per_shift = {
+                shift_key: _admin_export_rows(by_shift.get(shift_key, []), entries_by_week[week_key], totals_by_week[week_key])
+                for shift_key in shift_keys
+            }
+            if shift_export in ("day", "swing", "graveyard"):
+                xlsx.write_timesheet_sheet(wb, rows_per_shift[shift_export], f"Week {week_key}", shift_export.capitalize(), _week_dates(w))
+            else:
+                xlsx.write_combined_sheet(wb, rows_per_shift, _week_dates(w), sheet_title=f"Week {week_key}",
+                                          title=f"Time Sheet Week {week_key} (All Shifts)")
+    filename = f"timesheet_{period}_{layout}" + (f"_{shift_export}" if shift_export in ("day", "swing", "graveyard") else "") + ".xlsx"
+    return xlsx.save_to_tempfile(wb), filename
+
+
+def _parse_range_export_args(args):
+    """(from date, to date, shift, layout) for a range export; aborts 400 on bad dates or more than RANGE_EXPORT_MAX_WEEKS weeks."""
     try:
-        week_start_d = date.fromisoformat(week_start)
+        from_d = date.fromisoformat(args.get("from") or "")
+        to_d = date.fromisoformat(args.get("to") or "")
     except ValueError:
         flask.abort(400)
-    week_end_d = week_start_d + timedelta(days=6)
-    thin = Side(style="thin")
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-    grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    blue_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    orange_fill = PatternFill(start_color="ED7D31", end_color="ED7D31", fill_type="solid")
-    white_font = Font(bold=True, color="FFFFFF")
-
-    shift_export = (flask.request.args.get("shift") or "").strip().lower()
+    if from_d > to_d:
+        from_d, to_d = to_d, from_d
+    if (db.get_week_start(to_d) - db.get_week_start(from_d)).days // 7 + 1 > RANGE_EXPORT_MAX_WEEKS:
+        flask.abort(400)
+    shift_export = (args.get("shift") or "").strip().lower()
+    if shift_export not in ("day", "swing", "graveyard"):
+        shift_export = None
+    layout = "summary" if args.get("layout") == "summary" else "weeks"
+    return from_d, to_d, shift_export, layout
+
+
+@app.route("/export/range")
+@admin_required
+def export_range():
+    """Pay-period export: any span of whole weeks (from/to), one sheet per week or one summary sheet (layout)."""
+    out, filename = _build_admin_range_export(*_parse_range_export_args(flask.request.args))
+    return flask.send_file(out, as_attachment=True, download_name=filename, mimetype=xlsx.XLSX_MIMETYPE)
+
+
+def _parse_week_export_args(week_start, args):
+    """(Monday of the week containing week_start, shift mode) for a week export; aborts 400 on a bad date."""
+    try:
+        week_start_d = db.get_week_start(date.fromisoformat(week_start))
+    except ValueError:
+        flask.abort(400)
+    shift_export = (args.get("shift") or "").strip().lower()
     if shift_export not in ("day", "swing", "graveyard", "combined"):
         shift_export = None
+    return week_start_d, shift_export
 
-    def _build_days_map_with_attendance(entries, computed):
-        """Build days map with in, out, remark, attendance, overtime per day (for export)."""
-        days_map = {}
-        for e in entries:
-            d = e["work_date"]
-            days_map[d] = {
-                "in": _format_time_12h(e.get("clock_in")),
-                "out": _format_time_12h(e.get("clock_out")),
-                "remark": (e.get("notes") or "").strip(),
-                "attendance": 0.0,
-                "overtime": 0.0,
-            }
-        for c in computed:
-            d = c["work_date"]
-            reg = c.get("regular_hours") or 0
-            ot = c.get("overtime_hours") or 0
-            if d not in days_map:
-                days_map[d] = {"in": "", "out": "", "remark": (c.get("notes") or "").strip(), "attendance": reg, "overtime": ot}
-            else:
-                days_map[d]["attendance"] = reg
-                days_map[d]["overtime"] = ot
-        return days_map
-
-    def _build_shift_employee_rows(shift_name, include_shift=False):
-        rows = []
-        for emp in db.list_employees_for_shift(shift_name):
-            if emp.get("is_admin"):
-                continue
-            entries = db.get_entries_for_week(emp["id"], week_start_d)
-            computed = logic.compute_weekly_overtime(entries)
-            days_map = _build_days_map_with_attendance(entries, computed)
-            total_reg = sum(c.get("regular_hours") or 0 for c in computed)
-            total_ot = sum(c.get("overtime_hours") or 0 for c in computed)
-            r = {
-                "full_name": emp["full_name"],
-                "days": days_map,
-                "attendance": min(total_reg, 40),
-                "overtime_total": total_ot,
-                "total_hours": min(total_reg, 40) + total_ot,
-            }
-            if include_shift:
-                r["shift"] = shift_name.capitalize()
-            rows.append(r)
-        rows.sort(key=lambda r: (r["full_name"] or "").upper())
-        return rows
-
-    # Build one row per employee: { full_name, days, attendance, overtime_total, total_hours [, shift] } (exclude admins from export)
-    export_all_shifts = False  # When True (admin, no shift): one workbook with 3 sheets
-    export_combined = False  # When True (admin, shift=combined): one sheet with Shift column
+
+@app.route("/export/week/<week_start>")
+@login_required
+def export_week(week_start):
+    week_start_d, shift_export = _parse_week_export_args(week_start, flask.request.args)
     if flask.session.get("is_admin"):
-        if shift_export == "combined":
-            export_combined = True
-            # One sheet, shifts separated by section rows (no Shift column). All employees working or not.
-            by_shift = db.list_employees_by_shift()
-            shift_order = ("day", "swing", "graveyard", "unassigned")
-            combined_export_by_shift = {}
-            for shift_key in shift_order:
-                rows = []
-                for emp in by_shift.get(shift_key, []):
-                    if emp.get("is_admin"):
-                        continue
-                    entries = db.get_entries_for_week(emp["id"], week_start_d)
-                    computed = logic.compute_weekly_overtime(entries)
-                    days_map = _build_days_map_with_attendance(entries, computed)
-                    total_reg = sum(c.get("regular_hours") or 0 for c in computed)
-                    total_ot = sum(c.get("overtime_hours") or 0 for c in computed)
-                    rows.append({
-                        "full_name": emp["full_name"],
-                        "days": days_map,
-                        "attendance": min(total_reg, 40),
-                        "overtime_total": total_ot,
-                        "total_hours": min(total_reg, 40) + total_ot,
-                    })
-                rows.sort(key=lambda r: (r["full_name"] or "").upper())
-                combined_export_by_shift[shift_key] = rows
-            employee_rows = None  # not used; we use combined_export_by_shift
-        elif shift_export:
-            employee_rows = _build_shift_employee_rows(shift_export)
-        else:
-            # Combined export: one workbook with Day, Swing, Graveyard sheets (separate sections)
-            export_all_shifts = True
-            employee_rows = None  # Not used when export_all_shifts
+        out, filename = _build_admin_week_export(week_start_d, shift_export)
+        return flask.send_file(out, as_attachment=True, download_name=filename, mimetype=xlsx.XLSX_MIMETYPE)
+
+    # Employee export: the signed-in user's own week on one sheet (admins signed in as employees get an empty sheet).
+    user = flask.g.user
+    if user and user.get("is_admin"):
+        employee_rows = []
     else:
-        export_all_shifts = False
-        user = db.get_employee_by_id(flask.session["user_id"])
-        if user and user.get("is_admin"):
-            employee_rows = []
-        else:
-            entries = db.get_entries_for_week(flask.session["user_id"], week_start_d)
-            computed = logic.compute_weekly_overtime(entries)
-            days_map = _build_days_map_with_attendance(entries, computed)
-            total_reg = sum(c.get("regular_hours") or 0 for c in computed)
-            total_ot = sum(c.get("overtime_hours") or 0 for c in computed)
-            attendance = min(total_reg, 40)
-            overtime_total = total_ot
-            total_hours = attendance + overtime_total
-            employee_rows = [
-                {
-                    "full_name": user["full_name"],
-                    "days": days_map,
-                    "attendance": attendance,
-                    "overtime_total": overtime_total,
-                    "total_hours": total_hours,
-                }
-            ]
-
-    # Build list of 7 dates (Mon–Sun) and column layout
-    dates_in_week = []
-    d = week_start_d
-    while d <= week_end_d:
-        dates_in_week.append(d)
-        d += timedelta(days=1)
-
-    num_day_cols = 7 * 3
-    summary_cols = 3
-    total_cols = 3 + num_day_cols + summary_cols  # A=No., B=Position (Test), C=Name, then days, then summary
-
-    def _write_timesheet_sheet(ws, rows, sheet_title, shift_label):
-        """Write timesheet to match image: blue title, row 2 empty, row 3 date+day (Sat orange), row 4 No./Test/Name then Attendance/Overtime/Remark per day."""
-        cols = total_cols
-        ws.title = sheet_title
-        day_col_start = 4  # A=No., B=Test, C=Name; then 7*3 day cols; then summary
-        summary_col_start = day_col_start + num_day_cols
-        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=cols)
-        title_cell = ws.cell(row=1, column=1, value=f"Time Sheet {shift_label}")
-        title_cell.font = white_font
-        title_cell.fill = blue_fill
-        title_cell.border = border
-        title_cell.alignment = Alignment(horizontal="center")
-        for c in range(1, cols + 1):
-            ws.cell(row=2, column=c).border = border
-        for i, d in enumerate(dates_in_week):
-            col_start = day_col_start + i * 3
-            col_end = col_start + 2
-            ws.merge_cells(start_row=3, start_column=col_start, end_row=3, end_column=col_end)
-            cell = ws.cell(row=3, column=col_start, value=f"{d.month}/{d.day}\n{DAY_NAMES[d.weekday()]}")
-            cell.border = border
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            if d.weekday() == 5:
-                cell.fill = orange_fill
-            else:
-                cell.fill = grey_fill
-        for c in range(1, day_col_start):
-            ws.cell(row=3, column=c).border = border
-            ws.cell(row=3, column=c).fill = grey_fill
-        for c in range(summary_col_start, cols + 1):
-            ws.cell(row=3, column=c).border = border
-            ws.cell(row=3, column=c).fill = grey_fill
-        row4_headers = ["No.", "Test", "Name"] + [h for _ in dates_in_week for h in ("Attendance", "Overtime", "Remark")] + ["Attendance", "Overtime", "Total"]
-        for col, h in enumerate(row4_headers, 1):
-            cell = ws.cell(row=4, column=col, value=h)
-            cell.font = Font(bold=True)
-            cell.fill = orange_fill if col in (1, 2) else grey_fill
-            cell.border = border
-        for i in range(day_col_start, summary_col_start, 3):
-            if (i - day_col_start) // 3 == 5:
-                for j in range(3):
-                    ws.cell(row=4, column=i + j).fill = orange_fill
-        for idx, emp in enumerate(rows, 1):
-            row_num = 4 + idx
-            ws.cell(row=row_num, column=1, value=idx)
-            ws.cell(row=row_num, column=2, value="Test")
-            ws.cell(row=row_num, column=3, value=emp["full_name"])
-            for c in range(1, 4):
-                ce = ws.cell(row=row_num, column=c)
-                ce.border = border
-                if c in (1, 2):
-                    ce.fill = orange_fill
-            for i, d in enumerate(dates_in_week):
-                date_iso = d.isoformat()
-                day_data = emp.get("days", {}).get(date_iso, {})
-                att = day_data.get("attendance", 0) or 0
-                ot = day_data.get("overtime", 0) or 0
-                rem = day_data.get("remark", "") or ""
-                col_start = day_col_start + i * 3
-                att_val = round(att, 2) if att else ""
-                ot_val = round(ot, 2) if ot else ""
-                if rem and not att and not ot:
-                    att_val = ""
-                    ot_val = ""
-                ws.cell(row=row_num, column=col_start, value=att_val)
-                ws.cell(row=row_num, column=col_start + 1, value=ot_val)
-                ws.cell(row=row_num, column=col_start + 2, value=rem)
-                for j in range(3):
-                    ws.cell(row=row_num, column=col_start + j).border = border
-            ws.cell(row=row_num, column=summary_col_start, value=round(emp.get("attendance", 0), 2))
-            ws.cell(row=row_num, column=summary_col_start + 1, value=round(emp.get("overtime_total", 0), 2))
-            ws.cell(row=row_num, column=summary_col_start + 2, value=round(emp.get("total_hours", 0), 2))
-            for j in range(3):
-                ws.cell(row=row_num, column=summary_col_start + j).border = border
-
-    def _write_combined_sheet_by_sections(ws, rows_per_shift):
-        """Write one combined sheet with shifts separated by section rows; same attachment format (Attendance/Overtime/Remarks per day)."""
-        ws.title = "Combined"
-        shift_order = ("day", "swing", "graveyard", "unassigned")
-        day_col_start = 4
-        summary_col_start = day_col_start + num_day_cols
-        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=total_cols)
-        title_cell = ws.cell(row=1, column=1, value="Time Sheet Combined (All Shifts)")
-        title_cell.font = white_font
-        title_cell.fill = blue_fill
-        title_cell.border = border
-        title_cell.alignment = Alignment(horizontal="center")
-        for c in range(1, total_cols + 1):
-            ws.cell(row=2, column=c).border = border
-        for i, d in enumerate(dates_in_week):
-            col_start = day_col_start + i * 3
-            col_end = col_start + 2
-            ws.merge_cells(start_row=3, start_column=col_start, end_row=3, end_column=col_end)
-            cell = ws.cell(row=3, column=col_start, value=f"{d.month}/{d.day}\n{DAY_NAMES[d.weekday()]}")
-            cell.border = border
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            cell.fill = orange_fill if d.weekday() == 5 else grey_fill
-        for c in range(1, day_col_start):
-            ws.cell(row=3, column=c).border = border
-            ws.cell(row=3, column=c).fill = grey_fill
-        for c in range(summary_col_start, total_cols + 1):
-            ws.cell(row=3, column=c).border = border
-            ws.cell(row=3, column=c).fill = grey_fill
-        row4_headers = ["No.", "Test", "Name"] + [h for _ in dates_in_week for h in ("Attendance", "Overtime", "Remark")] + ["Attendance", "Overtime", "Total"]
-        for col, h in enumerate(row4_headers, 1):
-            cell = ws.cell(row=4, column=col, value=h)
-            cell.font = Font(bold=True)
-            cell.fill = orange_fill if col in (1, 2) else grey_fill
-            cell.border = border
-        for i in range(day_col_start, summary_col_start, 3):
-            if (i - day_col_start) // 3 == 5:
-                for j in range(3):
-                    ws.cell(row=4, column=i + j).fill = orange_fill
-        current_row = 5
-        for shift_key in shift_order:
-            rows = rows_per_shift.get(shift_key, [])
-            if not rows:
-                continue
-            ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=total_cols)
-            section_cell = ws.cell(row=current_row, column=1, value=f"{shift_key.capitalize()} shift")
-            section_cell.font = Font(bold=True)
-            section_cell.fill = grey_fill
-            section_cell.border = border
-            current_row += 1
-            for idx, emp in enumerate(rows, 1):
-                ws.cell(row=current_row, column=1, value=idx)
-                ws.cell(row=current_row, column=2, value="Test")
-                ws.cell(row=current_row, column=3, value=emp["full_name"])
-                for c in range(1, 4):
-                    ce = ws.cell(row=current_row, column=c)
-                    ce.border = border
-                    if c in (1, 2):
-                        ce.fill = orange_fill
-                for i, d in enumerate(dates_in_week):
-                    date_iso = d.isoformat()
-                    day_data = emp.get("days", {}).get(date_iso, {})
-                    att = day_data.get("attendance", 0) or 0
-                    ot = day_data.get("overtime", 0) or 0
-                    rem = day_data.get("remark", "") or ""
-                    col_start = day_col_start + i * 3
-                    att_val = round(att, 2) if att else ""
-                    ot_val = round(ot, 2) if ot else ""
-                    if rem and not att and not ot:
-                        att_val = ""
-                        ot_val = ""
-                    ws.cell(row=current_row, column=col_start, value=att_val)
-                    ws.cell(row=current_row, column=col_start + 1, value=ot_val)
-                    ws.cell(row=current_row, column=col_start + 2, value=rem)
-                    for j in range(3):
-                        ws.cell(row=current_row, column=col_start + j).border = border
-                ws.cell(row=current_row, column=summary_col_start, value=round(emp.get("attendance", 0), 2))
-                ws.cell(row=current_row, column=summary_col_start + 1, value=round(emp.get("overtime_total", 0), 2))
-                ws.cell(row=current_row, column=summary_col_start + 2, value=round(emp.get("total_hours", 0), 2))
-                for j in range(3):
-                    ws.cell(row=current_row, column=summary_col_start + j).border = border
-                current_row += 1
-
-    if export_combined:
-        wb = openpyxl.Workbook()
-        _write_combined_sheet_by_sections(wb.active, combined_export_by_shift)
-        filename = f"timesheet_week_{week_start}_combined.xlsx"
-    elif export_all_shifts:
-        # One workbook with 3 sheets: Day, Swing, Graveyard (combined export for admin)
-        rows_per_shift = {
-            "day": _build_shift_employee_rows("day"),
-            "swing": _build_shift_employee_rows("swing"),
-            "graveyard": _build_shift_employee_rows("graveyard"),
-        }
-        wb = openpyxl.Workbook()
-        _write_timesheet_sheet(wb.active, rows_per_shift["day"], "Day", "Day")
-        ws_swing = wb.create_sheet("Swing", 1)
-        _write_timesheet_sheet(ws_swing, rows_per_shift["swing"], "Swing", "Swing")
-        ws_graveyard = wb.create_sheet("Graveyard", 2)
-        _write_timesheet_sheet(ws_graveyard, rows_per_shift["graveyard"], "Graveyard", "Graveyard")
-        filename = f"timesheet_week_{week_start}_all_shifts.xlsx"
+        entries = db.get_entries_for_week(flask.session["user_id"], week_start_d)
+        computed = logic.compute_weekly_overtime(entries)
+        days_map = _build_days_map_with_attendance(entries, computed)
+        total_reg = sum(c.get("regular_hours") or 0 for c in computed)
+        total_ot = sum(c.get("overtime_hours") or 0 for c in computed)
+        attendance = min(total_reg, 40)
+        overtime_total = total_ot
+        total_hours = attendance + overtime_total
+        employee_rows = [
+            {
+                "full_name": user["full_name"],
+                "days": days_map,
+                "attendance": attendance,
+                "overtime_total": overtime_total,
+                "total_hours": total_hours,
+            }
+        ]
+
+    wb = xlsx.new_workbook()
+    title_text = f"Time Sheet {shift_export.capitalize()}" if shift_export else "Time Sheet Morning/Swing/Graveyard"
+    week_start = week_start_d.isoformat()
+    xlsx.write_timesheet_sheet(wb, employee_rows, f"Week {week_start}", title_text.replace("Time Sheet ", ""), _week_dates(week_start_d))
+    filename = f"timesheet_week_{week_start}_{shift_export}.xlsx" if shift_export else f"timesheet_week_{week_start}.xlsx"
+    return flask.send_file(xlsx.save_to_tempfile(wb), as_attachment=True, download_name=filename, mimetype=xlsx.XLSX_MIMETYPE)
+
+
+# --- Metrics ---
+
+def _metrics_groups():
+    """Process-wide counters shown with the request metrics: (Prometheus metric name, help, {stat: value})."""
+    return [
+        ("timesheet_db_pool", "SQLite connection pool counters.", db.pool_stats()),
+        ("timesheet_data_version_checks", "Cache version checks and data_versions re-reads.", db.version_check_stats()),
+        ("timesheet_employee_directory", "In-process employee list hits, loads and invalidations.", db.employee_directory.stats()),
+        ("timesheet_export_cache", "Admin week export cache counters.", export_cache.stats()),
+        ("timesheet_export_jobs", "Background export jobs by status.", export_jobs.stats()),
+        ("timesheet_notifications", "Notifications sent, retried and failed by this process.", notifier.stats()),
+    ]
+
+
+def _metrics_token_ok():
+    token = config.METRICS_TOKEN
+    return bool(token) and hmac.compare_digest(flask.request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    """Request profile and process counters: HTML for admins, or Prometheus text with ?format=prometheus (admins or METRICS_TOKEN)."""
+    if flask.request.args.get("format") == "prometheus" and _metrics_token_ok():
+        return _metrics_prometheus()
+    return _admin_metrics()
+
+
+@admin_required
+def _admin_metrics():
+    if flask.request.args.get("format") == "prometheus":
+        return _metrics_prometheus()
+    return flask.render_template(
+        "admin_metrics.html",
+        profiling_on=config.PROFILE_REQUESTS,
+        slow_sql_ms=config.PROFILE_SLOW_SQL_MS,
+        window=config.PROFILE_WINDOW,
+        metrics=request_metrics.snapshot(),
+        groups=_metrics_groups(),
+        pid=os.getpid(),
+    )
+
+
+def _metrics_prometheus():
+    text = request_metrics.prometheus(_metrics_groups())
+    return flask.Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/admin/metrics/reset", methods=["POST"])
+@admin_required
+def admin_metrics_reset():
+    request_metrics.reset()
+    return flask.redirect(flask.url_for("admin_metrics"))
+
+
+# --- Background export jobs ---
+
+@app.route("/admin/export-jobs", methods=["POST"])
+@admin_required
+def admin_export_job_create():
+    """Queue an export (kind=week with week_start/shift, kind=range with from/to/shift/layout, or kind=timeoff with from/to).
+    Returns the job id and status URL."""
+    args = flask.request.values
+    kind = args.get("kind")
+    if kind == "week":
+        week_start_d, shift_export = _parse_week_export_args(args.get("week_start") or "", args)
+        key = ("week", week_start_d.isoformat(), shift_export)
+        job_id = export_jobs.submit(key, lambda: _build_admin_week_export(week_start_d, shift_export))
+    elif kind == "range":
+        from_d, to_d, shift_export, layout = _parse_range_export_args(args)
+        key = ("range", from_d.isoformat(), to_d.isoformat(), shift_export, layout)
+        job_id = export_jobs.submit(key, lambda: _build_admin_range_export(from_d, to_d, shift_export, layout))
+    elif kind == "timeoff":
+        from_d, to_d = _timeoff_export_range(args)
+        key = ("timeoff", from_d.isoformat(), to_d.isoformat())
+        job_id = export_jobs.submit(key, lambda: _build_timeoff_export(from_d, to_d))
     else:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Week {week_start}"
-        title_text = f"Time Sheet {shift_export.capitalize()}" if shift_export else "Time Sheet Morning/Swing/Graveyard"
-        _write_timesheet_sheet(ws, employee_rows, ws.title, title_text.replace("Time Sheet ", ""))
-        filename = f"timesheet_week_{week_start}_{shift_export}.xlsx" if shift_export else f"timesheet_week_{week_start}.xlsx"
+        return flask.jsonify({"ok": False, "error": "Unknown export kind"}), 400
+    if job_id is None:
+        return flask.jsonify({"ok": False, "error": "Too many exports in progress; try again shortly"}), 429
+    return flask.jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status_url": flask.url_for("admin_export_job_status", job_id=job_id),
+    }), 202
 
-    buf = BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return flask.send_file(buf, as_attachment=True, download_name=filename, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+@app.route("/admin/export-jobs/<job_id>")
+@admin_required
+def admin_export_job_status(job_id):
+    job = export_jobs.get(job_id)
+    if not job:
+        return flask.jsonify({"ok": False, "error": "Export not found or expired"}), 404
+    body = {"ok": True, "job_id": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        body["filename"] = job["filename"]
+        body["download_url"] = flask.url_for("admin_export_job_download", job_id=job_id)
+    elif job["status"] == "failed":
+        body["error"] = job["error"]
+    return flask.jsonify(body)
+
+
+@app.route("/admin/export-jobs/<job_id>/download")
+@admin_required
+def admin_export_job_download(job_id):
+    job = export_jobs.get(job_id)
+    if not job or job["status"] != "done" or not os.path.isfile(job["path"]):
+        flask.abort(404)
+    return flask.send_file(job["path"], as_attachment=True, download_name=job["filename"], mimetype=xlsx.XLSX_MIMETYPE)
 
 
 if __name__ == "__main__":
-    db.init_db()
-    # Ensure at least one admin exists (recreate if accidentally deleted)
-    employees = db.list_employees()
-    has_admin = any(e.get("is_admin") for e in employees)
-    if not has_admin:
-        with db._conn() as conn:
-            db.create_employee(
-                conn,
-                "admin",
-                generate_password_hash("admin"),
-                "admin",
-                is_admin=True,
-            )
-        print("Default admin created: full name=admin, password=admin (Administrator privileges). Change after first login.")
-    port = int(os.environ.get("PORT", 5050))
+    port = config.PORT
     # Bind to all interfaces so everyone on the network can access
     host = "0.0.0.0"
     print(f"Timesheet running – network access enabled:")
@@ -1455,4 +1655,16 @@ if __name__ == "__main__":
     if lan_ip and not lan_ip.startswith("127."):
         print(f"  On your network: http://{lan_ip}:{port}")
     print("  (Others: use the 'On your network' URL. If blocked, allow Python in Windows Firewall.)")
-    app.run(host=host, port=port, debug=True)
+    if config.DEBUG:
+        # The reloader runs this file twice; only the serving child (WERKZEUG_RUN_MAIN) sends notifications.
+        create_app(start_notifier=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
+        app.run(host=host, port=port, debug=True)
+    else:
+        create_app()
+        try:
+            import waitress
+        except ImportError:
+            print("  waitress is not installed; using the threaded Werkzeug server (pip install waitress for production).")
+            app.run(host=host, port=port, threaded=True)
+        else:
+            waitress.serve(app, host=host, port=port, threads=config.SERVER_THREADS)
@@ -0,0 +1,422 @@
+"""
+Synthetic data and a benchmark suite for the timesheet app.
+
+    python benchmark.py generate --db benchmark.db --employees 300 --weeks 52
+    python benchmark.py run --db benchmark.db [--compare benchmarks/<earlier run>.json]
+    python benchmark.py compare benchmarks/<old>.json benchmarks/<new>.json
+
+generate fills a new database with employees across the day, swing and graveyard shifts (plus unassigned and
+contractors), weeks of punches (graveyard rows run past midnight) and time-off requests of 1 to 10 days in every status,
+all from a fixed random seed. run drives the main routes through the Flask test client as an admin and as an employee,
+cycling through the generated weeks and months so caches see realistic misses, and times compute_weekly_overtime on the
+stored weeks and cold starts (import app, then create_app, in fresh interpreters). Each result has latency percentiles
+(ms) and SQL statements per request; results are saved as JSON under benchmarks/ with the git commit, so runs from
+different commits can be compared.
+"""
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+from time import perf_counter
+
+import config
+import database as db
+import timesheet_batch as batch
+import timesheet_logic as logic
+
+RESULTS_DIR = os.path.join(config.BASE_DIR, "benchmarks")
+DEFAULT_DB = os.path.join(config.BASE_DIR, "benchmark.db")
+BENCH_ADMIN = "bench-admin"
+BENCH_EMPLOYEE = "bench0001"
+# Shift mix of generated employees; None = no shift assigned. Clock-in (HH, MM) and day length ranges per shift.
+SHIFT_WEIGHTS = (("day", 50), ("swing", 30), ("graveyard", 15), (None, 5))
+SHIFT_HOURS = {"day": ((6, 0), 8.5, 10.5), "swing": ((14, 0), 8.0, 9.5), "graveyard": ((22, 0), 8.0, 10.0), None: ((8, 0), 7.5, 9.0)}
+CONTRACTOR_SHARE = 0.1
+# A result is flagged by compare when its p50 is this much slower than before.
+REGRESSION_THRESHOLD = 0.2
+# Needed only by exports, badge imports and notifications; the startup benchmark reports any that load with the app.
+LAZY_MODULES = ("openpyxl", "numpy", "smtplib", "email.mime", "urllib.request")
+
+# Run in a fresh interpreter per start: argv = [database path, *LAZY_MODULES]. Prints one JSON line.
+_STARTUP_SCRIPT = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+import config
+config.DATABASE_PATH = sys.argv[1]
+import app, database as db
+imported = perf_counter()
+statements = []
+with db._conn() as conn:
+    conn.set_trace_callback(statements.append)
+    app.create_app(start_notifier=False)
+    conn.set_trace_callback(None)
+ready = perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (ready - imported) * 1000,
+                  "statements": len(statements), "modules": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def _hhmm(minutes):
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _day_punches(rng, shift):
+    """(clock_in, clock_out, lunch_start, lunch_end) for one worked day; graveyard days end after midnight."""
+    (hour, minute), shortest, longest = SHIFT_HOURS[shift]
+    start = hour * 60 + minute + rng.choice((-15, -10, -5, 0, 0, 0, 5, 10))
+    length = int(rng.uniform(shortest, longest) * 60) // 5 * 5
+    if rng.random() < 0.8:
+        lunch = start + 4 * 60 + rng.choice((0, 15, 30))
+        return _hhmm(start), _hhmm(start + length), _hhmm(lunch), _hhmm(lunch + 30)
+    return _hhmm(start), _hhmm(start + length), None, None
+
+
+def generate(employees=200, weeks=52, seed=1, timeoff_per_employee=4):
+    """
+    Fill config.DATABASE_PATH (which should be a new, empty database) with synthetic data: `employees` employees plus the
+    bench-admin account, `weeks` weeks of time entries ending with the current week, and about `timeoff_per_employee`
+    time-off requests per employee (about a third left pending, the rest approved, disapproved or discarded).
+    Every account's password is "bench". Returns counts: employees, time_entries, timeoff_requests.
+    """
+    from werkzeug.security import generate_password_hash
+
+    rng = random.Random(seed)
+    db.init_db()
+    password_hash = generate_password_hash("bench")
+    shifts, weights = zip(*SHIFT_WEIGHTS)
+    with db._conn() as conn:
+        db.create_employee(conn, BENCH_ADMIN, password_hash, "Bench Admin", is_admin=True)
+        staff = []
+        for i in range(1, employees + 1):
+            shift = rng.choices(shifts, weights)[0]
+            contractor = rng.random() < CONTRACTOR_SHARE
+            employee_id = db.create_employee(
+                conn, f"bench{i:04d}", password_hash, f"Bench Employee {i:04d}", shift=shift,
+                employment_type="contractor" if contractor else "full_time", fa_mtf=rng.choice(("fa", "mtf", None)),
+                badge_id=f"B{100000 + i}",
+            )
+            staff.append((employee_id, shift))
+
+    first_week = db.get_week_start(date.today()) - timedelta(weeks=weeks - 1)
+    days = []
+    for employee_id, shift in staff:
+        for w in range(weeks):
+            week_start = first_week + timedelta(weeks=w)
+            # Mostly Monday to Friday, with the odd Saturday and a few days missed.
+            for offset in range(7):
+                if (offset < 5 and rng.random() < 0.96) or (offset == 5 and rng.random() < 0.15):
+                    days.append((employee_id, week_start + timedelta(days=offset)) + _day_punches(rng, shift))
+    computed = batch.compute_days(*(batch.to_minutes([d[i] for d in days]) for i in range(2, 6)))
+    entries = [
+        (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, float(computed["total_hours"][i]), 0.0,
+         1 if computed["shift"][i] == "graveyard" else 0, computed["shift"][i], None)
+        for i, (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end) in enumerate(days)
+    ]
+    written = db.import_time_entries(entries)
+
+    last_day = first_week + timedelta(weeks=weeks) - timedelta(days=1)
+    span = (last_day - first_week).days
+    requests = {"approved": [], "rejected": [], "discard": []}
+    created = 0
+    for employee_id, _ in staff:
+        for _ in range(rng.randint(max(0, timeoff_per_employee - 2), timeoff_per_employee + 2)):
+            length = rng.choice((1, 1, 1, 2, 2, 3, 5, 5, 10))
+            from_d = first_week + timedelta(days=rng.randint(0, max(0, span - length)))
+            request_id = db.create_timeoff_request(employee_id, from_d, from_d + timedelta(days=length - 1),
+                                                   rng.choice(db.TIME_OFF_NOTES), hours_per_day=rng.choice((8, 8, 8, 4)))
+            created += 1
+            outcome = rng.random()
+            if outcome < 0.45:
+                requests["approved"].append(request_id)
+            elif outcome < 0.55:
+                requests["rejected"].append(request_id)
+            elif outcome < 0.65:
+                requests["discard"].append((request_id, employee_id))
+    db.set_timeoff_request_statuses(requests["approved"], "approved")
+    db.set_timeoff_request_statuses(requests["rejected"], "rejected")
+    for request_id, employee_id in requests["discard"]:
+        db.discard_timeoff_request(request_id, employee_id)
+    return {"employees": employees, "time_entries": written, "timeoff_requests": created}
+
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _summary(timings_ms, statements=None):
+    timings_ms = sorted(timings_ms)
+    result = {
+        "n": len(timings_ms),
+        "mean_ms": round(sum(timings_ms) / len(timings_ms), 3),
+        "p50_ms": round(_percentile(timings_ms, 50), 3),
+        "p90_ms": round(_percentile(timings_ms, 90), 3),
+        "p99_ms": round(_percentile(timings_ms, 99), 3),
+        "max_ms": round(timings_ms[-1], 3),
+    }
+    if statements is not None:
+        result["statements"] = max(statements)
+    return result
+
+
+def _dataset(conn):
+    weeks = [date.fromisoformat(r[0]) for r in conn.execute("SELECT DISTINCT week_start FROM time_entries ORDER BY week_start")]
+    counts = {
+        "employees": conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0],
+        "time_entries": conn.execute("SELECT COUNT(*) FROM time_entries").fetchone()[0],
+        "timeoff_requests": conn.execute("SELECT COUNT(*) FROM time_off_requests").fetchone()[0],
+        "weeks": len(weeks),
+    }
+    return weeks, counts
+
+
+def _routes(weeks):
+    """(name, role, method, url or url builder taking the iteration number, JSON body builder or None)."""
+    months = sorted({(w.year, w.month) for w in weeks})
+
+    def week(i):
+        return weeks[i % len(weeks)].isoformat()
+
+    def month(i):
+        return months[i % len(months)]
+
+    def save_body(i):
+        work_date = weeks[i % len(weeks)] + timedelta(days=i % 5)
+        return {"work_date": work_date.isoformat(), "clock_in": "07:00", "clock_out": "15:30"}
+
+    return [
+        ("timesheet_employee", "employee", "GET", lambda i: f"/timesheet?week={week(i)}", None),
+        ("timesheet_admin_combined", "admin", "GET", lambda i: f"/timesheet?week={week(i)}&shift=combined", None),
+        ("api_roster_week", "admin", "GET", lambda i: f"/api/roster/week?week={week(i)}", None),
+        ("export_week_combined", "admin", "GET", lambda i: f"/export/week/{week(i)}?shift=combined", None),
+        ("admin_timeoff_calendar", "admin", "GET", lambda i: "/admin/timeoff/calendar?year=%d&month=%d" % month(i), None),
+        ("admin_timeoff", "admin", "GET", lambda i: "/admin/timeoff", None),
+        # Last: a save bumps the week's data version, which is what the read routes cache on.
+        ("timesheet_save", "employee", "POST", lambda i: "/timesheet/save", save_body),
+    ]
+
+
+def run(iterations=50, warmup=3, only=None):
+    """
+    Benchmark the routes and compute_weekly_overtime against config.DATABASE_PATH. Each route is requested `warmup` times
+    untimed, then `iterations` times; the admin week export cache is cleared before every export so each one is built.
+    SQL statements are counted with a trace callback on the connection the requests share. Returns the result document.
+    """
+    import app as timesheet_app
+
+    app = timesheet_app.create_app(start_notifier=False)
+    results = {}
+    with db._conn() as conn:
+        weeks, counts = _dataset(conn)
+        if not weeks:
+            raise SystemExit(f"No time entries in {config.DATABASE_PATH}; run `python benchmark.py generate` first.")
+        admin = db.get_employee_by_username(BENCH_ADMIN)
+        employee = db.get_employee_by_username(BENCH_EMPLOYEE)
+        if not admin or not employee:
+            raise SystemExit(f"{config.DATABASE_PATH} was not made by `python benchmark.py generate` (no {BENCH_ADMIN}).")
+        clients = {}
+        for role, user in (("admin", admin), ("employee", employee)):
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["user_id"] = user["id"]
+                session["full_name"] = user["full_name"]
+                session["is_admin"] = bool(user["is_admin"])
+            clients[role] = client
+
+        statements = []
+        # Requests run on this thread, so the app reuses this connection and every statement is traced.
+        conn.set_trace_callback(statements.append)
+        try:
+            for name, role, method, url, body in _routes(weeks):
+                if only and name not in only:
+                    continue
+                client = clients[role]
+                timings, counted = [], []
+                for i in range(warmup + iterations):
+                    if name.startswith("export_week"):
+                        timesheet_app.export_cache.clear()
+                    statements.clear()
+                    start = perf_counter()
+                    response = client.open(url(i), method=method, json=body(i) if body else None)
+                    response.get_data()
+                    elapsed = (perf_counter() - start) * 1000
+                    response.close()
+                    if response.status_code != 200:
+                        raise SystemExit(f"{name}: {method} {url(i)} returned {response.status_code}")
+                    if i >= warmup:
+                        timings.append(elapsed)
+                        counted.append(len(statements))
+                results[name] = _summary(timings, counted)
+        finally:
+            conn.set_trace_callback(None)
+
+        if not only or "compute_weekly_overtime" in only:
+            # One call per employee week, over the most recent weeks.
+            timings = []
+            for week_start in weeks[-8:]:
+                for entries in db.get_entries_for_week_by_employee(week_start).values():
+                    start = perf_counter()
+                    logic.compute_weekly_overtime(entries)
+                    timings.append((perf_counter() - start) * 1000)
+            results["compute_weekly_overtime"] = _summary(timings)
+
+    startup_modules = None
+    if not only or "startup" in only:
+        results["startup_import"], results["startup_create_app"], startup_modules = startup()
+
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "database": os.path.basename(config.DATABASE_PATH),
+        "dataset": counts,
+        "iterations": iterations,
+        "results": results,
+        "startup_modules": startup_modules,
+    }
+
+
+def startup(runs=10):
+    """
+    Start the app `runs` times, each in a fresh interpreter against config.DATABASE_PATH (already migrated): time
+    `import app` and create_app() and count the SQL statements create_app runs (one PRAGMA user_version read and the
+    admin check when nothing needs migrating). Returns (import summary, create_app summary, LAZY_MODULES loaded).
+    """
+    imports, creates, statements, modules = [], [], [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, config.DATABASE_PATH, *LAZY_MODULES], cwd=config.BASE_DIR,
+                             capture_output=True, text=True, check=True)
+        timing = json.loads(out.stdout.strip().splitlines()[-1])
+        imports.append(timing["import_ms"])
+        creates.append(timing["create_app_ms"])
+        statements.append(timing["statements"])
+        modules.update(timing["modules"])
+    return _summary(imports), _summary(creates, statements), sorted(modules)
+
+
+def _git_commit():
+    """Short HEAD commit, with '+dirty' when the tree has uncommitted changes; None outside a git checkout."""
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=config.BASE_DIR, capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=config.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return head.stdout.strip() + ("+dirty" if status.stdout.strip() else "")
+
+
+def save_results(document, directory=RESULTS_DIR):
+    """Write a run's results to directory/<UTC time>-<commit>.json and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = document["created_at"].replace(":", "").replace("-", "").rstrip("Z")
+    path = os.path.join(directory, f"{stamp}-{document['commit'] or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return path
+
+
+def print_results(document):
+    print(f"{document['database']}: {document['dataset']['employees']} employees, {document['dataset']['time_entries']} time entries, "
+          f"{document['dataset']['timeoff_requests']} time-off requests, {document['dataset']['weeks']} weeks; commit {document['commit']}")
+    print(f"{'':28s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'max ms':>9s} {'stmts':>6s}")
+    for name, r in document["results"].items():
+        print(f"{name:28s} {r['p50_ms']:9.2f} {r['p90_ms']:9.2f} {r['p99_ms']:9.2f} {r['max_ms']:9.2f} {r.get('statements', ''):>6}")
+    if document.get("startup_modules"):
+        print(f"Loaded at startup (should load on first use): {', '.join(document['startup_modules'])}")
+
+
+def compare(old, new):
+    """
+    Print p50/p90 and statement counts of two result documents side by side. Returns the names whose p50 got more than
+    REGRESSION_THRESHOLD slower or that run more statements than before, plus "startup_modules" when startup now
+    loads one of LAZY_MODULES.
+    """
+    regressions = []
+    print(f"{old['commit']} -> {new['commit']}")
+    if old["dataset"] != new["dataset"]:
+        print(f"  (datasets differ: {old['dataset']} vs {new['dataset']})")
+    print(f"{'':28s} {'p50 ms':>17s} {'change':>7s} {'p90 ms':>17s} {'stmts':>9s}")
+    for name, r in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            print(f"{name:28s} {'':>8s} {r['p50_ms']:8.2f} {'new':>7s}")
+            continue
+        change = (r["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0.0
+        stmts = f"{before.get('statements', '')}->{r.get('statements', '')}" if "statements" in r else ""
+        slower = change > REGRESSION_THRESHOLD or r.get("statements", 0) > before.get("statements", 0)
+        if slower:
+            regressions.append(name)
+        print(f"{name:28s} {before['p50_ms']:8.2f} {r['p50_ms']:8.2f} {change:+7.0%} {before['p90_ms']:8.2f} "
+              f"{r['p90_ms']:8.2f} {stmts:>9s}{'  <-- slower' if slower else ''}")
+    eager = set(new.get("startup_modules") or ()) - set(old.get("startup_modules") or ())
+    if eager:
+        regressions.append("startup_modules")
+        print(f"Now loaded at startup: {', '.join(sorted(eager))}  <-- slower")
+    return regressions
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Timesheet synthetic data and benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="create a new database filled with synthetic data")
+    gen.add_argument("--db", default=DEFAULT_DB, help="database file to create (default: benchmark.db)")
+    gen.add_argument("--employees", type=int, default=200)
+    gen.add_argument("--weeks", type=int, default=52, help="weeks of time entries, ending with the current week")
+    gen.add_argument("--timeoff", type=int, default=4, help="time-off requests per employee (on average)")
+    gen.add_argument("--seed", type=int, default=1)
+    gen.add_argument("--replace", action="store_true", help="delete the database file first if it exists")
+    bench = sub.add_parser("run", help="benchmark routes against a generated database and save the results")
+    bench.add_argument("--db", default=DEFAULT_DB)
+    bench.add_argument("--iterations", type=int, default=50, help="timed requests per route")
+    bench.add_argument("--warmup", type=int, default=3, help="untimed requests per route first")
+    bench.add_argument("--only", nargs="+", help="benchmark names to run, or startup (default: all)")
+    bench.add_argument("--compare", metavar="RESULTS_JSON", help="earlier results to compare against")
+    bench.add_argument("--no-save", action="store_true", help="print results without writing them to benchmarks/")
+    cmp = sub.add_parser("compare", help="compare two saved result files")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(1 if compare(_load(args.old), _load(args.new)) else 0)
+    config.DATABASE_PATH = os.path.abspath(args.db)
+    if args.command == "generate":
+        if os.path.exists(config.DATABASE_PATH):
+            if not args.replace:
+                sys.exit(f"{config.DATABASE_PATH} already exists; pass --replace to overwrite it.")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(config.DATABASE_PATH + suffix):
+                    os.remove(config.DATABASE_PATH + suffix)
+        start = perf_counter()
+        counts = generate(args.employees, args.weeks, args.seed, args.timeoff)
+        print(f"Generated {counts['employees']} employees, {counts['time_entries']} time entries and "
+              f"{counts['timeoff_requests']} time-off requests in {config.DATABASE_PATH} ({perf_counter() - start:.1f}s). "
+              f"Password for every account: bench.")
+    else:
+        if not os.path.exists(config.DATABASE_PATH):
+            sys.exit(f"{config.DATABASE_PATH} not found; run `python benchmark.py generate` first.")
+        document = run(args.iterations, args.warmup, args.only)
+        print_results(document)
+        if not args.no_save:
+            print(f"Saved {save_results(document)}")
+        if args.compare:
+            print()
+            sys.exit(1 if compare(_load(args.compare), document) else 0)
@@ -3,6 +3,43 @@ import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, "timesheet.db")
+# SQLite connection pool: idle connections kept for reuse, lock wait (ms) before "database is locked",
+# and prepared statements cached per connection.
+DB_POOL_SIZE = int(os.environ.get("TIMESHEET_DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("TIMESHEET_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("TIMESHEET_DB_STATEMENT_CACHE_SIZE", "256"))
+# Seconds to cache employee rows looked up by id in this process (0 = off). Edits/deletes from any process invalidate immediately.
+EMPLOYEE_CACHE_TTL = float(os.environ.get("TIMESHEET_EMPLOYEE_CACHE_TTL", "0"))
+# In-memory cache of generated admin week exports (.xlsx bytes), least recently used evicted past this size (0 = off).
+EXPORT_CACHE_MAX_BYTES = int(float(os.environ.get("TIMESHEET_EXPORT_CACHE_MB", "64")) * 1024 * 1024)
+# Background export jobs: worker threads, seconds a finished file stays downloadable, and max queued/running jobs.
+EXPORT_JOB_WORKERS = int(os.environ.get("TIMESHEET_EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_TTL_SECONDS = int(os.environ.get("TIMESHEET_EXPORT_JOB_TTL", "900"))
+EXPORT_JOB_MAX_PENDING = int(os.environ.get("TIMESHEET_EXPORT_JOB_MAX_PENDING", "20"))
+# Where finished exports and their status files are kept; must be shared by all worker processes of this deployment,
+# owned by the user the app runs as and mode 0700 (default: <database name>-exports next to DATABASE_PATH).
+EXPORT_JOB_DIR = os.environ.get("TIMESHEET_EXPORT_JOB_DIR") or None
+# Time-off notification outbox: delivery attempts before a message is marked failed, retry backoff (doubles per attempt,
+# capped), how often the sender checks for due retries, and how long an idle SMTP session is kept open.
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get("TIMESHEET_NOTIFY_MAX_ATTEMPTS", "6"))
+NOTIFY_RETRY_BASE_SECONDS = int(os.environ.get("TIMESHEET_NOTIFY_RETRY_BASE", "30"))
+NOTIFY_RETRY_MAX_SECONDS = int(os.environ.get("TIMESHEET_NOTIFY_RETRY_MAX", "3600"))
+NOTIFY_POLL_SECONDS = int(os.environ.get("TIMESHEET_NOTIFY_POLL", "30"))
+NOTIFY_SMTP_IDLE_SECONDS = int(os.environ.get("TIMESHEET_NOTIFY_SMTP_IDLE", "60"))
+# Badge / clock-system import: time entries written per transaction (totals for the touched weeks are refreshed per batch).
+IMPORT_BATCH_SIZE = int(os.environ.get("TIMESHEET_IMPORT_BATCH_SIZE", "5000"))
+# python app.py: port, Werkzeug dev server with debugger and reloader (TIMESHEET_DEBUG=1) or the production server
+# (waitress, when installed) with this many request threads.
+PORT = int(os.environ.get("PORT", "5050"))
+DEBUG = os.environ.get("TIMESHEET_DEBUG", "").strip().lower() in ("1", "true", "yes")
+SERVER_THREADS = int(os.environ.get("TIMESHEET_SERVER_THREADS", "16"))
+# Opt-in request profiling (Admin → Metrics): wall time, SQL statements and SQL time per endpoint over each endpoint's
+# last PROFILE_WINDOW requests; statements slower than PROFILE_SLOW_SQL_MS are kept with their EXPLAIN QUERY PLAN.
+PROFILE_REQUESTS = os.environ.get("TIMESHEET_PROFILE", "").strip().lower() in ("1", "true", "yes")
+PROFILE_WINDOW = int(os.environ.get("TIMESHEET_PROFILE_WINDOW", "500"))
+PROFILE_SLOW_SQL_MS = float(os.environ.get("TIMESHEET_PROFILE_SLOW_SQL_MS", "50"))
+# Bearer token that lets a Prometheus scraper read /admin/metrics?format=prometheus without an admin login (unset = admins only).
+METRICS_TOKEN = os.environ.get("TIMESHEET_METRICS_TOKEN") or None
 SECRET_KEY = os.environ.get("TIMESHEET_SECRET_KEY", "change-me-in-production-use-env-var")
 
 # Master password: if set, Administrator can log in as any employee by entering that
@@ -26,6 +63,23 @@ SWING_SHIFT_END_HOUR = float(os.environ.get("TIMESHEET_SWING_SHIFT_END", "23.75"
 GRAVEYARD_START_HOUR = int(os.environ.get("TIMESHEET_GRAVEYARD_START", "22"))
 GRAVEYARD_END_HOUR = int(os.environ.get("TIMESHEET_GRAVEYARD_END", "6"))
 
+
+def _parse_shift_windows(value):
+    """'name=start-end,...' (hours as float) -> [(name, start_hour, end_hour)], or None when empty."""
+    windows = []
+    for item in value.split(","):
+        if item.strip():
+            name, _, hours = item.partition("=")
+            start, _, end = hours.partition("-")
+            windows.append((name.strip().lower(), float(start), float(end)))
+    return windows or None
+
+
+# Optional shift windows used to classify time entries instead of the three above, in tie-break order (first listed
+# wins a tie); an end at or before the start wraps past midnight. E.g. "night=22-6,early=4-8,day=8-16,late=16-22".
+# None = graveyard, swing, day from the settings above. Employees are still assigned (and rostered) day, swing or graveyard.
+SHIFT_WINDOWS = _parse_shift_windows(os.environ.get("TIMESHEET_SHIFT_WINDOWS", ""))
+
 # Time-off notification: only Admin → Settings (no default email in code)
 TIMEOFF_NOTIFY_EMAIL = os.environ.get("TIMESHEET_TIMEOFF_NOTIFY_EMAIL", "")
 # SMTP (optional): set to send time-off emails. Default account committed for convenience; override with env TIMESHEET_SMTP_* or email_config.env.
@@ -73,6 +127,8 @@ if os.path.isfile(_email_config_path):
                     GRAVEYARD_START_HOUR = int(v) if v else 22
                 elif k == "TIMESHEET_GRAVEYARD_END":
                     GRAVEYARD_END_HOUR = int(v) if v else 6
+                elif k == "TIMESHEET_SHIFT_WINDOWS":
+                    SHIFT_WINDOWS = _parse_shift_windows(v)
     except Exception:
         pass
     if SMTP_USER and (not SMTP_FROM or SMTP_FROM == "timesheet@localhost"):
@@ -2,113 +2,655 @@
 SQLite schema and helpers for timesheet: employees and time entries.
 Work week: Monday–Sunday. Entries store clock-in/out per day.
 """
+import itertools
 import sqlite3
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime, date, time, timedelta
+from time import monotonic, perf_counter
 
 import config
+import timesheet_logic as logic
 
 # Sentinel for "argument not provided" so we can distinguish None (clear FA/MTF) from omit (don't change).
 _NOT_GIVEN = object()
 
 
+# Longest a starting process waits for another one to finish init_db (migrations can rewrite large tables).
+INIT_LOCK_TIMEOUT_MS = 120000
+
+# PRAGMA user_version holds the schema version (migrations run, see _MIGRATIONS) * 10000 + the hours views' daily cap
+# in hundredths, so a database that is up to date for this code and config is recognised by reading that one pragma.
+_SCHEMA_STAMP_BASE = 10000
+
+
+def _schema_stamp():
+    """user_version of a database migrated to SCHEMA_VERSION with hours views for the current REGULAR_HOURS_PER_DAY."""
+    return SCHEMA_VERSION * _SCHEMA_STAMP_BASE + int(round(config.REGULAR_HOURS_PER_DAY * 100))
+
+
 def init_db():
-    """Create tables if they don't exist."""
-    with _conn() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                full_name TEXT NOT NULL,
-                is_admin INTEGER NOT NULL DEFAULT 0,
-                shift TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
-        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_username ON employees(username)")
-
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS time_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
-                work_date TEXT NOT NULL,
-                clock_in TEXT,
-                clock_out TEXT,
-                lunch_start TEXT,
-                lunch_end TEXT,
-                regular_hours REAL NOT NULL DEFAULT 0,
-                overtime_hours REAL NOT NULL DEFAULT 0,
-                is_graveyard INTEGER NOT NULL DEFAULT 0,
-                notes TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                UNIQUE(employee_id, work_date)
-            )
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_time_entries_employee ON time_entries(employee_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_time_entries_work_date ON time_entries(work_date)")
-        # Migration: add lunch columns if table existed without them
-        cur = conn.execute("PRAGMA table_info(time_entries)")
-        cols = [row[1] for row in cur.fetchall()]
-        if "lunch_start" not in cols:
-            conn.execute("ALTER TABLE time_entries ADD COLUMN lunch_start TEXT")
-        if "lunch_end" not in cols:
-            conn.execute("ALTER TABLE time_entries ADD COLUMN lunch_end TEXT")
-        if "shift" not in cols:
-            conn.execute("ALTER TABLE time_entries ADD COLUMN shift TEXT")
-        # Migration: add shift column to employees (day, swing, graveyard)
-        cur = conn.execute("PRAGMA table_info(employees)")
-        emp_cols = [row[1] for row in cur.fetchall()]
-        if "shift" not in emp_cols:
-            conn.execute("ALTER TABLE employees ADD COLUMN shift TEXT")
-        if "employment_type" not in emp_cols:
-            conn.execute("ALTER TABLE employees ADD COLUMN employment_type TEXT")
-        if "fa_mtf" not in emp_cols:
-            conn.execute("ALTER TABLE employees ADD COLUMN fa_mtf TEXT")
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS time_off_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
-                from_date TEXT NOT NULL,
-                to_date TEXT NOT NULL,
-                notes TEXT NOT NULL,
-                hours_per_day REAL NOT NULL DEFAULT 8,
-                status TEXT NOT NULL DEFAULT 'pending',
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_employee ON time_off_requests(employee_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_status ON time_off_requests(status)")
-        # Migration: add admin_notes for admin to store notes on time-off requests
-        cur = conn.execute("PRAGMA table_info(time_off_requests)")
-        tor_cols = [row[1] for row in cur.fetchall()]
-        if "admin_notes" not in tor_cols:
-            conn.execute("ALTER TABLE time_off_requests ADD COLUMN admin_notes TEXT")
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS app_settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        """)
-        conn.commit()
+    """
+    Create tables if they don't exist and run pending migrations. An up-to-date database costs one PRAGMA user_version
+    read. When REGULAR_HOURS_PER_DAY differs from the cap recorded there, employee_week_totals is rebuilt in the same
+    transaction. Safe to run from several processes at once: migrations happen in one write transaction, so other
+    workers wait (up to INIT_LOCK_TIMEOUT_MS) and then find them done.
+    """
+    stamp = _schema_stamp()
+    with _conn() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] == stamp:
+            return
+        conn.execute(f"PRAGMA busy_timeout={INIT_LOCK_TIMEOUT_MS}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Read again under the lock: another worker may have migrated while this one waited.
+            version, cap = divmod(conn.execute("PRAGMA user_version").fetchone()[0], _SCHEMA_STAMP_BASE)
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(f"{config.DATABASE_PATH} has schema version {version}, newer than this code ({SCHEMA_VERSION}).")
+            for migrate in _MIGRATIONS[version:]:
+                migrate(conn)
+            _create_hours_views(conn)
+            if cap != stamp % _SCHEMA_STAMP_BASE:
+                # Stored week totals were computed with another daily cap (or before the cap was recorded).
+                _rebuild_week_totals(conn)
+            conn.execute(f"PRAGMA user_version = {stamp}")
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+
+
+def has_admin():
+    """True if any admin account exists (a plain read; ensure_admin re-checks under the write lock)."""
+    with _conn() as conn:
+        return conn.execute("SELECT 1 FROM employees WHERE is_admin = 1 LIMIT 1").fetchone() is not None
+
+
+def ensure_admin(username, password_hash, full_name):
+    """Create this admin account if no admin exists (checked under a write lock, so concurrent workers create at most one). Returns True if created."""
+    with _conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM employees WHERE is_admin = 1 LIMIT 1").fetchone():
+            conn.rollback()
+            return False
+        create_employee(conn, username, password_hash, full_name, is_admin=True)
+    return True
+
+
+def _create_schema(conn):
+    """
+    Migration 1: every table, index and column up to schema version 1, on an empty database or one from before
+    schema versions (hence the table_info checks).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            is_admin INTEGER NOT NULL DEFAULT 0,
+            shift TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_username ON employees(username)")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS time_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
+            work_date TEXT NOT NULL,
+            clock_in TEXT,
+            clock_out TEXT,
+            lunch_start TEXT,
+            lunch_end TEXT,
+            regular_hours REAL NOT NULL DEFAULT 0,
+            overtime_hours REAL NOT NULL DEFAULT 0,
+            is_graveyard INTEGER NOT NULL DEFAULT 0,
+            notes TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            UNIQUE(employee_id, work_date)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_entries_employee ON time_entries(employee_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_entries_work_date ON time_entries(work_date)")
+    # Migration: add lunch columns if table existed without them
+    cur = conn.execute("PRAGMA table_info(time_entries)")
+    cols = [row[1] for row in cur.fetchall()]
+    if "lunch_start" not in cols:
+        conn.execute("ALTER TABLE time_entries ADD COLUMN lunch_start TEXT")
+    if "lunch_end" not in cols:
+        conn.execute("ALTER TABLE time_entries ADD COLUMN lunch_end TEXT")
+    if "shift" not in cols:
+        conn.execute("ALTER TABLE time_entries ADD COLUMN shift TEXT")
+    # Migration: clock / lunch times as integer minutes since midnight (NULL when empty), written alongside the
+    # 'HH:MM' text by every time_entries write so hours can be computed in SQL (see the time_entry_hours view).
+    if "clock_in_min" not in cols:
+        for col in _MINUTE_COLUMNS:
+            conn.execute(f"ALTER TABLE time_entries ADD COLUMN {col} INTEGER")
+        rows = conn.execute("SELECT id, clock_in, clock_out, lunch_start, lunch_end FROM time_entries").fetchall()
+        conn.executemany(
+            "UPDATE time_entries SET clock_in_min = ?, clock_out_min = ?, lunch_start_min = ?, lunch_end_min = ? WHERE id = ?",
+            [_entry_minutes(r["clock_in"], r["clock_out"], r["lunch_start"], r["lunch_end"]) + (r["id"],) for r in rows],
+        )
+    # Migration: Monday of work_date, written by every time_entries write, so week fetches are equality lookups.
+    if "week_start" not in cols:
+        conn.execute("ALTER TABLE time_entries ADD COLUMN week_start TEXT")
+        conn.execute(f"UPDATE time_entries SET week_start = {_WEEK_START_SQL.format(col='work_date')}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_entries_week ON time_entries(week_start, employee_id, work_date)")
+    # Migration: add shift column to employees (day, swing, graveyard)
+    cur = conn.execute("PRAGMA table_info(employees)")
+    emp_cols = [row[1] for row in cur.fetchall()]
+    if "shift" not in emp_cols:
+        conn.execute("ALTER TABLE employees ADD COLUMN shift TEXT")
+    if "employment_type" not in emp_cols:
+        conn.execute("ALTER TABLE employees ADD COLUMN employment_type TEXT")
+    if "fa_mtf" not in emp_cols:
+        conn.execute("ALTER TABLE employees ADD COLUMN fa_mtf TEXT")
+    # Badge / clock-system number, used to match rows when importing punches (timesheet_import).
+    if "badge_id" not in emp_cols:
+        conn.execute("ALTER TABLE employees ADD COLUMN badge_id TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_badge_id ON employees(badge_id) WHERE badge_id IS NOT NULL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS time_off_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
+            from_date TEXT NOT NULL,
+            to_date TEXT NOT NULL,
+            notes TEXT NOT NULL,
+            hours_per_day REAL NOT NULL DEFAULT 8,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_employee ON time_off_requests(employee_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_status ON time_off_requests(status)")
+    # Migration: add admin_notes for admin to store notes on time-off requests
+    cur = conn.execute("PRAGMA table_info(time_off_requests)")
+    tor_cols = [row[1] for row in cur.fetchall()]
+    if "admin_notes" not in tor_cols:
+        conn.execute("ALTER TABLE time_off_requests ADD COLUMN admin_notes TEXT")
+    # Keyset pagination of the admin request list (newest first), optionally narrowed to one status or employee.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_created ON time_off_requests(created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_status_created ON time_off_requests(status, created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_employee_created ON time_off_requests(employee_id, created_at, id)")
+    # The list's "overlapping from..to" filter (from_date <= to AND to_date >= from).
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_requests_dates ON time_off_requests(to_date, from_date)")
+    # One row per day of each time-off request (status/notes copied from the request) so calendar and
+    # timesheet lookups by date are index range scans instead of expanding from_date..to_date in Python.
+    days_existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'time_off_request_days'"
+    ).fetchone() is not None
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS time_off_request_days (
+            request_id INTEGER NOT NULL REFERENCES time_off_requests(id) ON DELETE CASCADE,
+            employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
+            work_date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            notes TEXT NOT NULL,
+            PRIMARY KEY (request_id, work_date)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_request_days_date_status ON time_off_request_days(work_date, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_time_off_request_days_employee_date ON time_off_request_days(employee_id, work_date)")
+    if not days_existed:
+        _expand_timeoff_request_days(conn)
+    # Outgoing time-off emails / Teams posts, written in the same transaction as the request and delivered by
+    # notifications.OutboxDispatcher. status: pending -> sending (leased until locked_until) -> sent | failed.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            locked_until TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(status, next_attempt_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    # Weekly totals per employee, kept in step with time_entries by every write path below.
+    # worked_* exclude time-off days (Sick leave, PTO, Non Pay) so contractor views can drop them.
+    totals_existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employee_week_totals'"
+    ).fetchone() is not None
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS employee_week_totals (
+            employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
+            week_start TEXT NOT NULL,
+            regular_hours REAL NOT NULL DEFAULT 0,
+            overtime_hours REAL NOT NULL DEFAULT 0,
+            attendance REAL NOT NULL DEFAULT 0,
+            total_hours REAL NOT NULL DEFAULT 0,
+            worked_regular_hours REAL NOT NULL DEFAULT 0,
+            worked_overtime_hours REAL NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (employee_id, week_start)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_employee_week_totals_week ON employee_week_totals(week_start)")
+    # Change counters bumped in the same transaction as the data they describe (see _bump_data_version).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    _create_hours_views(conn)
+    if not totals_existed:
+        _rebuild_week_totals(conn)
+
+
+# Schema migrations in order; a database that has run the first N of them has schema version N. Append a function
+# (taking the connection, run inside init_db's transaction) for every schema change; never edit or reorder released ones.
+_MIGRATIONS = (_create_schema,)
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+# Monday of an ISO date column in SQL (strftime %w: Sunday = 0).
+_WEEK_START_SQL = "date({col}, '-' || ((CAST(strftime('%w', {col}) AS INTEGER) + 6) % 7) || ' days')"
+
+# time_entries columns holding clock_in, clock_out, lunch_start, lunch_end as minutes since midnight.
+_MINUTE_COLUMNS = ("clock_in_min", "clock_out_min", "lunch_start_min", "lunch_end_min")
+
+
+def _minute_of_day(value):
+    """'HH:MM' (or 'HH:MM:SS', seconds dropped) -> minutes since midnight; None when empty or invalid."""
+    t = logic.parse_time(value) if value else None
+    return t.hour * 60 + t.minute if t else None
+
+
+def _entry_minutes(clock_in, clock_out, lunch_start, lunch_end):
+    """Values for _MINUTE_COLUMNS from the text times."""
+    return tuple(_minute_of_day(v) for v in (clock_in, clock_out, lunch_start, lunch_end))
+
+
+# Per-entry hours with the same rules as timesheet_logic.compute_weekly_overtime: worked minutes are (out - in) minus
+# lunch, overnight-aware; a day's hours are 0 for Non Pay, else the stored regular + overtime, else worked minutes;
+# regular is capped at REGULAR_HOURS_PER_DAY and the rest is overtime.
+_TIME_ENTRY_HOURS_VIEW = """
+    CREATE VIEW time_entry_hours AS
+    SELECT id, employee_id, work_date, week_start, notes, worked_minutes, day_hours,
+           round(min(day_hours, {cap}), 2) AS regular_hours,
+           round(max(0, day_hours - {cap}), 2) AS overtime_hours,
+           coalesce(notes IN ({time_off}), 0) AS is_time_off
+    FROM (
+        SELECT *,
+               CASE WHEN trim(notes) = 'Non Pay' THEN 0
+                    WHEN stored_hours > 0 THEN stored_hours
+                    ELSE round(worked_minutes / 60.0, 2) END AS day_hours
+        FROM (
+            SELECT id, employee_id, work_date, week_start, notes,
+                   coalesce(regular_hours, 0) + coalesce(overtime_hours, 0) AS stored_hours,
+                   CASE WHEN clock_in_min IS NULL OR clock_out_min IS NULL THEN 0
+                        WHEN lunch_start_min IS NULL OR lunch_end_min IS NULL THEN (clock_out_min - clock_in_min + 1439) % 1440 + 1
+                        ELSE max(0, (clock_out_min - clock_in_min + 1439) % 1440 - (lunch_end_min - lunch_start_min + 1439) % 1440)
+                   END AS worked_minutes
+            FROM time_entries
+        )
+    )
+"""
+
+# Weekly totals per employee and week from time_entry_hours, as stored in employee_week_totals: attendance is regular
+# hours capped at 40, total is attendance + overtime, worked_* leave out time-off days. {where} narrows the entries.
+_WEEK_TOTALS_SELECT = """
+    SELECT employee_id, week_start,
+           sum(regular_hours) AS regular_hours,
+           sum(overtime_hours) AS overtime_hours,
+           min(sum(regular_hours), 40) AS attendance,
+           min(sum(regular_hours), 40) + sum(overtime_hours) AS total_hours,
+           sum(CASE WHEN is_time_off THEN 0 ELSE regular_hours END) AS worked_regular_hours,
+           sum(CASE WHEN is_time_off THEN 0 ELSE overtime_hours END) AS worked_overtime_hours
+    FROM time_entry_hours {where}
+    GROUP BY employee_id, week_start
+"""
+
+
+def _create_hours_views(conn):
+    """
+    (Re)create the time_entry_hours and employee_week_hours views; the daily cap comes from config at startup.
+    Left alone when already current, so starting another worker does not change the schema under running ones.
+    """
+    views = {
+        "time_entry_hours": _TIME_ENTRY_HOURS_VIEW.format(
+            cap=repr(float(config.REGULAR_HOURS_PER_DAY)), time_off=", ".join(f"'{n}'" for n in TIME_OFF_NOTES),
+        ).strip(),
+        "employee_week_hours": "CREATE VIEW employee_week_hours AS " + _WEEK_TOTALS_SELECT.format(where="").strip(),
+    }
+    existing = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'view'").fetchall())
+    if all(existing.get(name) == sql for name, sql in views.items()):
+        return
+    conn.execute("DROP VIEW IF EXISTS employee_week_hours")
+    conn.execute("DROP VIEW IF EXISTS time_entry_hours")
+    for sql in views.values():
+        conn.execute(sql)
+
+
+# --- Connection pool ---
+# Each thread reuses one connection for as long as it holds it (nested _conn() calls and the whole
+# Flask request share it); released connections go back to a small idle pool instead of being closed.
+_pool_lock = threading.Lock()
+_idle_conns = []
+_local = threading.local()
+_pool_counters = {"opened": 0, "reused": 0, "checkouts": 0, "nested": 0, "closed": 0}
+
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which database file it was opened on, and its data_versions snapshot."""
+    db_path = None
+    versions_snapshot = None  # (PRAGMA data_version, _write_generation, {scope: version}); see _scopes_version
+
+
+# --- Statement profiling ---
+# With config.PROFILE_REQUESTS on, pooled connections are _ProfiledConnection: while a thread has a profile open
+# (profile_start; the app opens one per request) every statement it runs is recorded with the time spent executing
+# it and fetching its rows. Connections opened with profiling off record nothing and cost nothing extra.
+
+def _profile_record(sql, parameters):
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        return None
+    record = [sql, parameters, 0.0]
+    profile.append(record)
+    return record
+
+
+class _ProfiledCursor(sqlite3.Cursor):
+    """Cursor that adds the time spent executing its statement, and fetching its rows, to the open profile record."""
+    _record = None
+
+    def _timed(self, method, *args):
+        record = self._record
+        if record is None:
+            return method(*args)
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record[2] += perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._record = _profile_record(sql, parameters)
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = iter(seq_of_parameters)
+        first = next(seq_of_parameters, None)
+        if first is not None:
+            seq_of_parameters = itertools.chain((first,), seq_of_parameters)
+        # The first parameter set stands in for all of them if the statement is explained.
+        self._record = _profile_record(sql, first)
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        self._record = _profile_record(sql_script, None)
+        return self._timed(super().executescript, sql_script)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class _ProfiledConnection(_PooledConnection):
+    """Pooled connection whose statements (and commits) are timed into the calling thread's profile."""
+
+    def cursor(self, factory=_ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        record = _profile_record("COMMIT", None) if self.in_transaction else None
+        if record is None:
+            return super().commit()
+        start = perf_counter()
+        try:
+            return super().commit()
+        finally:
+            record[2] += perf_counter() - start
+
+
+def profile_start():
+    """Start recording the statements this thread runs on profiled connections."""
+    _local.profile = []
+
+
+def profile_stop():
+    """Stop recording and return this thread's statements since profile_start: [[sql, parameters or None, seconds]]."""
+    profile = getattr(_local, "profile", None)
+    _local.profile = None
+    return profile or []
+
+
+def explain_query_plan(sql, parameters=None):
+    """EXPLAIN QUERY PLAN detail lines for one recorded statement (empty for PRAGMA, BEGIN, COMMIT and the like)."""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")):
+        return []
+    with _conn() as conn:
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, parameters or ()).fetchall()
+        except sqlite3.Error as e:
+            return [f"(not explained: {e})"]
+    return [row["detail"] for row in rows]
+
+
+def _open_conn():
+    conn = sqlite3.connect(
+        config.DATABASE_PATH,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=config.DB_STATEMENT_CACHE_SIZE,
+        factory=_ProfiledConnection if config.PROFILE_REQUESTS else _PooledConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers (exports, rosters) run while the shift-change save burst writes.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.db_path = config.DATABASE_PATH
+    return conn
+
+
+def _checkout():
+    with _pool_lock:
+        _pool_counters["checkouts"] += 1
+        while _idle_conns:
+            conn = _idle_conns.pop()
+            if conn.db_path == config.DATABASE_PATH:
+                _pool_counters["reused"] += 1
+                return conn
+            conn.close()
+            _pool_counters["closed"] += 1
+        _pool_counters["opened"] += 1
+    return _open_conn()
+
+
+def _release(conn):
+    if conn.in_transaction:
+        # A helper raised before commit; don't hand a half-done transaction to the next user.
+        conn.rollback()
+    with _pool_lock:
+        if conn.db_path == config.DATABASE_PATH and len(_idle_conns) < config.DB_POOL_SIZE:
+            _idle_conns.append(conn)
+            return
+        _pool_counters["closed"] += 1
+    conn.close()
 
 
 @contextmanager
 def _conn():
-    conn = sqlite3.connect(config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Yield this thread's SQLite connection, checking one out of the pool if none is held yet."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        with _pool_lock:
+            _pool_counters["nested"] += 1
+        try:
+            yield conn
+        except BaseException:
+            # The connection stays held (e.g. for the rest of the request): don't leave this block's partial writes
+            # for the next helper's commit.
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        return
+    conn = _checkout()
+    _local.conn = conn
     try:
         yield conn
     finally:
+        _local.conn = None
+        _release(conn)
+
+
+def pool_stats():
+    """Return connection pool counters: opened, reused, checkouts, nested (reuse within one request/thread), closed, idle."""
+    with _pool_lock:
+        stats = dict(_pool_counters)
+        stats["idle"] = len(_idle_conns)
+    return stats
+
+
+def close_pool():
+    """Close all idle pooled connections (e.g. at shutdown or after swapping DATABASE_PATH)."""
+    with _pool_lock:
+        conns = list(_idle_conns)
+        _idle_conns.clear()
+        _pool_counters["closed"] += len(conns)
+    for conn in conns:
         conn.close()
 
 
+# --- Data versions ---
+# Scopes: "employees" (any employee insert/update/delete), "week:<Monday ISO date>" (time entries in that week),
+# "timeoff" (time-off request create/status/delete), "settings" (app_settings) and "all" (bulk rebuilds). Counters
+# only go up, so a sum over scopes changes whenever any of them does. Every in-process cache keys on these sums.
+DATA_VERSION_EMPLOYEES = "employees"
+DATA_VERSION_TIMEOFF = "timeoff"
+DATA_VERSION_SETTINGS = "settings"
+DATA_VERSION_ALL = "all"
+
+# Reading versions is the check in front of every cache, so each pooled connection remembers the versions it has
+# read and drops them only when PRAGMA data_version says another connection (this process or any other) has
+# committed, or this process has bumped a version since (a connection's own commits do not move its data_version).
+_write_generation = [0]
+_versions_lock = threading.Lock()
+_version_counters = {"checks": 0, "reloads": 0}
+
+
+def _week_scope(week_start):
+    if isinstance(week_start, date):
+        week_start = week_start.isoformat()
+    return f"week:{week_start}"
+
+
+def _bump_data_version(conn, scope):
+    """Increment one data_versions counter on conn (caller commits, so the bump lands with the change)."""
+    conn.execute(
+        "INSERT INTO data_versions (scope, version) VALUES (?, 1) ON CONFLICT(scope) DO UPDATE SET version = version + 1",
+        (scope,),
+    )
+    with _versions_lock:
+        _write_generation[0] += 1
+
+
+def _scopes_version(conn, scopes):
+    """Sum of the committed versions of scopes, served from conn's snapshot when nothing was written since it was taken."""
+    with _versions_lock:
+        _version_counters["checks"] += 1
+        generation = _write_generation[0]
+    if conn.in_transaction:
+        # Mid-write on this connection: read through so the caller sees its own uncommitted bumps, and keep no snapshot.
+        return _query_scopes_version(conn, scopes)
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    snapshot = conn.versions_snapshot
+    if snapshot is None or snapshot[0] != data_version or snapshot[1] != generation:
+        snapshot = conn.versions_snapshot = (data_version, generation, {})
+        with _versions_lock:
+            _version_counters["reloads"] += 1
+    known = snapshot[2]
+    missing = [scope for scope in scopes if scope not in known]
+    if missing:
+        rows = dict(conn.execute(
+            f"SELECT scope, version FROM data_versions WHERE scope IN ({','.join('?' * len(missing))})", missing
+        ).fetchall())
+        for scope in missing:
+            known[scope] = rows.get(scope, 0)
+    return sum(known[scope] for scope in scopes)
+
+
+def _query_scopes_version(conn, scopes):
+    return conn.execute(
+        f"SELECT COALESCE(SUM(version), 0) FROM data_versions WHERE scope IN ({','.join('?' * len(scopes))})", tuple(scopes)
+    ).fetchone()[0]
+
+
+def get_data_version(*scopes):
+    """Sum of the given scopes' versions: changes whenever any of them is written, by this process or another."""
+    with _conn() as conn:
+        return _scopes_version(conn, scopes)
+
+
+def version_check_stats():
+    """Version checks served in this process (checks) and how many had to re-read data_versions (reloads)."""
+    with _versions_lock:
+        return dict(_version_counters)
+
+
+def get_range_data_version(start_date, end_date, *scopes):
+    """Version stamp for the time entries of every week touching [start_date, end_date], the employee list, rebuilds,
+    and any extra scopes (e.g. DATA_VERSION_TIMEOFF)."""
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date)
+    if isinstance(end_date, str):
+        end_date = date.fromisoformat(end_date)
+    all_scopes = [DATA_VERSION_EMPLOYEES, DATA_VERSION_ALL, *scopes]
+    week = get_week_start(start_date)
+    while week <= end_date:
+        all_scopes.append(_week_scope(week))
+        week += timedelta(days=7)
+    return get_data_version(*dict.fromkeys(all_scopes))
+
+
+def get_week_data_version(week_start):
+    """Version stamp for everything the 7 days from week_start depend on (their entries, the employee list, rebuilds)."""
+    if isinstance(week_start, str):
+        week_start = date.fromisoformat(week_start)
+    return get_range_data_version(week_start, week_start + timedelta(days=6))
+
+
 # --- Employees ---
 
-def create_employee(conn, username, password_hash, full_name, is_admin=False, shift=None, employment_type=None, fa_mtf=None):
+def create_employee(conn, username, password_hash, full_name, is_admin=False, shift=None, employment_type=None, fa_mtf=None, badge_id=None):
     now = datetime.utcnow().isoformat() + "Z"
     shift_val = (shift or "").strip().lower() or None
     if shift_val and shift_val not in ("day", "swing", "graveyard"):
@@ -120,17 +662,48 @@ def create_employee(conn, username, password_hash, full_name, is_admin=False, sh
     if fa_mtf_val and fa_mtf_val not in ("fa", "mtf"):
         fa_mtf_val = None
     conn.execute(
-        "INSERT INTO employees (username, password_hash, full_name, is_admin, shift, employment_type, fa_mtf, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (username, password_hash, full_name, 1 if is_admin else 0, shift_val, emp_type, fa_mtf_val, now, now),
+        "INSERT INTO employees (username, password_hash, full_name, is_admin, shift, employment_type, fa_mtf, badge_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (username, password_hash, full_name, 1 if is_admin else 0, shift_val, emp_type, fa_mtf_val, (badge_id or "").strip() or None, now, now),
     )
+    employee_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    _bump_data_version(conn, DATA_VERSION_EMPLOYEES)
     conn.commit()
-    return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    employee_directory.invalidate()
+    return employee_id
+
+
+# Optional in-process cache for get_employee_by_id (config.EMPLOYEE_CACHE_TTL seconds; 0 = off). Entries are
+# tagged with the employees data version, so an edit from any process invalidates them; update_employee and
+# delete_employee also drop them directly.
+_employee_cache_lock = threading.Lock()
+_employee_cache = {}
 
 
 def get_employee_by_id(employee_id):
+    ttl = config.EMPLOYEE_CACHE_TTL
     with _conn() as conn:
+        if ttl > 0:
+            version = get_data_version(DATA_VERSION_EMPLOYEES, DATA_VERSION_ALL)
+            with _employee_cache_lock:
+                cached = _employee_cache.get(employee_id)
+            if cached and cached[0] > monotonic() and cached[1] == version:
+                return dict(cached[2])
         row = conn.execute("SELECT * FROM employees WHERE id = ?", (employee_id,)).fetchone()
-        return dict(row) if row else None
+        employee = dict(row) if row else None
+        keep = not conn.in_transaction
+    if employee and ttl > 0 and keep:
+        with _employee_cache_lock:
+            _employee_cache[employee_id] = (monotonic() + ttl, version, dict(employee))
+    return employee
+
+
+def invalidate_employee_cache(employee_id=None):
+    """Drop one employee (or all employees when employee_id is None) from the get_employee_by_id cache."""
+    with _employee_cache_lock:
+        if employee_id is None:
+            _employee_cache.clear()
+        else:
+            _employee_cache.pop(employee_id, None)
 
 
 def get_employee_by_username(username):
@@ -139,6 +712,12 @@ def get_employee_by_username(username):
         return dict(row) if row else None
 
 
+def get_employee_by_badge_id(badge_id):
+    with _conn() as conn:
+        row = conn.execute("SELECT * FROM employees WHERE badge_id = ?", ((badge_id or "").strip(),)).fetchone()
+        return dict(row) if row else None
+
+
 def get_employee_by_full_name(full_name):
     """Look up employee by full name (exact match). If multiple exist, returns first."""
     with _conn() as conn:
@@ -146,36 +725,107 @@ def get_employee_by_full_name(full_name):
         return dict(row) if row else None
 
 
-def list_employees():
+def _query_employees():
     with _conn() as conn:
         rows = conn.execute(
-            "SELECT id, username, full_name, is_admin, shift, employment_type, fa_mtf, created_at, updated_at FROM employees ORDER BY full_name"
+            "SELECT id, username, full_name, is_admin, shift, employment_type, fa_mtf, badge_id, created_at, updated_at FROM employees ORDER BY full_name"
         ).fetchall()
         return [dict(r) for r in rows]
 
 
+class EmployeeDirectory:
+    """
+    In-process snapshot of the employees list (ordered by full name), grouped by shift (day, swing, graveyard,
+    unassigned) and employment type (full_time, contractor), so roster, picker and export paths read it instead of
+    querying and re-grouping the employees table on every call. Versioned by the employees data version: a snapshot
+    is used only while that version is unchanged (also catching writes from other processes), and create_employee,
+    update_employee and delete_employee drop it as soon as they commit. Lists and dicts handed out are copies.
+    """
+
+    SHIFTS = ("day", "swing", "graveyard", "unassigned")
+    EMPLOYMENT_TYPES = ("full_time", "contractor")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None  # (version, employees, by_shift, by_type)
+        self._counters = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def _get(self):
+        with _conn() as conn:
+            version = get_data_version(DATA_VERSION_EMPLOYEES, DATA_VERSION_ALL)
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot[0] == version:
+                    self._counters["hits"] += 1
+                    return snapshot
+            employees = _query_employees()
+            # Never keep rows read inside an open write transaction: a rollback could reuse their version number.
+            keep = not conn.in_transaction
+        by_shift = {key: [] for key in self.SHIFTS}
+        by_type = {key: [] for key in self.EMPLOYMENT_TYPES}
+        for e in employees:
+            shift = (e.get("shift") or "").strip().lower()
+            by_shift[shift if shift in ("day", "swing", "graveyard") else "unassigned"].append(e)
+            emp_type = (e.get("employment_type") or "").strip().lower()
+            by_type[emp_type if emp_type == "contractor" else "full_time"].append(e)
+        snapshot = (version, employees, by_shift, by_type)
+        with self._lock:
+            if keep:
+                self._snapshot = snapshot
+            self._counters["loads"] += 1
+        return snapshot
+
+    def all(self):
+        return [dict(e) for e in self._get()[1]]
+
+    def by_shift(self):
+        return {key: [dict(e) for e in group] for key, group in self._get()[2].items()}
+
+    def for_shift(self, shift):
+        return [dict(e) for e in self._get()[2].get(shift, [])]
+
+    def by_employment_type(self):
+        return {key: [dict(e) for e in group] for key, group in self._get()[3].items()}
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._counters["invalidations"] += 1
+
+    def stats(self):
+        """hits, loads, invalidations for this process, and the version of the current snapshot (None when empty)."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["version"] = self._snapshot[0] if self._snapshot else None
+        return stats
+
+
+employee_directory = EmployeeDirectory()
+
+
+def list_employees():
+    return employee_directory.all()
+
+
 def list_employees_by_shift():
     """Return employees grouped by shift: day, swing, graveyard, unassigned."""
-    all_emp = list_employees()
-    by_shift = {"day": [], "swing": [], "graveyard": [], "unassigned": []}
-    for e in all_emp:
-        s = (e.get("shift") or "").strip().lower()
-        if s in ("day", "swing", "graveyard"):
-            by_shift[s].append(e)
-        else:
-            by_shift["unassigned"].append(e)
-    return by_shift
+    return employee_directory.by_shift()
 
 
 def list_employees_for_shift(shift):
     """Return employees in the given shift (day, swing, graveyard). Empty list if shift invalid."""
     if not shift or (shift or "").strip().lower() not in ("day", "swing", "graveyard"):
         return []
-    by_shift = list_employees_by_shift()
-    return by_shift.get((shift or "").strip().lower(), [])
+    return employee_directory.for_shift((shift or "").strip().lower())
+
+
+def list_employees_by_employment_type():
+    """Return employees grouped by employment type: full_time, contractor."""
+    return employee_directory.by_employment_type()
 
 
-def update_employee(conn, employee_id, full_name=None, username=_NOT_GIVEN, password_hash=None, is_admin=None, shift=None, employment_type=None, fa_mtf=_NOT_GIVEN):
+def update_employee(conn, employee_id, full_name=None, username=_NOT_GIVEN, password_hash=None, is_admin=None, shift=None, employment_type=None, fa_mtf=_NOT_GIVEN,
+                    badge_id=_NOT_GIVEN):
     updates = ["updated_at = ?"]
     args = [datetime.utcnow().isoformat() + "Z"]
     if full_name is not None:
@@ -191,6 +841,9 @@ def update_employee(conn, employee_id, full_name=None, username=_NOT_GIVEN, pass
             fa_mtf_val = None
         updates.append("fa_mtf = ?")
         args.append(fa_mtf_val)
+    if badge_id is not _NOT_GIVEN:
+        updates.append("badge_id = ?")
+        args.append((badge_id or "").strip() or None)
     if password_hash is not None:
         updates.append("password_hash = ?")
         args.append(password_hash)
@@ -214,20 +867,36 @@ def update_employee(conn, employee_id, full_name=None, username=_NOT_GIVEN, pass
         f"UPDATE employees SET {', '.join(updates)} WHERE id = ?",
         args,
     )
+    _bump_data_version(conn, DATA_VERSION_EMPLOYEES)
     conn.commit()
+    invalidate_employee_cache(employee_id)
+    employee_directory.invalidate()
 
 
 def delete_employee(conn, employee_id):
     conn.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
     conn.execute("DELETE FROM time_entries WHERE employee_id = ?", (employee_id,))
+    conn.execute("DELETE FROM employee_week_totals WHERE employee_id = ?", (employee_id,))
+    _bump_data_version(conn, DATA_VERSION_EMPLOYEES)
     conn.commit()
+    invalidate_employee_cache(employee_id)
+    employee_directory.invalidate()
+
+
+# All of app_settings, reloaded when the settings data version changes (set_setting here or in another process).
+_settings_cache = [None, {}]  # [version, {key: value}]
 
 
 def get_setting(key):
     """Return the value for a setting key, or None if not set."""
     with _conn() as conn:
-        row = conn.execute("SELECT value FROM app_settings WHERE key = ?", (key,)).fetchone()
-        return row[0] if row else None
+        version = get_data_version(DATA_VERSION_SETTINGS, DATA_VERSION_ALL)
+        cached_version, values = _settings_cache
+        if cached_version != version:
+            values = dict(conn.execute("SELECT key, value FROM app_settings").fetchall())
+            if not conn.in_transaction:
+                _settings_cache[:] = [version, values]
+        return values.get(key)
 
 
 def set_setting(conn, key, value):
@@ -239,6 +908,7 @@ def set_setting(conn, key, value):
             "INSERT INTO app_settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
             (key, value.strip() if isinstance(value, str) else value),
         )
+    _bump_data_version(conn, DATA_VERSION_SETTINGS)
     conn.commit()
 
 
@@ -253,6 +923,11 @@ def get_week_start(d):
     return d - timedelta(days=weekday)
 
 
+def _week_key(d):
+    """ISO Monday of the week containing d (date or ISO string): the week_start stored on week totals."""
+    return get_week_start(d).isoformat()
+
+
 def get_week_range(week_start):
     """Return (week_start, week_end) for the given Monday."""
     if isinstance(week_start, str):
@@ -263,72 +938,219 @@ def get_week_range(week_start):
 
 def upsert_time_entry(conn, employee_id, work_date, clock_in=None, clock_out=None, lunch_start=None, lunch_end=None, notes=None,
                       regular_hours=0, overtime_hours=0, is_graveyard=0, shift=None):
+    _write_time_entry(
+        conn, employee_id, work_date, clock_in=clock_in, clock_out=clock_out, lunch_start=lunch_start, lunch_end=lunch_end,
+        notes=notes, regular_hours=regular_hours, overtime_hours=overtime_hours, is_graveyard=is_graveyard, shift=shift,
+    )
+    _refresh_week_totals(conn, employee_id, get_week_start(work_date))
+    conn.commit()
+
+
+def _write_time_entry(conn, employee_id, work_date, clock_in=None, clock_out=None, lunch_start=None, lunch_end=None, notes=None,
+                      regular_hours=0, overtime_hours=0, is_graveyard=0, shift=None):
+    """Insert or update one time_entries row without committing or touching weekly totals. shift: a shift window name or None."""
     now = datetime.utcnow().isoformat() + "Z"
-    if isinstance(work_date, date):
-        work_date = work_date.isoformat()
     shift_val = (shift or "").strip().lower() or None
-    if shift_val and shift_val not in ("day", "swing", "graveyard"):
+    if shift_val and shift_val not in logic.get_shift_classifier().names:
         shift_val = None
-    conn.execute("""
-        INSERT INTO time_entries (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard, shift, notes, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(employee_id, work_date) DO UPDATE SET
-            clock_in = excluded.clock_in,
-            clock_out = excluded.clock_out,
-            lunch_start = excluded.lunch_start,
-            lunch_end = excluded.lunch_end,
-            regular_hours = excluded.regular_hours,
-            overtime_hours = excluded.overtime_hours,
-            is_graveyard = excluded.is_graveyard,
-            shift = excluded.shift,
-            notes = excluded.notes,
-            updated_at = excluded.updated_at
-    """, (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard, shift_val, notes or "", now, now))
+    conn.execute(_UPSERT_TIME_ENTRY_SQL, _time_entry_params(employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end,
+                                                            regular_hours, overtime_hours, is_graveyard, shift_val, notes, now))
+
+
+def _time_entry_params(employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours,
+                       is_graveyard, shift, notes, now):
+    """_UPSERT_TIME_ENTRY_SQL parameters for one day; adds the derived week_start and minute columns."""
+    if isinstance(work_date, date):
+        work_date = work_date.isoformat()
+    return (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard,
+            shift, notes or "", now, now, get_week_start(work_date).isoformat()) + _entry_minutes(clock_in, clock_out, lunch_start, lunch_end)
+
+
+# Parameters: employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours,
+# is_graveyard, shift, notes, created_at, updated_at, week_start, then the four _MINUTE_COLUMNS. Build them with
+# _time_entry_params; shared by single-row writes and executemany batches.
+_UPSERT_TIME_ENTRY_SQL = """
+    INSERT INTO time_entries (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard, shift, notes, created_at, updated_at,
+                              week_start, clock_in_min, clock_out_min, lunch_start_min, lunch_end_min)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(employee_id, work_date) DO UPDATE SET
+        clock_in = excluded.clock_in,
+        clock_out = excluded.clock_out,
+        lunch_start = excluded.lunch_start,
+        lunch_end = excluded.lunch_end,
+        week_start = excluded.week_start,
+        clock_in_min = excluded.clock_in_min,
+        clock_out_min = excluded.clock_out_min,
+        lunch_start_min = excluded.lunch_start_min,
+        lunch_end_min = excluded.lunch_end_min,
+        regular_hours = excluded.regular_hours,
+        overtime_hours = excluded.overtime_hours,
+        is_graveyard = excluded.is_graveyard,
+        shift = excluded.shift,
+        notes = excluded.notes,
+        updated_at = excluded.updated_at
+"""
+
+
+def import_time_entries(entries, batch_size=None):
+    """
+    Upsert many time entries (e.g. a badge-system import) in batched transactions: one executemany per batch, then one
+    totals refresh per employee week the batch touched, then one commit. Each committed batch leaves entries and totals consistent.
+    entries: (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard, shift, notes).
+    Returns the number of rows written.
+    """
+    batch_size = batch_size or config.IMPORT_BATCH_SIZE
+    # Sorted by employee and date, so a batch touches as few employee weeks as possible.
+    entries = sorted(entries, key=lambda e: (e[0], str(e[1])))
+    with _conn() as conn:
+        for start in range(0, len(entries), batch_size):
+            upsert_time_entries(conn, entries[start:start + batch_size])
+    return len(entries)
+
+
+def upsert_time_entries(conn, entries):
+    """
+    Write several time entries in one transaction: one executemany, one totals refresh per employee week touched, one commit.
+    entries: (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end, regular_hours, overtime_hours, is_graveyard, shift, notes).
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    conn.executemany(_UPSERT_TIME_ENTRY_SQL, [_time_entry_params(*entry, now) for entry in entries])
+    for emp_id, week in sorted({(e[0], get_week_start(e[1])) for e in entries}):
+        _refresh_week_totals(conn, emp_id, week)
     conn.commit()
 
 
+# --- Weekly totals ---
+
+def _save_week_totals(conn, where, params):
+    """Write employee_week_totals rows for the employee weeks matching where (a time_entry_hours filter) in one GROUP BY."""
+    now = datetime.utcnow().isoformat() + "Z"
+    conn.execute(f"""
+        INSERT INTO employee_week_totals (employee_id, week_start, regular_hours, overtime_hours, attendance, total_hours,
+                                          worked_regular_hours, worked_overtime_hours, updated_at)
+        SELECT *, ? FROM ({_WEEK_TOTALS_SELECT.format(where=where)})
+    """, (now,) + tuple(params))
+
+
+def _refresh_week_totals(conn, employee_id, week_start):
+    """Recompute one employee's employee_week_totals row from time_entries on conn and bump the week's data version (caller commits)."""
+    week_str = _week_key(week_start)
+    _bump_data_version(conn, _week_scope(week_str))
+    conn.execute("DELETE FROM employee_week_totals WHERE employee_id = ? AND week_start = ?", (employee_id, week_str))
+    _save_week_totals(conn, "WHERE week_start = ? AND employee_id = ?", (week_str, employee_id))
+
+
+def _rebuild_week_totals(conn):
+    """Recompute every employee_week_totals row from time_entries on conn (caller commits). Returns rows written."""
+    conn.execute("DELETE FROM employee_week_totals")
+    _bump_data_version(conn, DATA_VERSION_ALL)
+    _save_week_totals(conn, "", ())
+    return conn.execute("SELECT COUNT(*) FROM employee_week_totals").fetchone()[0]
+
+
+def rebuild_week_totals():
+    """Rebuild employee_week_totals from scratch (after a manual DB edit; init_db does it when REGULAR_HOURS_PER_DAY changes). Returns rows written."""
+    with _conn() as conn:
+        n = _rebuild_week_totals(conn)
+        conn.commit()
+    return n
+
+
+def get_week_totals_for_range(first_week_start, last_week_start):
+    """Return {(employee_id, week_start_str): totals dict} for the weeks containing first_week_start through last_week_start
+    in one query."""
+    first_week_start, last_week_start = _week_key(first_week_start), _week_key(last_week_start)
+    with _conn() as conn:
+        rows = conn.execute(
+            "SELECT * FROM employee_week_totals WHERE week_start >= ? AND week_start <= ?", (first_week_start, last_week_start)
+        ).fetchall()
+        return {(r["employee_id"], r["week_start"]): dict(r) for r in rows}
+
+
+def get_period_totals(first_week_start, last_week_start):
+    """
+    Return {employee_id: {"attendance", "overtime_hours", "total_hours"}} summed over the weeks containing
+    first_week_start through last_week_start in one GROUP BY. Employees with no entries in the period are absent.
+    """
+    first_week_start, last_week_start = _week_key(first_week_start), _week_key(last_week_start)
+    with _conn() as conn:
+        rows = conn.execute("""
+            SELECT employee_id, sum(attendance) AS attendance, sum(overtime_hours) AS overtime_hours, sum(total_hours) AS total_hours
+            FROM employee_week_totals
+            WHERE week_start >= ? AND week_start <= ?
+            GROUP BY employee_id
+        """, (first_week_start, last_week_start)).fetchall()
+        return {r["employee_id"]: dict(r) for r in rows}
+
+
+def get_week_totals(week_start):
+    """Return {employee_id: totals dict} for the week containing week_start from employee_week_totals. Employees with no
+    entries that week are absent."""
+    week_start = _week_key(week_start)
+    with _conn() as conn:
+        rows = conn.execute("SELECT * FROM employee_week_totals WHERE week_start = ?", (week_start,)).fetchall()
+        return {r["employee_id"]: dict(r) for r in rows}
+
+
 def get_entries_for_week(employee_id, week_start):
-    """Get all time entries for one employee for the week (Monday–Sunday)."""
-    if isinstance(week_start, str):
-        week_start = date.fromisoformat(week_start)
-    week_end = week_start + timedelta(days=6)
-    start_str = week_start.isoformat()
-    end_str = week_end.isoformat()
+    """Get all time entries for one employee for the week (Monday–Sunday) containing week_start."""
+    week_start = _week_key(week_start)
     with _conn() as conn:
         rows = conn.execute("""
             SELECT * FROM time_entries
-            WHERE employee_id = ? AND work_date >= ? AND work_date <= ?
+            WHERE week_start = ? AND employee_id = ?
             ORDER BY work_date
-        """, (employee_id, start_str, end_str)).fetchall()
+        """, (week_start, employee_id)).fetchall()
         return [dict(r) for r in rows]
 
 
-def get_all_entries_for_week(week_start):
-    """Get all time entries for all employees for the week (for export)."""
-    if isinstance(week_start, str):
-        week_start = date.fromisoformat(week_start)
-    week_end = week_start + timedelta(days=6)
-    start_str = week_start.isoformat()
-    end_str = week_end.isoformat()
+def get_entries_for_week_by_employee(week_start):
+    """Get the time entries of the week (Monday–Sunday) containing week_start for every employee in one indexed
+    week_start lookup. Returns {employee_id: [entries sorted by work_date]}; employees with no entries are absent.
+    Used by admin roster views and export instead of calling get_entries_for_week per employee."""
+    week_start = _week_key(week_start)
     with _conn() as conn:
         rows = conn.execute("""
-            SELECT e.id AS employee_id, e.full_name,
-                   t.id AS entry_id, t.work_date, t.clock_in, t.clock_out,
-                   t.regular_hours, t.overtime_hours, t.is_graveyard, t.notes
-            FROM employees e
-            LEFT JOIN time_entries t ON e.id = t.employee_id AND t.work_date >= ? AND t.work_date <= ?
-            WHERE e.id IN (SELECT DISTINCT employee_id FROM time_entries WHERE work_date >= ? AND work_date <= ?)
-               OR e.id IN (SELECT id FROM employees)
-            ORDER BY e.full_name, t.work_date
-        """, (start_str, end_str, start_str, end_str)).fetchall()
-        # Simpler: get entries in range, then join employee names
+            SELECT * FROM time_entries
+            WHERE week_start = ?
+            ORDER BY employee_id, work_date
+        """, (week_start,)).fetchall()
+    by_employee = {}
+    for r in rows:
+        by_employee.setdefault(r["employee_id"], []).append(dict(r))
+    return by_employee
+
+
+def get_entries_for_range_by_employee(start_date, end_date):
+    """Get time entries in [start_date, end_date] for every employee in one range query ordered by employee and date.
+    Returns {employee_id: [entries sorted by work_date]}; employees with no entries are absent."""
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date)
+    if isinstance(end_date, str):
+        end_date = date.fromisoformat(end_date)
+    with _conn() as conn:
+        rows = conn.execute("""
+            SELECT * FROM time_entries
+            WHERE work_date >= ? AND work_date <= ?
+            ORDER BY employee_id, work_date
+        """, (start_date.isoformat(), end_date.isoformat())).fetchall()
+    by_employee = {}
+    for r in rows:
+        by_employee.setdefault(r["employee_id"], []).append(dict(r))
+    return by_employee
+
+
+def get_all_entries_for_week(week_start):
+    """Get all time entries for all employees for the week containing week_start (for export)."""
+    week_start = _week_key(week_start)
+    with _conn() as conn:
         rows = conn.execute("""
             SELECT t.*, e.full_name, e.is_admin
             FROM time_entries t
             JOIN employees e ON e.id = t.employee_id
-            WHERE t.work_date >= ? AND t.work_date <= ?
+            WHERE t.week_start = ?
             ORDER BY e.full_name, t.work_date
-        """, (start_str, end_str)).fetchall()
+        """, (week_start,)).fetchall()
         return [dict(r) for r in rows]
 
 
@@ -380,49 +1202,99 @@ def get_timeoff_entries(start_date, end_date, exclude_admin=True):
         return [dict(r) for r in rows]
 
 
-def get_timeoff_request_calendar_entries(start_date, end_date, exclude_admin=True):
-    """Return one entry per day for pending, approved, and cancelled time-off requests in the date range. Used so the admin calendar shows employee names for all requests including cancelled. Returns list of dicts with employee_id, full_name, shift, work_date, notes, status."""
-    if isinstance(start_date, str):
-        start_date = date.fromisoformat(start_date)
-    if isinstance(end_date, str):
-        end_date = date.fromisoformat(end_date)
-    start_str = start_date.isoformat()
-    end_str = end_date.isoformat()
+# Calendar months by (year, month), each stamped with the data version it was built from.
+CALENDAR_CACHE_MONTHS = 36
+_calendar_cache_lock = threading.Lock()
+_calendar_cache = OrderedDict()
+
+
+def get_timeoff_calendar_month(year, month):
+    """
+    Admin time-off calendar data for one month: {"by_date": {date_str: [entries]}, "shift_counts": {date_str: {shift:
+    count}}, "conflict_dates": set of date_str}. Entries ({employee_id, full_name, shift, fa_mtf, notes, pending,
+    cancelled}) are time-off time entries (sorted by name) followed by pending/approved/cancelled request days not
+    already covered (in request order); admins excluded. cancelled is set when any cancelled request covers that
+    employee and day. shift_counts counts the non-cancelled entries per shift ("(no shift)" when unset); a conflict
+    date has 2+ of them on one shift. Built in one SQL statement and cached per (year, month) until the data version changes.
+    The returned value is shared: do not mutate it.
+    """
+    month_start = date(year, month, 1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    version = get_range_data_version(month_start, month_end, DATA_VERSION_TIMEOFF)
+    with _calendar_cache_lock:
+        cached = _calendar_cache.get((year, month))
+        if cached and cached[0] == version:
+            _calendar_cache.move_to_end((year, month))
+            return cached[1]
+    placeholders = ",".join("?" * len(TIME_OFF_NOTES))
     with _conn() as conn:
-        if exclude_admin:
-            rows = conn.execute("""
-                SELECT r.employee_id, e.full_name, e.shift, r.from_date, r.to_date, r.notes, r.status, e.fa_mtf
-                FROM time_off_requests r
-                JOIN employees e ON e.id = r.employee_id
-                WHERE r.status IN ('pending', 'approved', 'cancelled')
-                AND r.from_date <= ? AND r.to_date >= ?
-                AND (e.is_admin IS NULL OR e.is_admin = 0)
-            """, (end_str, start_str)).fetchall()
-        else:
-            rows = conn.execute("""
-                SELECT r.employee_id, e.full_name, e.shift, r.from_date, r.to_date, r.notes, r.status, e.fa_mtf
-                FROM time_off_requests r
-                JOIN employees e ON e.id = r.employee_id
-                WHERE r.status IN ('pending', 'approved', 'cancelled')
-                AND r.from_date <= ? AND r.to_date >= ?
-            """, (end_str, start_str)).fetchall()
-    result = []
+        rows = conn.execute(f"""
+            WITH RECURSIVE days(day) AS (
+                SELECT ?
+                UNION ALL
+                SELECT date(day, '+1 day') FROM days WHERE day < ?
+            ),
+            entry_days AS (
+                SELECT t.employee_id, t.work_date, t.notes, NULL AS status, NULL AS request_id, 0 AS source
+                FROM time_entries t
+                WHERE t.work_date >= ? AND t.work_date <= ? AND t.notes IN ({placeholders})
+            ),
+            request_days AS (
+                SELECT r.employee_id, r.work_date, r.notes, r.status, r.request_id, 1 AS source,
+                       ROW_NUMBER() OVER (PARTITION BY r.employee_id, r.work_date ORDER BY r.request_id) AS n
+                FROM time_off_request_days r
+                WHERE r.work_date >= ? AND r.work_date <= ? AND r.status IN ('pending', 'approved', 'cancelled')
+            ),
+            merged AS (
+                SELECT employee_id, work_date, notes, status, request_id, source FROM entry_days
+                UNION ALL
+                SELECT employee_id, work_date, notes, status, request_id, source FROM request_days r
+                WHERE n = 1 AND NOT EXISTS (
+                    SELECT 1 FROM entry_days t WHERE t.employee_id = r.employee_id AND t.work_date = r.work_date
+                )
+            ),
+            flagged AS (
+                SELECT m.*, e.full_name, e.shift, e.fa_mtf,
+                       COALESCE(m.status = 'pending', 0) AS pending,
+                       (COALESCE(m.status = 'cancelled', 0) OR EXISTS (
+                           SELECT 1 FROM time_off_request_days c
+                           WHERE c.employee_id = m.employee_id AND c.work_date = m.work_date AND c.status = 'cancelled'
+                       )) AS cancelled
+                FROM merged m
+                JOIN employees e ON e.id = m.employee_id
+                WHERE e.is_admin IS NULL OR e.is_admin = 0
+            )
+            SELECT days.day, f.employee_id, f.full_name, f.shift, f.fa_mtf, f.notes, f.pending, f.cancelled
+            FROM days
+            LEFT JOIN flagged f ON f.work_date = days.day
+            ORDER BY days.day, f.source, CASE WHEN f.source = 0 THEN f.full_name END, f.request_id, f.employee_id
+        """, (month_start.isoformat(), month_end.isoformat(), month_start.isoformat(), month_end.isoformat(), *TIME_OFF_NOTES,
+              month_start.isoformat(), month_end.isoformat())).fetchall()
+    by_date = {}
+    shift_counts = {}
     for r in rows:
-        from_d = date.fromisoformat(r[3])
-        to_d = date.fromisoformat(r[4])
-        d = from_d
-        while d <= to_d:
-            if start_date <= d <= end_date:
-                result.append({
-                    "employee_id": r[0],
-                    "full_name": r[1],
-                    "shift": r[2],
-                    "work_date": d.isoformat(),
-                    "notes": r[5],
-                    "status": r[6],
-                    "fa_mtf": r[7] if len(r) > 7 else None,
-                })
-            d += timedelta(days=1)
+        entries = by_date.setdefault(r["day"], [])
+        if r["employee_id"] is not None:
+            if not r["cancelled"]:
+                counts = shift_counts.setdefault(r["day"], {})
+                shift = (r["shift"] or "").strip() or "(no shift)"
+                counts[shift] = counts.get(shift, 0) + 1
+            entries.append({
+                "employee_id": r["employee_id"],
+                "full_name": r["full_name"],
+                "shift": r["shift"],
+                "fa_mtf": r["fa_mtf"],
+                "notes": r["notes"],
+                "pending": bool(r["pending"]),
+                "cancelled": bool(r["cancelled"]),
+            })
+    conflict_dates = {day for day, counts in shift_counts.items() if max(counts.values()) >= 2}
+    result = {"by_date": by_date, "shift_counts": shift_counts, "conflict_dates": conflict_dates}
+    with _calendar_cache_lock:
+        _calendar_cache[(year, month)] = (version, result)
+        _calendar_cache.move_to_end((year, month))
+        while len(_calendar_cache) > CALENDAR_CACHE_MONTHS:
+            _calendar_cache.popitem(last=False)
     return result
 
 
@@ -439,12 +1311,17 @@ def submit_timeoff(employee_id, from_date, to_date, notes, hours_per_day=8):
     with _conn() as conn:
         d = from_date
         while d <= to_date:
-            upsert_time_entry(
+            _write_time_entry(
                 conn, employee_id, d,
                 clock_in=None, clock_out=None, lunch_start=None, lunch_end=None,
                 notes=notes, regular_hours=hours_per_day, overtime_hours=0, is_graveyard=0,
             )
             d += timedelta(days=1)
+        week = get_week_start(from_date)
+        while week <= to_date:
+            _refresh_week_totals(conn, employee_id, week)
+            week += timedelta(days=7)
+        conn.commit()
 
 
 def remove_timeoff_entries(employee_id, from_date, to_date):
@@ -463,11 +1340,38 @@ def remove_timeoff_entries(employee_id, from_date, to_date):
             "DELETE FROM time_entries WHERE employee_id = ? AND work_date >= ? AND work_date <= ? AND notes IN (" + placeholders + ")",
             (employee_id, start_str, end_str) + tuple(TIME_OFF_NOTES),
         )
+        week = get_week_start(from_date)
+        while week <= to_date:
+            _refresh_week_totals(conn, employee_id, week)
+            week += timedelta(days=7)
         conn.commit()
 
 
-def create_timeoff_request(employee_id, from_date, to_date, notes, hours_per_day=8):
-    """Create a time-off request with status pending. Returns the new row id or None."""
+def _expand_timeoff_request_days(conn, request_id=None):
+    """Insert time_off_request_days rows for one request (or all requests when request_id is None) on conn (caller commits)."""
+    where = "WHERE from_date <= to_date" + (" AND id = ?" if request_id is not None else "")
+    conn.execute(f"""
+        INSERT OR REPLACE INTO time_off_request_days (request_id, employee_id, work_date, status, notes)
+        WITH RECURSIVE days(request_id, employee_id, work_date, to_date, status, notes) AS (
+            SELECT id, employee_id, from_date, to_date, status, notes FROM time_off_requests {where}
+            UNION ALL
+            SELECT request_id, employee_id, date(work_date, '+1 day'), to_date, status, notes FROM days WHERE work_date < to_date
+        )
+        SELECT request_id, employee_id, work_date, status, notes FROM days
+    """, () if request_id is None else (request_id,))
+
+
+def _set_timeoff_request_status(conn, request_id, status):
+    """Update a request's status and its expanded days on conn (caller commits)."""
+    now = datetime.utcnow().isoformat()
+    conn.execute("UPDATE time_off_requests SET status = ?, updated_at = ? WHERE id = ?", (status, now, request_id))
+    conn.execute("UPDATE time_off_request_days SET status = ? WHERE request_id = ?", (status, request_id))
+    _bump_data_version(conn, DATA_VERSION_TIMEOFF)
+
+
+def create_timeoff_request(employee_id, from_date, to_date, notes, hours_per_day=8, notifications=()):
+    """Create a time-off request with status pending. Returns the new row id or None.
+    notifications: (channel, payload) pairs queued in notification_outbox in the same transaction."""
     if notes not in TIME_OFF_NOTES:
         return None
     if isinstance(from_date, str):
@@ -482,6 +1386,10 @@ def create_timeoff_request(employee_id, from_date, to_date, notes, hours_per_day
             INSERT INTO time_off_requests (employee_id, from_date, to_date, notes, hours_per_day, status, created_at, updated_at)
             VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)
         """, (employee_id, from_date.isoformat(), to_date.isoformat(), notes, hours_per_day, now, now))
+        _expand_timeoff_request_days(conn, cur.lastrowid)
+        _bump_data_version(conn, DATA_VERSION_TIMEOFF)
+        for channel, payload in notifications:
+            _enqueue_notification(conn, channel, payload)
         conn.commit()
         return cur.lastrowid
 
@@ -513,6 +1421,69 @@ def get_all_timeoff_requests():
         return [dict(r) for r in rows]
 
 
+TIMEOFF_REQUEST_STATUSES = ("pending", "approved", "rejected", "cancelled")
+TIMEOFF_REQUEST_PAGE_SIZE = 50
+
+
+def _timeoff_request_filter_sql(status=None, employee_id=None, notes=None, overlap_from=None, overlap_to=None):
+    """WHERE clause and args for the request list filters (None = no filter). overlap_from/overlap_to: requests overlapping that range."""
+    clauses, args = [], []
+    if status:
+        clauses.append("r.status = ?")
+        args.append(status)
+    if employee_id:
+        clauses.append("r.employee_id = ?")
+        args.append(employee_id)
+    if notes:
+        clauses.append("r.notes = ?")
+        args.append(notes)
+    if overlap_from and overlap_to:
+        clauses.append("r.from_date <= ? AND r.to_date >= ?")
+        args += [overlap_to.isoformat(), overlap_from.isoformat()]
+    return (" AND ".join(clauses) or "1"), args
+
+
+def list_timeoff_requests(status=None, employee_id=None, notes=None, overlap_from=None, overlap_to=None, before=None,
+                          limit=TIMEOFF_REQUEST_PAGE_SIZE):
+    """
+    One page of time-off requests with employee full_name, newest first (created_at DESC, id DESC), filtered like
+    _timeoff_request_filter_sql. Keyset pagination: before is the (created_at, id) of the last row already shown.
+    Returns (rows, next_before); next_before is None on the last page.
+    """
+    where, args = _timeoff_request_filter_sql(status, employee_id, notes, overlap_from, overlap_to)
+    if before:
+        where += " AND (r.created_at, r.id) < (?, ?)"
+        args += [before[0], before[1]]
+    with _conn() as conn:
+        rows = conn.execute(f"""
+            SELECT r.id, r.employee_id, r.from_date, r.to_date, r.notes, r.hours_per_day, r.status, r.created_at,
+                   r.admin_notes, e.full_name
+            FROM time_off_requests r
+            JOIN employees e ON e.id = r.employee_id
+            WHERE {where}
+            ORDER BY r.created_at DESC, r.id DESC
+            LIMIT ?
+        """, args + [limit + 1]).fetchall()
+    rows = [dict(r) for r in rows]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def count_timeoff_requests(status=None, employee_id=None, notes=None, overlap_from=None, overlap_to=None):
+    """Number of time-off requests matching the list filters."""
+    where, args = _timeoff_request_filter_sql(status, employee_id, notes, overlap_from, overlap_to)
+    with _conn() as conn:
+        # Same FROM/JOIN as list_timeoff_requests so the total matches the rows paged through.
+        return conn.execute(f"""
+            SELECT COUNT(*)
+            FROM time_off_requests r
+            JOIN employees e ON e.id = r.employee_id
+            WHERE {where}
+        """, args).fetchone()[0]
+
+
 def get_timeoff_request_by_id(request_id):
     """Return a single time-off request by id or None."""
     with _conn() as conn:
@@ -546,44 +1517,83 @@ def set_timeoff_request_status(request_id, status):
     """Set request status to 'approved' or 'rejected'. Admin can change status from any current state. If approved, apply time off to timesheet (only when not already approved). Returns True on success."""
     if status not in ("approved", "rejected"):
         return False
-    req = get_timeoff_request_by_id(request_id)
-    if not req:
-        return False
-    current = req.get("status")
-    now = datetime.utcnow().isoformat()
+    return set_timeoff_request_statuses([request_id], status)[0]["ok"]
+
+
+def set_timeoff_request_statuses(request_ids, status):
+    """
+    Set many requests to 'approved' or 'rejected' in one transaction. Requests changing TO approved have their days written
+    to the timesheet (non-contractors only), with one executemany for all days and one totals refresh per employee week.
+    Returns one result per distinct id, in order: {"id", "ok", "previous_status", "days_applied", "error"}.
+    """
+    ids = list(dict.fromkeys(int(i) for i in request_ids))
+    if status not in ("approved", "rejected"):
+        return [{"id": i, "ok": False, "previous_status": None, "days_applied": 0, "error": "invalid status"} for i in ids]
+    if not ids:
+        return []
+    results = []
     with _conn() as conn:
-        conn.execute(
-            "UPDATE time_off_requests SET status = ?, updated_at = ? WHERE id = ?",
-            (status, now, request_id),
-        )
+        found = {}
+        for chunk_start in range(0, len(ids), 500):
+            chunk = ids[chunk_start:chunk_start + 500]
+            rows = conn.execute(f"""
+                SELECT r.id, r.employee_id, r.from_date, r.to_date, r.notes, r.hours_per_day, r.status, e.employment_type
+                FROM time_off_requests r
+                JOIN employees e ON e.id = r.employee_id
+                WHERE r.id IN ({",".join("?" * len(chunk))})
+            """, chunk).fetchall()
+            found.update((r["id"], r) for r in rows)
+        now = datetime.utcnow().isoformat()
+        entry_now = now + "Z"
+        entry_rows = []
+        weeks = set()
+        for request_id in ids:
+            req = found.get(request_id)
+            if req is None:
+                results.append({"id": request_id, "ok": False, "previous_status": None, "days_applied": 0, "error": "not found"})
+                continue
+            days_applied = 0
+            is_contractor = (req["employment_type"] or "").strip().lower() == "contractor"
+            # Apply time off to timesheet only when changing TO approved and not already approved
+            if status == "approved" and req["status"] != "approved" and not is_contractor and req["notes"] in TIME_OFF_NOTES:
+                from_d = date.fromisoformat(req["from_date"])
+                to_d = date.fromisoformat(req["to_date"])
+                hours = req["hours_per_day"] if req["hours_per_day"] is not None else 8
+                d = from_d
+                while d <= to_d:
+                    entry_rows.append(_time_entry_params(req["employee_id"], d, None, None, None, None, hours, 0, 0, None, req["notes"], entry_now))
+                    d += timedelta(days=1)
+                    days_applied += 1
+                week = get_week_start(from_d)
+                while week <= to_d:
+                    weeks.add((req["employee_id"], week))
+                    week += timedelta(days=7)
+            results.append({"id": request_id, "ok": True, "previous_status": req["status"], "days_applied": days_applied, "error": None})
+        updated = [r["id"] for r in results if r["ok"]]
+        if updated:
+            conn.executemany("UPDATE time_off_requests SET status = ?, updated_at = ? WHERE id = ?", [(status, now, i) for i in updated])
+            conn.executemany("UPDATE time_off_request_days SET status = ? WHERE request_id = ?", [(status, i) for i in updated])
+            _bump_data_version(conn, DATA_VERSION_TIMEOFF)
+        if entry_rows:
+            conn.executemany(_UPSERT_TIME_ENTRY_SQL, entry_rows)
+            for employee_id, week in sorted(weeks):
+                _refresh_week_totals(conn, employee_id, week)
         conn.commit()
-    # Apply time off to timesheet only when changing TO approved and not already approved
-    if status == "approved" and current != "approved":
-        employee = get_employee_by_id(req["employee_id"])
-        is_contractor = employee and (employee.get("employment_type") or "").strip().lower() == "contractor"
-        if not is_contractor:
-            from_d = date.fromisoformat(req["from_date"])
-            to_d = date.fromisoformat(req["to_date"])
-            hours = req.get("hours_per_day")
-            if hours is None:
-                hours = 8
-            submit_timeoff(req["employee_id"], from_d, to_d, req["notes"], hours_per_day=hours)
-    return True
+    return results
 
 
-def discard_timeoff_request(request_id, employee_id):
-    """Let an employee cancel their own pending or approved time-off request. Sets status to 'cancelled'. Does not remove time-off hours from the timesheet."""
+def discard_timeoff_request(request_id, employee_id, notifications=()):
+    """Let an employee cancel their own pending or approved time-off request. Sets status to 'cancelled'. Does not remove time-off hours from the timesheet.
+    notifications: (channel, payload) pairs queued in notification_outbox in the same transaction."""
     req = get_timeoff_request_by_id(request_id)
     if not req or req.get("employee_id") != employee_id:
         return False
     if req.get("status") not in ("pending", "approved"):
         return False
-    now = datetime.utcnow().isoformat()
     with _conn() as conn:
-        conn.execute(
-            "UPDATE time_off_requests SET status = 'cancelled', updated_at = ? WHERE id = ?",
-            (now, request_id),
-        )
+        _set_timeoff_request_status(conn, request_id, "cancelled")
+        for channel, payload in notifications:
+            _enqueue_notification(conn, channel, payload)
         conn.commit()
     return True
 
@@ -593,12 +1603,8 @@ def admin_discard_timeoff_request(request_id):
     req = get_timeoff_request_by_id(request_id)
     if not req:
         return False
-    now = datetime.utcnow().isoformat()
     with _conn() as conn:
-        conn.execute(
-            "UPDATE time_off_requests SET status = 'cancelled', updated_at = ? WHERE id = ?",
-            (now, request_id),
-        )
+        _set_timeoff_request_status(conn, request_id, "cancelled")
         conn.commit()
     return True
 
@@ -606,7 +1612,9 @@ def admin_discard_timeoff_request(request_id):
 def delete_timeoff_request(request_id):
     """Permanently delete a time-off request. Returns True if a row was deleted."""
     with _conn() as conn:
+        conn.execute("DELETE FROM time_off_request_days WHERE request_id = ?", (request_id,))
         cur = conn.execute("DELETE FROM time_off_requests WHERE id = ?", (request_id,))
+        _bump_data_version(conn, DATA_VERSION_TIMEOFF)
         conn.commit()
     return cur.rowcount > 0
 
@@ -623,50 +1631,142 @@ def get_employee_timeoff_requests(employee_id):
         return [dict(r) for r in rows]
 
 
-def get_cancelled_timeoff_employee_dates(start_date, end_date):
-    """Return set of (employee_id, work_date_str) for dates in [start_date, end_date] that fall within a cancelled time-off request. Used by calendar to show cancelled (strikethrough) even when the entry came from time_entries."""
-    if isinstance(start_date, str):
-        start_date = date.fromisoformat(start_date)
-    if isinstance(end_date, str):
-        end_date = date.fromisoformat(end_date)
-    start_str = start_date.isoformat()
-    end_str = end_date.isoformat()
+def get_disapproved_timeoff_dates(employee_id, start_date, end_date):
+    """Return set of date strings (YYYY-MM-DD) in [start_date, end_date] that fall within any rejected time-off request for this employee."""
     with _conn() as conn:
         rows = conn.execute("""
-            SELECT employee_id, from_date, to_date FROM time_off_requests
-            WHERE status = 'cancelled'
-            AND from_date <= ? AND to_date >= ?
-        """, (end_str, start_str)).fetchall()
-    result = set()
-    for r in rows:
-        from_d = date.fromisoformat(r[1])
-        to_d = date.fromisoformat(r[2])
-        d = from_d
-        while d <= to_d:
-            if start_date <= d <= end_date:
-                result.add((r[0], d.isoformat()))
-            d += timedelta(days=1)
-    return result
+            SELECT work_date FROM time_off_request_days
+            WHERE employee_id = ? AND work_date >= ? AND work_date <= ? AND status = 'rejected'
+        """, (employee_id, start_date.isoformat(), end_date.isoformat())).fetchall()
+    return {r[0] for r in rows}
 
 
-def get_disapproved_timeoff_dates(employee_id, start_date, end_date):
-    """Return set of date strings (YYYY-MM-DD) in [start_date, end_date] that fall within any rejected time-off request for this employee."""
-    start_str = start_date.isoformat()
-    end_str = end_date.isoformat()
+# --- Notification outbox ---
+
+def _utc_iso(seconds_from_now=0):
+    return (datetime.utcnow() + timedelta(seconds=seconds_from_now)).isoformat()
+
+
+def _enqueue_notification(conn, channel, payload):
+    """Queue one notification on conn (caller commits). payload: JSON text."""
+    now = _utc_iso()
+    conn.execute(
+        "INSERT INTO notification_outbox (channel, payload, status, next_attempt_at, created_at) VALUES (?, ?, 'pending', ?, ?)",
+        (channel, payload, now, now),
+    )
+
+
+def claim_due_notifications(limit, lease_seconds):
+    """
+    Lease up to limit due notifications (pending and due, or sending with an expired lease) for lease_seconds and
+    return them oldest first. A row is only returned to one caller, so several dispatchers (processes) can share the outbox.
+    """
+    now = _utc_iso()
+    locked_until = _utc_iso(lease_seconds)
     with _conn() as conn:
         rows = conn.execute("""
-            SELECT from_date, to_date FROM time_off_requests
-            WHERE employee_id = ? AND status = 'rejected'
-            AND from_date <= ? AND to_date >= ?
-        """, (employee_id, end_str, start_str)).fetchall()
-    result = set()
-    for r in rows:
-        from_d = date.fromisoformat(r[0])
-        to_d = date.fromisoformat(r[1])
-        d = from_d
-        while d <= to_d:
-            if start_date <= d <= end_date:
-                result.add(d.isoformat())
-            d += timedelta(days=1)
-    return result
+            SELECT * FROM notification_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND locked_until <= ?)
+            ORDER BY id
+            LIMIT ?
+        """, (now, now, limit)).fetchall()
+        claimed = []
+        for r in rows:
+            cur = conn.execute(
+                "UPDATE notification_outbox SET status = 'sending', locked_until = ? WHERE id = ? AND status = ? AND COALESCE(locked_until, '') = ?",
+                (locked_until, r["id"], r["status"], r["locked_until"] or ""),
+            )
+            if cur.rowcount:
+                claimed.append(dict(r, status="sending", locked_until=locked_until))
+        conn.commit()
+    return claimed
+
+
+def mark_notification_sent(notification_id):
+    with _conn() as conn:
+        conn.execute(
+            "UPDATE notification_outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, locked_until = NULL, last_error = NULL WHERE id = ?",
+            (_utc_iso(), notification_id),
+        )
+        conn.commit()
+
 
+def mark_notification_failed(notification_id, error, retry_in_seconds=None):
+    """Record a failed attempt: back to pending (due in retry_in_seconds) or, when retry_in_seconds is None, failed for good."""
+    with _conn() as conn:
+        if retry_in_seconds is None:
+            conn.execute(
+                "UPDATE notification_outbox SET status = 'failed', attempts = attempts + 1, locked_until = NULL, last_error = ? WHERE id = ?",
+                (error, notification_id),
+            )
+        else:
+            conn.execute(
+                "UPDATE notification_outbox SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, locked_until = NULL, last_error = ? WHERE id = ?",
+                (_utc_iso(retry_in_seconds), error, notification_id),
+            )
+        conn.commit()
+
+
+def get_notification_outbox_counts():
+    """Return {status: count} for the notification outbox."""
+    with _conn() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM notification_outbox GROUP BY status").fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def benchmark_version_check(iterations=20000):
+    """
+    Microseconds per cache version check for one week's scopes (employees, rebuilds, time off, the week) on a held
+    connection: "unchanged" when nothing was committed since the last check (PRAGMA data_version only),
+    "after_commit" right after another connection committed (scopes re-read), and "query" for the SUM over
+    data_versions each check would otherwise run.
+    """
+    scopes = (DATA_VERSION_EMPLOYEES, DATA_VERSION_ALL, DATA_VERSION_TIMEOFF, _week_scope(get_week_start(date.today())))
+    results = {}
+    with _conn() as conn:
+        _scopes_version(conn, scopes)
+        start = perf_counter()
+        for _ in range(iterations):
+            _scopes_version(conn, scopes)
+        results["unchanged"] = (perf_counter() - start) / iterations * 1e6
+        start = perf_counter()
+        for _ in range(iterations):
+            _query_scopes_version(conn, scopes)
+        results["query"] = (perf_counter() - start) / iterations * 1e6
+        other = _open_conn()
+        try:
+            commits = max(1, iterations // 20)
+            elapsed = 0.0
+            for _ in range(commits):
+                # A commit that changes the file but leaves no rows behind.
+                other.execute("INSERT INTO data_versions (scope, version) VALUES ('benchmark', 0)")
+                other.execute("DELETE FROM data_versions WHERE scope = 'benchmark'")
+                other.commit()
+                start = perf_counter()
+                _scopes_version(conn, scopes)
+                elapsed += perf_counter() - start
+            results["after_commit"] = elapsed / commits * 1e6
+        finally:
+            other.close()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Timesheet database maintenance.")
+    parser.add_argument("command", choices=["rebuild-week-totals", "bench-version-check"],
+                        help="rebuild-week-totals: recompute employee_week_totals from time_entries; "
+                             "bench-version-check: time the cache version check against this database")
+    parser.add_argument("--iterations", type=int, default=20000, help="bench-version-check: calls to time")
+    args = parser.parse_args()
+    if args.command == "rebuild-week-totals":
+        init_db()
+        print(f"Rebuilt {rebuild_week_totals()} employee week totals in {config.DATABASE_PATH}.")
+    elif args.command == "bench-version-check":
+        init_db()
+        timings = benchmark_version_check(args.iterations)
+        print(f"Version check on {config.DATABASE_PATH} ({args.iterations} calls):")
+        print(f"  unchanged (PRAGMA data_version only): {timings['unchanged']:.1f} us")
+        print(f"  after another connection committed:  {timings['after_commit']:.1f} us")
+        print(f"  SUM query over data_versions:         {timings['query']:.1f} us")
@@ -0,0 +1,193 @@
+"""
+Background export jobs. Large admin exports are queued instead of built inside the request: a bounded thread
+pool runs the builder, the finished file is kept on disk, and the client polls for status and then downloads it.
+Finished jobs (and their files) expire after a TTL; expired jobs are purged whenever the queue is used.
+Each job's status is also written next to its file in a shared directory, so under several worker processes the
+status poll and the download can be answered by a different worker than the one building the export. Only files
+named after a job id (<job_id>.json, <job_id>.xlsx) are ever read from or deleted in that directory, and it must be
+owned by this user with mode 0700, so nobody else can plant a status file or an export in it.
+"""
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+_JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_JOB_FILE_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}\.(?:json|xlsx)$")
+
+
+def default_directory(database_path):
+    """
+    <database name>-exports next to the database file (timesheet/timesheet.db -> timesheet/timesheet-exports): the
+    worker processes of one deployment share it, and it sits in a directory the deployment already owns rather than
+    in the shared system temp directory.
+    """
+    return os.path.splitext(os.path.abspath(database_path))[0] + "-exports"
+
+
+class ExportJobs:
+    """
+    Job registry + worker pool. A builder is a callable returning (binary file object, download filename).
+    Submitting the same key while a job for it is still queued/running returns that job instead of queueing a duplicate.
+    Duplicate detection and max_pending apply per process; directory must be the same for every worker of one
+    deployment and not shared with another (see default_directory and check_directory).
+    """
+
+    def __init__(self, max_workers, ttl_seconds, max_pending, directory):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._jobs = {}  # job_id -> dict(status, key, filename, error, created, finished)
+        self._executor = None
+        self._dir = directory
+        self._dir_checked = False
+
+    def check_directory(self):
+        """
+        Create the directory (mode 0700) if missing and refuse to use it unless it is a real directory (not a symlink)
+        owned by this user with mode 0700: otherwise another local account could have created it first and plant status
+        files or exports for other workers to serve. Raises RuntimeError; create_app calls this at startup.
+        """
+        if self._dir_checked:
+            return
+        os.makedirs(self._dir, mode=0o700, exist_ok=True)
+        st = os.lstat(self._dir)
+        if not stat.S_ISDIR(st.st_mode):
+            raise RuntimeError(f"Export job directory {self._dir} is not a directory")
+        if hasattr(os, "getuid") and (st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700):
+            raise RuntimeError(
+                f"Export job directory {self._dir} must be owned by uid {os.getuid()} with mode 0700 "
+                f"(found uid {st.st_uid}, mode {stat.S_IMODE(st.st_mode):o})"
+            )
+        self._dir_checked = True
+
+    def _start(self):
+        if self._executor is None:
+            self.check_directory()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export-job")
+
+    def _status_path(self, job_id):
+        return os.path.join(self._dir, job_id + ".json")
+
+    def _file_path(self, job_id):
+        return os.path.join(self._dir, job_id + ".xlsx")
+
+    def _publish(self, job_id, job):
+        """Write the job's status file for other workers (atomic replace). finished_at is wall-clock time, shared across processes."""
+        status = {"status": job["status"], "filename": job["filename"], "error": job["error"],
+                  "finished_at": time.time() if job["finished"] is not None else None}
+        tmp = self._status_path(job_id) + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(status, f)
+            os.replace(tmp, self._status_path(job_id))
+        except OSError:
+            logger.exception("Could not write status for export job %s", job_id)
+
+    def submit(self, key, build):
+        """Queue build() and return its job id, or None when max_pending jobs are already waiting or running."""
+        self.purge_expired()
+        with self._lock:
+            for job_id, job in self._jobs.items():
+                if job["key"] == key and job["status"] in (QUEUED, RUNNING):
+                    return job_id
+            if sum(1 for j in self._jobs.values() if j["status"] in (QUEUED, RUNNING)) >= self.max_pending:
+                return None
+            self._start()
+            job_id = secrets.token_urlsafe(16)
+            self._jobs[job_id] = {"status": QUEUED, "key": key, "filename": None, "error": None,
+                                  "created": monotonic(), "finished": None}
+            self._publish(job_id, self._jobs[job_id])
+        self._executor.submit(self._run, job_id, build)
+        return job_id
+
+    def _run(self, job_id, build):
+        with self._lock:
+            self._jobs[job_id]["status"] = RUNNING
+            self._publish(job_id, self._jobs[job_id])
+        path = self._file_path(job_id)
+        try:
+            fileobj, filename = build()
+            with fileobj, open(path, "wb") as out:
+                shutil.copyfileobj(fileobj, out)
+        except Exception as e:
+            logger.exception("Export job %s failed", job_id)
+            if os.path.exists(path):
+                os.remove(path)
+            update = {"status": FAILED, "error": str(e) or e.__class__.__name__}
+        else:
+            update = {"status": DONE, "filename": filename}
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(update, finished=monotonic())
+                self._publish(job_id, job)
+
+    def get(self, job_id):
+        """
+        Snapshot of the job (status, filename, path, error) or None if unknown or expired. Jobs of other workers are read
+        from their status file. path is always <directory>/<job_id>.xlsx, never taken from a status file.
+        """
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job, path=self._file_path(job_id))
+        if not _JOB_ID_RE.match(job_id or ""):
+            return None
+        self.check_directory()
+        try:
+            with open(self._status_path(job_id), encoding="utf-8") as f:
+                status = json.load(f)
+            job = {"status": status["status"], "filename": status["filename"], "error": status["error"]}
+            finished_at = status["finished_at"]
+            expired = finished_at is not None and finished_at < time.time() - self.ttl_seconds
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        if expired or job["status"] not in (QUEUED, RUNNING, DONE, FAILED):
+            return None
+        return dict(job, path=self._file_path(job_id))
+
+    def purge_expired(self):
+        """Forget finished jobs older than ttl_seconds and delete their files (this worker's, and stale ones left by others)."""
+        cutoff = monotonic() - self.ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job["finished"] is not None and job["finished"] < cutoff]
+            paths = []
+            for job_id in expired:
+                del self._jobs[job_id]
+                paths += [self._file_path(job_id), self._status_path(job_id)]
+        # Files of jobs from other (possibly exited) workers: job files untouched for twice the TTL. Nothing else in the
+        # directory is touched, even if it is old.
+        stale_before = time.time() - 2 * self.ttl_seconds
+        try:
+            with os.scandir(self._dir) as entries:
+                paths += [e.path for e in entries
+                          if _JOB_FILE_RE.match(e.name) and e.is_file(follow_symlinks=False) and e.stat().st_mtime < stale_before]
+        except OSError:
+            pass
+        for path in paths:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Return job counts by status."""
+        with self._lock:
+            stats = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                stats[job["status"]] += 1
+        return stats
@@ -0,0 +1,242 @@
+"""
+Time-off notifications (email and Microsoft Teams Incoming Webhook) delivered through the notification_outbox table.
+Request handlers only build the messages (timeoff_notifications) and queue them in the same transaction as the
+request; OutboxDispatcher sends them from a background thread, keeping one SMTP session open while mail is queued,
+and retries failures with exponential backoff before marking them failed. The SMTP, MIME and HTTP modules are only
+imported when something is sent.
+"""
+import json
+import logging
+import threading
+from time import monotonic
+
+import config
+import database as db
+
+logger = logging.getLogger(__name__)
+
+EMAIL = "email"
+TEAMS = "teams"
+
+
+def get_timeoff_notify_emails():
+    """Return list of email addresses to receive time-off notifications. Only from Admin settings (no config default)."""
+    primary_raw = (db.get_setting("timeoff_notify_email") or "").strip()
+    emails = []
+    for part in primary_raw.replace(";", ",").split(","):
+        email = part.strip()
+        if email and "@" in email and email not in emails:
+            emails.append(email)
+    return emails
+
+
+def timeoff_notifications(employee_name, from_str, to_str, notes, cancelled=False):
+    """
+    Outbox messages for a submitted (or cancelled) time-off request: [(channel, payload JSON)]. Email when SMTP and an
+    admin notification address are configured; Teams when a webhook URL is saved in Admin → Settings.
+    """
+    messages = []
+    smtp_host = (getattr(config, "SMTP_HOST", None) or "").strip()
+    to_emails = get_timeoff_notify_emails()
+    if to_emails and smtp_host:
+        if cancelled:
+            subject = f"Time off request cancelled: {employee_name} — {notes} ({from_str} to {to_str})"
+            intro = "An employee has cancelled their time-off request."
+        else:
+            subject = f"Time off request: {employee_name} — {notes} ({from_str} to {to_str})"
+            intro = "An employee has submitted a time-off request."
+        body = (
+            f"{intro}\n\n"
+            f"Employee: {employee_name}\n"
+            f"Type: {notes}\n"
+            f"From: {from_str}\n"
+            f"To: {to_str}\n"
+        )
+        messages.append((EMAIL, json.dumps({"to": to_emails, "subject": subject, "body": body})))
+    elif to_emails and not smtp_host:
+        logger.warning("Time-off email skipped: SMTP not configured. Configure SMTP to send to %s.", to_emails)
+    elif not to_emails:
+        logger.info("Time-off email skipped: no notification email in Admin settings.")
+
+    webhook_url = (db.get_setting("timeoff_teams_webhook_url") or "").strip()
+    if not webhook_url or not webhook_url.startswith("https://"):
+        if not webhook_url:
+            logger.info("Teams webhook skipped: no URL configured (save URL in Admin → Settings).")
+        else:
+            logger.warning("Teams webhook skipped: URL invalid or not https (length=%d).", len(webhook_url))
+    else:
+        if cancelled:
+            title = "Time off request cancelled"
+            text = f"**{employee_name}** has cancelled their time-off request.\n\nType: {notes}\nFrom: {from_str} to {to_str}"
+        else:
+            title = "Time off request"
+            text = f"**{employee_name}** has submitted a time-off request.\n\nType: {notes}\nFrom: {from_str} to {to_str}"
+        # Simple text payload; Teams Incoming Webhook accepts {"text": "..."} for plain/markdown
+        messages.append((TEAMS, json.dumps({"url": webhook_url, "text": f"### {title}\n\n{text}"})))
+    return messages
+
+
+def _smtp_from_address():
+    from_addr = (getattr(config, "SMTP_FROM", None) or "").strip() or (getattr(config, "SMTP_USER", None) or "")
+    return from_addr or "timesheet@localhost"
+
+
+class _SmtpSession:
+    """One SMTP connection reused across messages; reconnects after errors and closes after idle_seconds without mail."""
+
+    def __init__(self, idle_seconds):
+        self.idle_seconds = idle_seconds
+        self._smtp = None
+        self._last_used = 0.0
+
+    def send(self, from_addr, to_emails, message):
+        if self._smtp is None:
+            import smtplib
+
+            smtp = smtplib.SMTP(config.SMTP_HOST, getattr(config, "SMTP_PORT", 587), timeout=15)
+            try:
+                if getattr(config, "SMTP_USE_TLS", True):
+                    smtp.starttls()
+                smtp_user = (getattr(config, "SMTP_USER", None) or "").strip()
+                smtp_password = getattr(config, "SMTP_PASSWORD", None) or ""
+                if smtp_user and smtp_password:
+                    smtp.login(smtp_user, smtp_password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+        try:
+            self._smtp.sendmail(from_addr, to_emails, message)
+        except Exception:
+            self.close()
+            raise
+        self._last_used = monotonic()
+
+    def idle_for(self):
+        return monotonic() - self._last_used if self._smtp is not None else None
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+
+class OutboxDispatcher:
+    """
+    Background sender for notification_outbox. wake() starts the thread on first use and nudges it after a message is
+    queued; otherwise it polls every poll_seconds (retries, and rows queued by other processes). Rows are leased while
+    being sent, so more than one process can run a dispatcher against the same database.
+    """
+
+    def __init__(self, poll_seconds, max_attempts, retry_base_seconds, retry_max_seconds, smtp_idle_seconds, batch_size=20):
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.batch_size = batch_size
+        self._smtp = _SmtpSession(smtp_idle_seconds)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counters = {"sent": 0, "retried": 0, "failed": 0}
+
+    def wake(self):
+        """Start the dispatcher thread if needed and have it look at the outbox now."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            try:
+                sent_any = self.dispatch_once()
+            except Exception:
+                logger.exception("Notification outbox dispatch failed")
+                sent_any = False
+            if sent_any:
+                continue
+            wait = self.poll_seconds
+            idle = self._smtp.idle_for()
+            if idle is not None:
+                if idle >= self._smtp.idle_seconds:
+                    self._smtp.close()
+                else:
+                    wait = min(wait, self._smtp.idle_seconds - idle)
+            self._wakeup.wait(wait)
+        self._smtp.close()
+
+    def dispatch_once(self):
+        """Send one batch of due notifications. Returns True if any were claimed."""
+        batch = db.claim_due_notifications(self.batch_size, lease_seconds=300)
+        for row in batch:
+            try:
+                self._deliver(row)
+            except Exception as e:
+                self._record_failure(row, e)
+            else:
+                db.mark_notification_sent(row["id"])
+                with self._lock:
+                    self._counters["sent"] += 1
+        return bool(batch)
+
+    def _deliver(self, row):
+        payload = json.loads(row["payload"])
+        if row["channel"] == EMAIL:
+            from email.mime.multipart import MIMEMultipart
+            from email.mime.text import MIMEText
+
+            from_addr = _smtp_from_address()
+            msg = MIMEMultipart("alternative")
+            msg["Subject"] = payload["subject"]
+            msg["From"] = from_addr
+            msg["To"] = ", ".join(payload["to"])
+            msg.attach(MIMEText(payload["body"], "plain"))
+            self._smtp.send(from_addr, payload["to"], msg.as_string())
+            logger.info("Time-off notification email sent to %s.", payload["to"])
+        elif row["channel"] == TEAMS:
+            from urllib.request import Request, urlopen
+
+            req = Request(payload["url"], data=json.dumps({"text": payload["text"]}).encode("utf-8"), method="POST",
+                          headers={"Content-Type": "application/json"})
+            with urlopen(req, timeout=10) as resp:
+                if not 200 <= resp.status < 300:
+                    raise OSError(f"Teams webhook returned status {resp.status}")
+            logger.info("Time-off Teams notification sent.")
+        else:
+            raise ValueError(f"Unknown notification channel {row['channel']!r}")
+
+    def _record_failure(self, row, error):
+        attempts = row["attempts"] + 1
+        message = str(error) or error.__class__.__name__
+        if attempts >= self.max_attempts:
+            logger.error("Notification %s (%s) failed after %d attempts: %s", row["id"], row["channel"], attempts, message)
+            db.mark_notification_failed(row["id"], message)
+            with self._lock:
+                self._counters["failed"] += 1
+            return
+        delay = min(self.retry_base_seconds * (2 ** (attempts - 1)), self.retry_max_seconds)
+        logger.warning("Notification %s (%s) attempt %d failed, retrying in %ss: %s", row["id"], row["channel"], attempts, delay, message)
+        db.mark_notification_failed(row["id"], message, retry_in_seconds=delay)
+        with self._lock:
+            self._counters["retried"] += 1
+
+    def stats(self):
+        """Return counters for this process (sent, retried, failed) plus outbox row counts by status."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["outbox"] = db.get_notification_outbox_counts()
+        return stats
@@ -0,0 +1,138 @@
+"""
+Opt-in request profiling (config.PROFILE_REQUESTS): wall time, SQL statement count and SQL time per Flask endpoint.
+Statements are timed by the profiled connections in database (profile_start / profile_stop around each request);
+RequestMetrics keeps every endpoint's last `window` requests for percentiles plus running totals, and the most recent
+statements slower than the threshold with their EXPLAIN QUERY PLAN. Figures are per process: with several worker
+processes each one reports the requests it served.
+"""
+import threading
+from collections import deque
+from datetime import datetime
+
+import database as db
+
+# Plans of slow statements are cached by SQL text; the cache is emptied when it reaches this many statements.
+_PLAN_CACHE_SIZE = 256
+
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    """Rolling per-endpoint request and SQL figures for this process, and recent slow statements."""
+
+    def __init__(self, window, slow_sql_ms, slow_keep=50):
+        self.window = window
+        self.slow_sql_seconds = slow_sql_ms / 1000
+        self._lock = threading.Lock()
+        # endpoint -> {"recent": deque of (wall s, statements, sql s), "requests", "wall_seconds", "statements", "sql_seconds", "slow_statements"}
+        self._endpoints = {}
+        self._slow = deque(maxlen=slow_keep)
+        self._plans = {}
+
+    def _plan(self, sql, parameters):
+        plan = self._plans.get(sql)
+        if plan is None:
+            if len(self._plans) >= _PLAN_CACHE_SIZE:
+                self._plans.clear()
+            plan = self._plans[sql] = db.explain_query_plan(sql, parameters)
+        return plan
+
+    def record(self, endpoint, wall_seconds, statements):
+        """Add one request: its wall time and the statements recorded for it ([[sql, parameters, seconds]], see db.profile_stop)."""
+        sql_seconds = sum(s[2] for s in statements)
+        # Only slow statements are explained, after the request's own profile has been closed.
+        slow = [
+            {"endpoint": endpoint, "sql": " ".join(sql.split()), "ms": seconds * 1000, "plan": self._plan(sql, parameters),
+             "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            for sql, parameters, seconds in statements if seconds >= self.slow_sql_seconds
+        ]
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {"recent": deque(maxlen=self.window), "requests": 0, "wall_seconds": 0.0,
+                                                     "statements": 0, "sql_seconds": 0.0, "slow_statements": 0}
+            stats["recent"].append((wall_seconds, len(statements), sql_seconds))
+            stats["requests"] += 1
+            stats["wall_seconds"] += wall_seconds
+            stats["statements"] += len(statements)
+            stats["sql_seconds"] += sql_seconds
+            stats["slow_statements"] += len(slow)
+            self._slow.extend(slow)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+
+    def snapshot(self):
+        """
+        {"endpoints": [...], "slow": [...]}. Endpoints (busiest first by total wall time): requests, wall_seconds, and over
+        the rolling window: p50_ms, p95_ms, max_ms, statements_avg, statements_max, sql_ms_avg, sql_share (SQL time / wall
+        time). Slow statements newest first: endpoint, sql, ms, plan (lines), at.
+        """
+        with self._lock:
+            endpoints = [(name, dict(stats, recent=list(stats["recent"]))) for name, stats in self._endpoints.items()]
+            slow = list(reversed(self._slow))
+        rows = []
+        for name, stats in endpoints:
+            recent = stats["recent"]
+            walls = sorted(r[0] for r in recent)
+            wall_total = sum(walls)
+            sql_total = sum(r[2] for r in recent)
+            rows.append({
+                "endpoint": name,
+                "requests": stats["requests"],
+                "wall_seconds": stats["wall_seconds"],
+                "statements": stats["statements"],
+                "sql_seconds": stats["sql_seconds"],
+                "slow_statements": stats["slow_statements"],
+                "window": len(recent),
+                "p50_ms": _percentile(walls, 50) * 1000,
+                "p95_ms": _percentile(walls, 95) * 1000,
+                "max_ms": walls[-1] * 1000,
+                "statements_avg": sum(r[1] for r in recent) / len(recent),
+                "statements_max": max(r[1] for r in recent),
+                "sql_ms_avg": sql_total / len(recent) * 1000,
+                "sql_share": sql_total / wall_total if wall_total else 0.0,
+            })
+        rows.sort(key=lambda r: r["wall_seconds"], reverse=True)
+        return {"endpoints": rows, "slow": slow}
+
+    def prometheus(self, groups=()):
+        """
+        Prometheus text exposition: request duration summaries (window quantiles, running sum and count), SQL statement,
+        SQL time and slow statement counters per endpoint. groups: (metric name, help, {stat: number}) exported as
+        gauges labelled by stat (non-numeric values are skipped).
+        """
+        endpoints = self.snapshot()["endpoints"]
+        lines = [
+            "# HELP timesheet_request_duration_seconds Request wall time per endpoint (quantiles over the recent window).",
+            "# TYPE timesheet_request_duration_seconds summary",
+        ]
+        for r in endpoints:
+            label = f'endpoint="{_label(r["endpoint"])}"'
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                lines.append(f'timesheet_request_duration_seconds{{{label},quantile="{quantile}"}} {r[key] / 1000:.6f}')
+            lines.append(f"timesheet_request_duration_seconds_sum{{{label}}} {r['wall_seconds']:.6f}")
+            lines.append(f"timesheet_request_duration_seconds_count{{{label}}} {r['requests']}")
+        counters = (
+            ("timesheet_sql_statements_total", "SQL statements run by requests, per endpoint.", "statements", "d"),
+            ("timesheet_sql_duration_seconds_total", "Time spent in SQL statements (execute and fetch), per endpoint.", "sql_seconds", ".6f"),
+            ("timesheet_sql_slow_statements_total", "SQL statements over the slow threshold, per endpoint.", "slow_statements", "d"),
+        )
+        for name, help_text, key, fmt in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{endpoint="{_label(r["endpoint"])}"}} {r[key]:{fmt}}' for r in endpoints]
+        for name, help_text, stats in groups:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f'{name}{{stat="{_label(stat)}"}} {value}' for stat, value in stats.items()
+                      if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        return "\n".join(lines) + "\n"
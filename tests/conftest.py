@@ -0,0 +1,60 @@
+"""Shared fixtures: every test gets its own SQLite database and a logged-in test client factory."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import database as db  # noqa: E402
+import export_jobs as jobs  # noqa: E402
+
+PASSWORD_HASH = "pbkdf2:sha256:1000$test$" + "0" * 64
+
+
+def _reset_caches():
+    # Module-level caches would otherwise carry rows over from the previous test's database.
+    db.employee_directory.invalidate()
+    db.invalidate_employee_cache()
+    db._settings_cache[:] = [None, {}]
+    with db._calendar_cache_lock:
+        db._calendar_cache.clear()
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh, migrated database at tmp_path/timesheet.db for this test."""
+    monkeypatch.setattr(config, "DATABASE_PATH", str(tmp_path / "timesheet.db"))
+    db.close_pool()
+    _reset_caches()
+    db.init_db()
+    yield db
+    db.close_pool()
+    _reset_caches()
+
+
+@pytest.fixture
+def app(database, monkeypatch):
+    import app as appmod
+
+    appmod.export_cache.clear()
+    monkeypatch.setattr(appmod, "export_jobs", jobs.ExportJobs(1, 60, 5, jobs.default_directory(config.DATABASE_PATH)))
+    appmod.app.config["TESTING"] = True
+    with db._conn() as conn:
+        db.create_employee(conn, "admin", PASSWORD_HASH, "admin", is_admin=True)
+    # The admin already exists, so create_app skips hashing a default password.
+    yield appmod.create_app(start_notifier=False)
+    appmod.export_cache.clear()
+
+
+@pytest.fixture
+def admin_client(app):
+    """Test client logged in as the admin account."""
+    admin = db.get_employee_by_username("admin")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = admin["id"]
+        session["full_name"] = admin["full_name"]
+        session["is_admin"] = True
+    return client
@@ -0,0 +1,55 @@
+"""benchmark.py smoke test: generate a tiny dataset, run one route on it, and compare two saved result files."""
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+
+import benchmark
+import database as db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_generate_run_and_compare(app, tmp_path, capsys):
+    counts = benchmark.generate(employees=6, weeks=2, seed=3, timeoff_per_employee=2)
+    assert counts["employees"] == 6
+    with db._conn() as conn:
+        weeks, dataset = benchmark._dataset(conn)
+        statuses = {r[0] for r in conn.execute("SELECT DISTINCT status FROM time_off_requests")}
+    assert dataset["employees"] == 6 + 2  # plus bench-admin and the test app's admin
+    # Approved requests add time-off entries on top of the generated punches.
+    assert dataset["time_entries"] >= counts["time_entries"] > 0
+    assert dataset["timeoff_requests"] == counts["timeoff_requests"]
+    assert len(weeks) == 2 and weeks[-1] == db.get_week_start(date.today())
+    assert "pending" in statuses and statuses <= {"pending", "approved", "rejected", "cancelled"}
+    entries = [e for week in db.get_entries_for_week_by_employee(weeks[0]).values() for e in week if e["clock_in"]]
+    assert entries and all(e["shift"] in ("day", "swing", "graveyard") and e["regular_hours"] > 0 for e in entries)
+
+    document = benchmark.run(iterations=2, warmup=1, only=["api_roster_week", "timesheet_employee"])
+    assert set(document["results"]) == {"api_roster_week", "timesheet_employee"}
+    for result in document["results"].values():
+        assert result["n"] == 2 and 0 < result["p50_ms"] <= result["max_ms"] and result["statements"] > 0
+    assert document["dataset"] == dataset and document["startup_modules"] is None
+    benchmark.print_results(document)
+    assert "api_roster_week" in capsys.readouterr().out
+
+    old_path = benchmark.save_results(document, str(tmp_path / "results"))
+    slower = json.loads(json.dumps(document))
+    slower["created_at"] = "2099-01-01T00:00:00Z"
+    slower["results"]["api_roster_week"]["p50_ms"] = document["results"]["api_roster_week"]["p50_ms"] * 2
+    slower["results"]["timesheet_employee"]["statements"] += 1
+    slower["startup_modules"] = ["numpy"]
+    new_path = benchmark.save_results(slower, str(tmp_path / "results"))
+    assert old_path != new_path and os.path.dirname(old_path) == str(tmp_path / "results")
+
+    old, new = benchmark._load(old_path), benchmark._load(new_path)
+    assert old == document
+    assert benchmark.compare(old, old) == []
+    assert benchmark.compare(old, new) == ["timesheet_employee", "api_roster_week", "startup_modules"]
+    assert "<-- slower" in capsys.readouterr().out
+
+    # The command line exits 1 on a regression and 0 otherwise.
+    command = [sys.executable, os.path.join(ROOT, "benchmark.py"), "compare"]
+    assert subprocess.run(command + [old_path, old_path], cwd=ROOT, capture_output=True).returncode == 0
+    assert subprocess.run(command + [old_path, new_path], cwd=ROOT, capture_output=True).returncode == 1
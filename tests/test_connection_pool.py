@@ -0,0 +1,43 @@
+"""database._conn: one connection per thread, shared by nested helpers, and no partial writes left behind."""
+import threading
+
+import pytest
+
+import database as db
+
+
+def test_nested_calls_share_the_held_connection(database):
+    with db._conn() as outer:
+        with db._conn() as inner:
+            assert inner is outer
+    seen = []
+
+    def other_thread():
+        with db._conn() as conn:
+            seen.append(conn)
+
+    thread = threading.Thread(target=other_thread)
+    with db._conn() as outer:
+        thread.start()
+        thread.join()
+        assert seen[0] is not outer
+
+
+def test_failed_nested_block_is_rolled_back(database):
+    # As during a request: the connection is held across helper calls.
+    with db._conn() as held:
+        with pytest.raises(RuntimeError):
+            with db._conn() as conn:
+                conn.execute("INSERT INTO app_settings (key, value) VALUES ('partial', 'x')")
+                raise RuntimeError("helper failed halfway")
+        assert not held.in_transaction
+        # A later helper that commits must not commit the failed block's write with its own.
+        db.set_setting(held, "later", "y")
+    assert db.get_setting("partial") is None
+    assert db.get_setting("later") == "y"
+
+
+def test_open_transaction_is_rolled_back_on_release(database):
+    with db._conn() as conn:
+        conn.execute("INSERT INTO app_settings (key, value) VALUES ('uncommitted', 'x')")
+    assert db.get_setting("uncommitted") is None
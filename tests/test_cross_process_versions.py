@@ -0,0 +1,95 @@
+"""Caches in this process must notice commits made by another process (another connection to the same file)."""
+import io
+import sqlite3
+import subprocess
+import sys
+import textwrap
+from datetime import date
+
+import openpyxl
+import pytest
+
+import config
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+WEEK_URL = f"/api/roster/week?week={MONDAY}"
+EXPORT_URL = f"/export/week/{MONDAY}"
+
+
+@pytest.fixture
+def worker(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+        db.upsert_time_entry(conn, employee_id, MONDAY, clock_in="07:00", clock_out="15:30", lunch_start="11:30",
+                             lunch_end="12:00", notes="", regular_hours=8, shift="day")
+    return employee_id
+
+
+def _warm(admin_client):
+    """Fill the week ETag, calendar, export and employee caches and return what they hold."""
+    week = admin_client.get(WEEK_URL)
+    export = admin_client.get(EXPORT_URL).data
+    assert admin_client.get(EXPORT_URL).data == export  # served from export_cache
+    calendar = db.get_timeoff_calendar_month(2026, 10)
+    assert db.get_timeoff_calendar_month(2026, 10) is calendar
+    return week.headers["ETag"], export, calendar, db.list_employees()
+
+
+def _export_cells(data):
+    workbook = openpyxl.load_workbook(io.BytesIO(data))
+    return [c.value for ws in workbook.worksheets for row in ws.iter_rows() for c in row]
+
+
+def _assert_invalidated(admin_client, warm, clock_out, full_name):
+    etag, export, calendar, employees = warm
+    week = admin_client.get(WEEK_URL, headers={"If-None-Match": etag})
+    assert week.status_code == 200
+    day = week.get_json()["shifts"]["day"][0]
+    assert (day["employee"]["full_name"], day["days"][0]["clock_out"]) == (full_name, clock_out)
+    assert admin_client.get(EXPORT_URL).data != export
+    assert full_name in _export_cells(admin_client.get(EXPORT_URL).data)
+    fresh = db.get_timeoff_calendar_month(2026, 10)
+    assert fresh is not calendar
+    assert [e["full_name"] for e in fresh["by_date"]["2026-10-14"]] == [full_name]
+    assert [e["full_name"] for e in db.list_employees()] != [e["full_name"] for e in employees]
+
+
+def test_commit_on_another_connection_invalidates_caches(admin_client, worker):
+    warm = _warm(admin_client)
+    # What a write in another worker process leaves in the file: the rows and the data version bumps, one commit.
+    other = sqlite3.connect(config.DATABASE_PATH)
+    with other:
+        other.execute("UPDATE time_entries SET clock_out = '17:00', regular_hours = 9 WHERE employee_id = ?", (worker,))
+        other.execute("UPDATE employees SET full_name = 'Worker Renamed' WHERE id = ?", (worker,))
+        cur = other.execute("""
+            INSERT INTO time_off_requests (employee_id, from_date, to_date, notes, hours_per_day, status, created_at, updated_at)
+            VALUES (?, '2026-10-14', '2026-10-14', 'PTO', 8, 'pending', '2026-10-01T00:00:00', '2026-10-01T00:00:00')
+        """, (worker,))
+        other.execute("INSERT INTO time_off_request_days VALUES (?, ?, '2026-10-14', 'pending', 'PTO')", (cur.lastrowid, worker))
+        for scope in (f"week:{MONDAY}", db.DATA_VERSION_EMPLOYEES, db.DATA_VERSION_TIMEOFF):
+            other.execute("""
+                INSERT INTO data_versions (scope, version) VALUES (?, 1)
+                ON CONFLICT(scope) DO UPDATE SET version = version + 1
+            """, (scope,))
+    other.close()
+    _assert_invalidated(admin_client, warm, "17:00", "Worker Renamed")
+
+
+def test_write_from_another_process_invalidates_caches(admin_client, worker):
+    warm = _warm(admin_client)
+    script = textwrap.dedent(f"""
+        import config
+        config.DATABASE_PATH = {config.DATABASE_PATH!r}
+        import database as db
+        from datetime import date
+        with db._conn() as conn:
+            db.upsert_time_entry(conn, {worker}, date(2026, 10, 12), clock_in="07:00", clock_out="18:00",
+                                 lunch_start="11:30", lunch_end="12:00", notes="", regular_hours=10.5, shift="day")
+            db.update_employee(conn, {worker}, full_name="Worker Elsewhere")
+        db.create_timeoff_request({worker}, date(2026, 10, 14), date(2026, 10, 14), "Sick leave")
+    """)
+    root = __file__.rsplit("/tests/", 1)[0]
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True, timeout=60)
+    _assert_invalidated(admin_client, warm, "18:00", "Worker Elsewhere")
@@ -0,0 +1,112 @@
+"""Admin week export cache: identical bytes on a hit, rebuilt after writes to that week or the employees, kept otherwise."""
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+import timesheet_export as xlsx
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+URLS = (f"/export/week/{MONDAY}", f"/export/week/{MONDAY + timedelta(days=3)}?shift=day", f"/export/week/{MONDAY}?shift=combined")
+
+
+def test_workbook_cache_versions_and_size():
+    cache = xlsx.WorkbookCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("a", 2) is None                  # another version is a miss...
+    cache.put("a", 2, b"AAA")
+    assert (cache.get("a", 1), cache.get("a", 2)) == (None, b"AAA")  # ...and the next put replaces the entry
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 2)                                 # a is now the most recently used
+    cache.put("c", 1, b"cccc")
+    assert (cache.get("a", 2), cache.get("b", 1), cache.get("c", 1)) == (b"AAA", None, b"cccc")
+    cache.put("big", 1, b"x" * 11)                    # larger than the whole cache: not stored, nothing evicted
+    assert cache.get("big", 1) is None
+    assert cache.stats() == {"hits": 5, "misses": 4, "stores": 4, "evictions": 1, "entries": 2, "bytes": 7}
+    cache.clear()
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (0, 0)
+
+
+@pytest.fixture
+def worker(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+        db.upsert_time_entry(conn, employee_id, MONDAY, clock_in="07:00", clock_out="15:30", lunch_start="11:30",
+                             lunch_end="12:00", notes="", regular_hours=8, shift="day")
+    return employee_id
+
+
+def _exports(client):
+    out = {}
+    for url in URLS:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        out[url] = response.data
+    return out
+
+
+def _cache_stats():
+    import app as appmod
+
+    return appmod.export_cache.stats()
+
+
+def _assert_served_from_cache(client, exports):
+    before = _cache_stats()
+    assert _exports(client) == exports
+    after = _cache_stats()
+    assert (after["hits"] - before["hits"], after["stores"] - before["stores"]) == (len(URLS), 0)
+
+
+def _assert_rebuilt(client, exports):
+    before = _cache_stats()
+    rebuilt = _exports(client)
+    after = _cache_stats()
+    assert (after["misses"] - before["misses"], after["stores"] - before["stores"]) == (len(URLS), len(URLS))
+    assert all(rebuilt[url] != exports[url] for url in URLS)
+    _assert_served_from_cache(client, rebuilt)
+    return rebuilt
+
+
+def test_hit_returns_identical_bytes(admin_client, worker):
+    exports = _exports(admin_client)
+    # Three shift modes of one week, one of them asked for by a mid-week date: three entries.
+    assert _cache_stats()["entries"] == 3
+    assert len(set(exports.values())) == 3
+    _assert_served_from_cache(admin_client, exports)
+
+
+def test_time_entry_in_the_week_rebuilds(admin_client, worker):
+    exports = _exports(admin_client)
+    with db._conn() as conn:
+        db.upsert_time_entry(conn, worker, MONDAY + timedelta(days=6), clock_in="07:00", clock_out="12:00", notes="", regular_hours=5, shift="day")
+    exports = _assert_rebuilt(admin_client, exports)
+    # A save through the app counts too.
+    admin_client.post("/timesheet/save", json={"employee_id": worker, "work_date": MONDAY.isoformat(), "clock_in": "06:00", "clock_out": "15:30"})
+    _assert_rebuilt(admin_client, exports)
+
+
+def test_employee_write_rebuilds(admin_client, worker):
+    exports = _exports(admin_client)
+    with db._conn() as conn:
+        db.update_employee(conn, worker, full_name="Worker Renamed")
+    _assert_rebuilt(admin_client, exports)
+
+
+def test_writes_elsewhere_keep_the_cache(admin_client, worker):
+    exports = _exports(admin_client)
+    next_week = f"/export/week/{MONDAY + timedelta(days=7)}"
+    admin_client.get(next_week)
+    with db._conn() as conn:
+        for day in (MONDAY - timedelta(days=1), MONDAY + timedelta(days=7), MONDAY + timedelta(days=60)):
+            db.upsert_time_entry(conn, worker, day, clock_in="07:00", clock_out="15:30", notes="", regular_hours=8, shift="day")
+        db.set_setting(conn, "unrelated", "value")
+    # A pending request writes no time entries.
+    db.create_timeoff_request(worker, MONDAY + timedelta(days=2), MONDAY + timedelta(days=2), "PTO")
+    _assert_served_from_cache(admin_client, exports)
+    # The next week was written: its export is built fresh.
+    before = _cache_stats()
+    admin_client.get(next_week)
+    assert (_cache_stats()["misses"], _cache_stats()["hits"]) == (before["misses"] + 1, before["hits"])
@@ -0,0 +1,243 @@
+"""
+Background export jobs: run off the request thread, deduplicated by key, bounded and expired; status shared through
+the job directory, which must be private, and whose files are only ever found by job id.
+"""
+import io
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import database as db
+import export_jobs as jobs
+from conftest import PASSWORD_HASH
+
+JOB_ID = "Abcdefghijklmnop_-0123"
+MONDAY = date(2026, 10, 12)
+
+
+def _wait_done(registry, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = registry.get(job_id)
+        if job and job["status"] in (jobs.DONE, jobs.FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _touch(path, age_seconds=0):
+    with open(path, "w") as f:
+        f.write("x")
+    then = time.time() - age_seconds
+    os.utime(path, (then, then))
+    return path
+
+
+def _private_dir(path):
+    path.mkdir(mode=0o700)
+    os.chmod(path, 0o700)
+    return path
+
+
+def test_job_runs_and_is_visible_to_other_workers(tmp_path):
+    directory = str(tmp_path / "exports")
+    registry = jobs.ExportJobs(1, 60, 5, directory)
+    job_id = registry.submit(("week", "2026-10-12", None), lambda: (io.BytesIO(b"workbook"), "week.xlsx"))
+    job = _wait_done(registry, job_id)
+    assert (job["status"], job["filename"]) == (jobs.DONE, "week.xlsx")
+    assert job["path"] == os.path.join(directory, job_id + ".xlsx")
+    with open(job["path"], "rb") as f:
+        assert f.read() == b"workbook"
+    other_worker = jobs.ExportJobs(1, 60, 5, directory)
+    assert other_worker.get(job_id)["path"] == job["path"]
+    assert other_worker.get("../" + job_id) is None
+
+
+def _blocked_builder(release):
+    def build():
+        release.wait(5)
+        return io.BytesIO(b"workbook"), "week.xlsx"
+    return build
+
+
+def test_failed_job_keeps_the_error_and_no_file(tmp_path):
+    def build():
+        raise ValueError("no such week")
+
+    registry = jobs.ExportJobs(1, 60, 5, str(tmp_path / "exports"))
+    job = _wait_done(registry, registry.submit("key", build))
+    assert (job["status"], job["error"]) == (jobs.FAILED, "no such week")
+    assert not os.path.exists(job["path"])
+
+
+def test_duplicate_key_returns_the_job_in_flight(tmp_path):
+    release = threading.Event()
+    registry = jobs.ExportJobs(1, 60, 5, str(tmp_path / "exports"))
+    try:
+        first = registry.submit("key", _blocked_builder(release))
+        assert registry.submit("key", _blocked_builder(release)) == first
+        other = registry.submit("other", _blocked_builder(release))
+        assert other != first
+    finally:
+        release.set()
+    _wait_done(registry, first)
+    # Once finished, the same key queues a new job.
+    assert registry.submit("key", lambda: (io.BytesIO(b"workbook"), "week.xlsx")) != first
+
+
+def test_pending_limit_refuses_new_jobs(tmp_path):
+    release = threading.Event()
+    registry = jobs.ExportJobs(1, 60, 2, str(tmp_path / "exports"))
+    try:
+        submitted = [registry.submit(key, _blocked_builder(release)) for key in ("a", "b", "c")]
+    finally:
+        release.set()
+    assert submitted[0] and submitted[1] and submitted[2] is None
+    for job_id in submitted[:2]:
+        _wait_done(registry, job_id)
+    assert registry.submit("c", lambda: (io.BytesIO(b"workbook"), "week.xlsx")) is not None
+
+
+def test_status_file_cannot_redirect_the_download(tmp_path):
+    directory = _private_dir(tmp_path / "exports")
+    with open(directory / f"{JOB_ID}.json", "w") as f:
+        json.dump({"status": jobs.DONE, "filename": "week.xlsx", "path": "/etc/passwd", "error": None,
+                   "finished_at": time.time()}, f)
+    job = jobs.ExportJobs(1, 60, 5, str(directory)).get(JOB_ID)
+    assert (job["status"], job["filename"]) == (jobs.DONE, "week.xlsx")
+    assert job["path"] == str(directory / f"{JOB_ID}.xlsx")
+
+
+def test_directory_is_created_private(tmp_path):
+    directory = tmp_path / "exports"
+    jobs.ExportJobs(1, 60, 5, str(directory)).check_directory()
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+
+def test_shared_directory_is_refused(tmp_path):
+    directory = _private_dir(tmp_path / "exports")
+    os.chmod(directory, 0o777)
+    registry = jobs.ExportJobs(1, 60, 5, str(directory))
+    with pytest.raises(RuntimeError, match="mode 0700"):
+        registry.check_directory()
+    with pytest.raises(RuntimeError):
+        registry.submit("key", lambda: (io.BytesIO(b"workbook"), "week.xlsx"))
+    with pytest.raises(RuntimeError):
+        registry.get(JOB_ID)
+
+
+def test_symlinked_directory_is_refused(tmp_path):
+    target = _private_dir(tmp_path / "elsewhere")
+    os.symlink(target, tmp_path / "exports")
+    with pytest.raises(RuntimeError, match="not a directory"):
+        jobs.ExportJobs(1, 60, 5, str(tmp_path / "exports")).check_directory()
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root to chown")
+def test_directory_of_another_user_is_refused(tmp_path):
+    directory = _private_dir(tmp_path / "exports")
+    os.chown(directory, 12345, 12345)
+    with pytest.raises(RuntimeError, match="owned by uid"):
+        jobs.ExportJobs(1, 60, 5, str(directory)).check_directory()
+
+
+def test_expired_jobs_are_purged(tmp_path):
+    directory = str(tmp_path / "exports")
+    registry = jobs.ExportJobs(1, 0, 5, directory)
+    job_id = registry.submit("key", lambda: (io.BytesIO(b"workbook"), "week.xlsx"))
+    deadline = time.monotonic() + 5
+    while registry.stats()[jobs.DONE] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.01)
+    registry.purge_expired()
+    assert registry.get(job_id) is None
+    assert os.listdir(directory) == []
+
+
+def test_purge_deletes_only_stale_job_files(tmp_path):
+    directory = _private_dir(tmp_path / "exports")
+    stale_job_files = [_touch(directory / f"{JOB_ID}.json", 3600), _touch(directory / f"{JOB_ID}.xlsx", 3600)]
+    kept = [
+        _touch(directory / f"{JOB_ID}X.json", 10),       # a job file, but not stale yet
+        _touch(directory / "report.xlsx", 3600),         # not named after a job id
+        _touch(directory / "notes.txt", 3600),
+        _touch(directory / "short.json", 3600),
+        _touch(directory / f"{JOB_ID}.csv", 3600),
+        _touch(directory / f"{JOB_ID}.json.tmp", 3600),
+    ]
+    (directory / f"{JOB_ID}Y.xlsx").mkdir()
+    os.utime(directory / f"{JOB_ID}Y.xlsx", (0, 0))
+    jobs.ExportJobs(1, 60, 5, str(directory)).purge_expired()
+    assert not any(os.path.exists(path) for path in stale_job_files)
+    assert all(os.path.exists(path) for path in kept)
+    assert (directory / f"{JOB_ID}Y.xlsx").is_dir()
+
+
+def test_default_directory_is_next_to_the_database(tmp_path, monkeypatch):
+    first = jobs.default_directory(str(tmp_path / "a" / "timesheet.db"))
+    assert first == str(tmp_path / "a" / "timesheet-exports")
+    assert first != jobs.default_directory(str(tmp_path / "b" / "timesheet.db"))
+    monkeypatch.chdir(tmp_path)
+    assert jobs.default_directory(os.path.join("a", "timesheet.db")) == first
+
+
+def test_download_serves_only_the_job_file(app, admin_client):
+    import app as appmod
+
+    directory = jobs.default_directory(appmod.config.DATABASE_PATH)
+    appmod.export_jobs.check_directory()
+    with open(os.path.join(directory, f"{JOB_ID}.json"), "w") as f:
+        json.dump({"status": jobs.DONE, "filename": "week.xlsx", "path": __file__, "error": None,
+                   "finished_at": time.time()}, f)
+    assert admin_client.get(f"/admin/export-jobs/{JOB_ID}/download").status_code == 404
+    _touch(os.path.join(directory, f"{JOB_ID}.xlsx"))
+    response = admin_client.get(f"/admin/export-jobs/{JOB_ID}/download")
+    assert (response.status_code, response.data) == (200, b"x")
+
+
+def test_create_app_refuses_a_shared_directory(app, monkeypatch, tmp_path):
+    import app as appmod
+
+    directory = _private_dir(tmp_path / "shared")
+    os.chmod(directory, 0o777)
+    monkeypatch.setattr(appmod, "export_jobs", jobs.ExportJobs(1, 60, 5, str(directory)))
+    with pytest.raises(RuntimeError):
+        appmod.create_app(start_notifier=False)
+
+
+@pytest.fixture
+def job_queue(app, monkeypatch, tmp_path):
+    import app as appmod
+
+    registry = jobs.ExportJobs(1, 60, 5, str(tmp_path / "route-exports"))
+    monkeypatch.setattr(appmod, "export_jobs", registry)
+    return registry
+
+
+def test_week_export_job_routes(admin_client, job_queue):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+        db.upsert_time_entry(conn, employee_id, MONDAY, clock_in="07:00", clock_out="15:30", notes="", regular_hours=8, shift="day")
+    direct = admin_client.get(f"/export/week/{MONDAY}?shift=day")
+    response = admin_client.post("/admin/export-jobs", data={"kind": "week", "week_start": MONDAY.isoformat(), "shift": "day"})
+    assert response.status_code == 202
+    body = response.get_json()
+    _wait_done(job_queue, body["job_id"])
+    status = admin_client.get(body["status_url"]).get_json()
+    assert (status["status"], status["filename"]) == ("done", f"timesheet_week_{MONDAY}_day.xlsx")
+    download = admin_client.get(status["download_url"])
+    assert (download.status_code, download.data) == (200, direct.data)
+    assert admin_client.get("/admin/export-jobs/unknown").status_code == 404
+    assert admin_client.get("/admin/export-jobs/unknown/download").status_code == 404
+
+
+def test_job_routes_refuse_bad_requests(admin_client, job_queue):
+    assert admin_client.post("/admin/export-jobs", data={"kind": "payroll"}).status_code == 400
+    assert admin_client.post("/admin/export-jobs", data={"kind": "week", "week_start": "2026-02-30"}).status_code == 400
+    job_queue.max_pending = 0
+    response = admin_client.post("/admin/export-jobs", data={"kind": "timeoff", "from": "2026-10-01", "to": "2026-10-31"})
+    assert response.status_code == 429
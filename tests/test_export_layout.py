@@ -0,0 +1,158 @@
+"""
+Streamed exports keep the cell layout of the openpyxl cell-by-cell workbooks they replaced: title, section and header
+rows, merged ranges, fills (Saturday orange, other days grey), borders, alignment, number formats and column widths.
+"""
+import io
+from datetime import date, timedelta
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+BLUE, YELLOW, GREY, ORANGE, WHITE = "004472C4", "00FFFF00", "00D3D3D3", "00ED7D31", "00FFFFFF"
+ALL = ("thin", "thin", "thin", "thin")
+TOP_BOTTOM = (None, None, "thin", "thin")
+END = (None, "thin", "thin", "thin")
+CENTER = ("center", None, None)
+DATE_CENTER = ("center", "center", True)
+PLAIN = (None, None, None)
+TIMESHEET_COLS = 27  # No., Test, Name, 7 days x Attendance/Overtime/Remark, Attendance/Overtime/Total
+SATURDAY_COLS = range(19, 22)
+
+
+@pytest.fixture
+def seeded(database):
+    with db._conn() as conn:
+        for i, shift in enumerate(("day", "swing", "graveyard", None, "day", "swing")):
+            employee_id = db.create_employee(conn, f"user{i}", PASSWORD_HASH, f"User {i}", shift=shift,
+                                             employment_type="contractor" if i == 4 else "full_time", fa_mtf="fa" if i % 2 else None)
+            for d in range(7):
+                work_date = MONDAY + timedelta(days=d)
+                if d == 2:
+                    db.upsert_time_entry(conn, employee_id, work_date, notes="PTO", regular_hours=8)
+                elif d < 6 or i % 2:
+                    db.upsert_time_entry(conn, employee_id, work_date, clock_in="07:00", clock_out="16:45", lunch_start="11:30",
+                                         lunch_end="12:00", notes="", regular_hours=9.25, shift="day")
+
+
+def _workbook(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return load_workbook(io.BytesIO(response.data))
+
+
+def _style(cell):
+    """(fill, bold, font colour, border left/right/top/bottom, horizontal/vertical/wrap) of one cell."""
+    color = cell.font.color
+    border = cell.border
+    return (
+        cell.fill.fgColor.rgb if cell.fill.fill_type else None,
+        bool(cell.font.b),
+        color.rgb if color is not None and color.type == "rgb" else None,
+        tuple(side.style for side in (border.left, border.right, border.top, border.bottom)),
+        (cell.alignment.horizontal, cell.alignment.vertical, cell.alignment.wrap_text),
+    )
+
+
+def _merged_row_styles(first, width):
+    """The old layout's one-row merge: the styled first cell, then top/bottom edges and the right edge on the last cell."""
+    return [first] + [(None, False, None, TOP_BOTTOM, PLAIN)] * (width - 2) + [(None, False, None, END, PLAIN)]
+
+
+def _old_timesheet_styles(ws, title, section_rows):
+    """Expected style of every cell of a weekly timesheet sheet, row by row, as the old export wrote it."""
+    rows = [_merged_row_styles((BLUE, True, WHITE, ALL, CENTER), TIMESHEET_COLS), [(None, False, None, ALL, PLAIN)] * TIMESHEET_COLS]
+    row3 = [(GREY, False, None, ALL, PLAIN)] * 3
+    for d in range(7):
+        row3 += _merged_row_styles((ORANGE if d == 5 else GREY, False, None, ALL, DATE_CENTER), 3)
+    rows.append(row3 + [(GREY, False, None, ALL, PLAIN)] * 3)
+    rows.append([(ORANGE if col in (1, 2) or col in SATURDAY_COLS else GREY, True, None, ALL, PLAIN) for col in range(1, TIMESHEET_COLS + 1)])
+    for r in range(5, ws.max_row + 1):
+        if r in section_rows:
+            rows.append(_merged_row_styles((GREY, True, None, ALL, PLAIN), TIMESHEET_COLS))
+        else:
+            rows.append([(ORANGE if col in (1, 2) else None, False, None, ALL, PLAIN) for col in range(1, TIMESHEET_COLS + 1)])
+    assert ws["A1"].value == title
+    return rows
+
+
+def _old_report_styles(ws, width):
+    rows = [_merged_row_styles((YELLOW, True, None, ALL, CENTER), width), [(GREY, True, None, ALL, PLAIN)] * width]
+    return rows + [[(None, False, None, ALL, PLAIN)] * width for _ in range(3, ws.max_row + 1)]
+
+
+def _assert_layout(ws, expected_styles, merged):
+    assert [[_style(c) for c in row] for row in ws.iter_rows()] == expected_styles
+    assert sorted(str(r) for r in ws.merged_cells.ranges) == sorted(merged)
+    assert {c.number_format for row in ws.iter_rows() for c in row} == {"General"}
+    # The old exports never set column widths or row heights.
+    assert not [k for k, d in ws.column_dimensions.items() if d.customWidth]
+    assert not [k for k, d in ws.row_dimensions.items() if d.customHeight]
+
+
+def _timesheet_merges(section_rows):
+    merges = ["A1:AA1"] + [f"{get_column_letter(4 + 3 * d)}3:{get_column_letter(6 + 3 * d)}3" for d in range(7)]
+    return merges + [f"A{r}:AA{r}" for r in section_rows]
+
+
+def _assert_timesheet_headers(ws):
+    dates = [MONDAY + timedelta(days=d) for d in range(7)]
+    values = [[c.value for c in row] for row in ws.iter_rows(min_row=3, max_row=4)]
+    assert values[0][3::3][:7] == [f"{d.month}/{d.day}\n{d.strftime('%A').upper()}" for d in dates]
+    assert values[1] == ["No.", "Test", "Name"] + ["Attendance", "Overtime", "Remark"] * 7 + ["Attendance", "Overtime", "Total"]
+
+
+def test_all_shifts_export(admin_client, seeded):
+    wb = _workbook(admin_client, f"/export/week/{MONDAY}")
+    assert wb.sheetnames == ["Day", "Swing", "Graveyard"]
+    for name, employees in (("Day", 2), ("Swing", 2), ("Graveyard", 1)):
+        ws = wb[name]
+        assert ws.max_row == 4 + employees
+        _assert_layout(ws, _old_timesheet_styles(ws, f"Time Sheet {name}", ()), _timesheet_merges(()))
+        _assert_timesheet_headers(ws)
+
+
+def test_single_shift_export(admin_client, seeded):
+    ws = _workbook(admin_client, f"/export/week/{MONDAY + timedelta(days=4)}?shift=swing")[f"Week {MONDAY}"]
+    _assert_layout(ws, _old_timesheet_styles(ws, "Time Sheet Swing", ()), _timesheet_merges(()))
+    _assert_timesheet_headers(ws)
+    assert [ws.cell(row=r, column=3).value for r in (5, 6)] == ["User 1", "User 5"]
+    # PTO day: its 8 stored hours and the remark; worked days: 8 hours and 1.25 overtime; week: 40 attendance.
+    assert [c.value for c in ws[5]][9:12] == [8, None, "PTO"]
+    assert [c.value for c in ws[5]][3:5] == [8, 1.25]
+    assert [c.value for c in ws[5]][-3:] == [40, 7.5, 47.5]
+
+
+def test_combined_export(admin_client, seeded):
+    ws = _workbook(admin_client, f"/export/week/{MONDAY}?shift=combined")["Combined"]
+    # Day (2), swing (2), graveyard (1) and unassigned (1), each after its section row.
+    sections = (5, 8, 11, 13)
+    assert [ws.cell(row=r, column=1).value for r in sections] == ["Day shift", "Swing shift", "Graveyard shift", "Unassigned shift"]
+    assert ws.max_row == 14
+    _assert_layout(ws, _old_timesheet_styles(ws, "Time Sheet Combined (All Shifts)", sections), _timesheet_merges(sections))
+    _assert_timesheet_headers(ws)
+
+
+def test_timeoff_export(admin_client, seeded):
+    ws = _workbook(admin_client, f"/admin/timeoff/export?from={MONDAY}&to={MONDAY + timedelta(days=6)}")["Time Off"]
+    assert ws["A1"].value == f"Time Off Report — {MONDAY} to {MONDAY + timedelta(days=6)}"
+    assert [c.value for c in ws[2]] == ["No.", "Employee", "Date", "Day", "Type"]
+    assert ws.max_row == 2 + 6
+    assert [c.value for c in ws[3]] == [1, "User 0", (MONDAY + timedelta(days=2)).isoformat(), "WEDNESDAY", "PTO"]
+    _assert_layout(ws, _old_report_styles(ws, 5), ["A1:E1"])
+
+
+def test_employees_export(admin_client, seeded):
+    ws = _workbook(admin_client, "/admin/employees/export")["Employees"]
+    assert ws["A1"].value == "Employees"
+    assert [c.value for c in ws[2]] == ["No.", "Full name", "Username", "Shift", "Status", "FA / MTF", "Admin", "Updated"]
+    assert ws.max_row == 2 + 7  # six employees and the admin
+    rows = {row[1]: row for row in ws.iter_rows(min_row=3, values_only=True)}
+    assert rows["User 3"][3:7] == ("—", "Full time", "FA", "No")
+    assert rows["User 4"][3:7] == ("Day", "Contractor", "—", "No")
+    assert rows["admin"][6] == "Yes"
+    _assert_layout(ws, _old_report_styles(ws, 8), ["A1:H1"])
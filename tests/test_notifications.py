@@ -0,0 +1,230 @@
+"""OutboxDispatcher against a local SMTP server: delivery, leasing, retry with backoff, and giving up."""
+import socketserver
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import config
+import database as db
+import notifications
+from conftest import PASSWORD_HASH
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.sendmail; answers 451 to DATA while the server has failures queued."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        self.reply("220 localhost test SMTP")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode("ascii").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith("MAIL FROM"):
+                recipients = []
+                self.reply("250 OK")
+            elif command.startswith("RCPT TO"):
+                recipients.append(raw.decode("ascii").strip()[8:].strip("<>"))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    lines.append(data_line)
+                if server.fail_next:
+                    server.fail_next -= 1
+                    self.reply("451 Try again later")
+                else:
+                    server.messages.append((recipients, b"".join(lines).decode("utf-8")))
+                    self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class _SmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.messages = []
+        self.sessions = 0
+        self.fail_next = 0
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = _SmtpServer()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    monkeypatch.setattr(config, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(config, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(config, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(config, "SMTP_USER", "")
+    monkeypatch.setattr(config, "SMTP_PASSWORD", "")
+    monkeypatch.setattr(config, "SMTP_FROM", "timesheet@example.com")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def employee_id(database):
+    with db._conn() as conn:
+        db.set_setting(conn, "timeoff_notify_email", "boss@example.com")
+        employee_id = db.create_employee(conn, "ann", PASSWORD_HASH, "Ann Example")
+    return employee_id
+
+
+def _dispatcher(max_attempts=3):
+    return notifications.OutboxDispatcher(
+        poll_seconds=60, max_attempts=max_attempts, retry_base_seconds=30, retry_max_seconds=45, smtp_idle_seconds=60,
+    )
+
+
+def _request_time_off(employee_id, day=5):
+    from_date, to_date = date(2026, 11, day), date(2026, 11, day + 1)
+    messages = notifications.timeoff_notifications("Ann Example", from_date.isoformat(), to_date.isoformat(), "PTO")
+    assert [channel for channel, _ in messages] == [notifications.EMAIL]
+    assert db.create_timeoff_request(employee_id, from_date, to_date, "PTO", notifications=messages)
+
+
+def _outbox():
+    with db._conn() as conn:
+        return [dict(r) for r in conn.execute("SELECT * FROM notification_outbox ORDER BY id").fetchall()]
+
+
+def _make_due():
+    """Move every pending retry into the past, as if its backoff had elapsed."""
+    with db._conn() as conn:
+        conn.execute("UPDATE notification_outbox SET next_attempt_at = ? WHERE status = 'pending'", (db._utc_iso(-1),))
+        conn.commit()
+
+
+def test_delivers_queued_mail_over_one_session(smtp_server, employee_id):
+    for day in (2, 9, 16):
+        _request_time_off(employee_id, day)
+    dispatcher = _dispatcher()
+    try:
+        assert dispatcher.dispatch_once() is True
+    finally:
+        dispatcher._smtp.close()
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.sessions == 1
+    recipients, body = smtp_server.messages[0]
+    assert recipients == ["boss@example.com"]
+    assert "Employee: Ann Example" in body and "From: 2026-11-02" in body
+    assert [(r["status"], r["attempts"], r["last_error"]) for r in _outbox()] == [("sent", 1, None)] * 3
+    assert all(r["sent_at"] and r["locked_until"] is None for r in _outbox())
+    assert dispatcher.dispatch_once() is False
+    assert dispatcher.stats()["sent"] == 3
+    assert dispatcher.stats()["outbox"] == {"sent": 3}
+
+
+def test_claimed_rows_are_leased_to_one_dispatcher(employee_id):
+    _request_time_off(employee_id)
+    claimed = db.claim_due_notifications(10, lease_seconds=300)
+    assert [r["status"] for r in claimed] == ["sending"]
+    assert db.claim_due_notifications(10, lease_seconds=300) == []
+    assert _outbox()[0]["status"] == "sending"
+    # A dispatcher that died mid-send leaves an expired lease: the row is claimed again, not lost.
+    with db._conn() as conn:
+        conn.execute("UPDATE notification_outbox SET locked_until = ?", (db._utc_iso(-1),))
+        conn.commit()
+    assert [r["id"] for r in db.claim_due_notifications(10, lease_seconds=300)] == [claimed[0]["id"]]
+
+
+def test_failed_send_is_retried_with_backoff(smtp_server, employee_id):
+    _request_time_off(employee_id)
+    smtp_server.fail_next = 2
+    dispatcher = _dispatcher(max_attempts=5)
+    try:
+        delays = []
+        for attempt in (1, 2):
+            before = datetime.utcnow()
+            assert dispatcher.dispatch_once() is True
+            row = _outbox()[0]
+            assert (row["status"], row["attempts"], row["locked_until"]) == ("pending", attempt, None)
+            assert "451" in row["last_error"]
+            delays.append((datetime.fromisoformat(row["next_attempt_at"]) - before).total_seconds())
+            # Not due yet: nothing is claimed, and nothing is sent or dropped.
+            assert dispatcher.dispatch_once() is False
+            assert smtp_server.messages == []
+            _make_due()
+        # retry_base_seconds * 2 ** (attempts - 1): 30 s, then 60 s capped at retry_max_seconds.
+        assert 29 < delays[0] <= 31
+        assert 44 < delays[1] <= 46
+        assert dispatcher.dispatch_once() is True
+    finally:
+        dispatcher._smtp.close()
+    assert len(smtp_server.messages) == 1
+    row = _outbox()[0]
+    assert (row["status"], row["attempts"], row["last_error"]) == ("sent", 3, None)
+    assert {k: dispatcher.stats()[k] for k in ("sent", "retried", "failed")} == {"sent": 1, "retried": 2, "failed": 0}
+
+
+def test_unreachable_server_is_retried(smtp_server, employee_id, monkeypatch):
+    _request_time_off(employee_id)
+    monkeypatch.setattr(config, "SMTP_PORT", _closed_port())
+    dispatcher = _dispatcher()
+    try:
+        assert dispatcher.dispatch_once() is True
+        row = _outbox()[0]
+        assert (row["status"], row["attempts"]) == ("pending", 1)
+        monkeypatch.setattr(config, "SMTP_PORT", smtp_server.server_address[1])
+        _make_due()
+        assert dispatcher.dispatch_once() is True
+    finally:
+        dispatcher._smtp.close()
+    assert _outbox()[0]["status"] == "sent"
+    assert len(smtp_server.messages) == 1
+
+
+def test_gives_up_after_max_attempts(smtp_server, employee_id):
+    _request_time_off(employee_id)
+    smtp_server.fail_next = 10
+    dispatcher = _dispatcher(max_attempts=2)
+    try:
+        dispatcher.dispatch_once()
+        assert _outbox()[0]["status"] == "pending"
+        _make_due()
+        dispatcher.dispatch_once()
+    finally:
+        dispatcher._smtp.close()
+    row = _outbox()[0]
+    assert (row["status"], row["attempts"], row["locked_until"]) == ("failed", 2, None)
+    assert "451" in row["last_error"]
+    _make_due()
+    assert dispatcher.dispatch_once() is False
+    assert smtp_server.messages == []
+    assert {k: dispatcher.stats()[k] for k in ("sent", "retried", "failed")} == {"sent": 0, "retried": 1, "failed": 1}
+
+
+def test_background_thread_sends_on_wake(smtp_server, employee_id):
+    dispatcher = _dispatcher()
+    try:
+        _request_time_off(employee_id)
+        dispatcher.wake()
+        deadline = datetime.utcnow() + timedelta(seconds=5)
+        while _outbox()[0]["status"] != "sent" and datetime.utcnow() < deadline:
+            time.sleep(0.02)
+    finally:
+        dispatcher.stop(timeout=5)
+    assert _outbox()[0]["status"] == "sent"
+    assert len(smtp_server.messages) == 1
+
+
+def _closed_port():
+    with socketserver.TCPServer(("127.0.0.1", 0), socketserver.BaseRequestHandler) as probe:
+        return probe.server_address[1]
@@ -0,0 +1,195 @@
+"""Request profiling: percentiles, the Prometheus text, statements recorded by profiled connections, and /admin/metrics access."""
+import math
+import re
+
+import pytest
+
+import config
+import database as db
+import profiling
+from conftest import PASSWORD_HASH
+
+# One sample line of the text exposition format: name, optional {label="value",...}, value.
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*",?)*\})? (\S+)$')
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10, 19, 20, 21, 100])
+@pytest.mark.parametrize("p", [1, 50, 95, 99, 100])
+def test_percentile_is_nearest_rank(n, p):
+    values = [v * 1.5 for v in range(n)]
+    # Nearest rank: the smallest value with at least p% of the values at or below it.
+    assert profiling._percentile(values, p) == values[math.ceil(n * p / 100) - 1]
+
+
+def test_percentile_examples():
+    assert profiling._percentile([7], 50) == profiling._percentile([7], 95) == 7
+    values = list(range(1, 21))
+    assert (profiling._percentile(values, 50), profiling._percentile(values, 95), profiling._percentile(values, 0)) == (10, 19, 1)
+
+
+def _parse(text):
+    """{(name, labels text): value} for the samples, checking every line is a comment or a well-formed sample."""
+    assert text.endswith("\n")
+    samples, typed = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            typed.add(line.split()[2])
+            continue
+        if line.startswith("# HELP "):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        assert re.sub(r"_(sum|count)$", "", name) in typed, f"{name} has no TYPE line before it"
+        samples[name, labels] = float(value)
+    return samples
+
+
+def test_prometheus_format_and_escaping():
+    metrics = profiling.RequestMetrics(window=10, slow_sql_ms=1000)
+    awkward = 'say "hi"\\ then\nleave'
+    for wall in (0.01, 0.02, 0.03):
+        metrics.record(awkward, wall, [["SELECT 1", (), 0.001], ["COMMIT", None, 0.002]])
+    metrics.record("timesheet", 0.5, [])
+    text = metrics.prometheus([
+        ("timesheet_things", "Things.", {"hits": 3, "ratio": 0.25, "name": "not a number", "on": True, 'odd"stat': 1}),
+    ])
+    samples = _parse(text)
+    label = 'endpoint="say \\"hi\\"\\\\ then\\nleave"'
+    assert samples["timesheet_request_duration_seconds", f'{{{label},quantile="0.5"}}'] == 0.02
+    assert samples["timesheet_request_duration_seconds", f'{{{label},quantile="0.95"}}'] == 0.03
+    assert samples["timesheet_request_duration_seconds_sum", f"{{{label}}}"] == pytest.approx(0.06)
+    assert samples["timesheet_request_duration_seconds_count", f"{{{label}}}"] == 3
+    assert samples["timesheet_sql_statements_total", f"{{{label}}}"] == 6
+    assert samples["timesheet_sql_duration_seconds_total", f"{{{label}}}"] == pytest.approx(0.009)
+    assert samples["timesheet_sql_slow_statements_total", f"{{{label}}}"] == 0
+    assert samples["timesheet_sql_statements_total", '{endpoint="timesheet"}'] == 0
+    # Gauges: numbers only, booleans and strings skipped, labels escaped.
+    gauges = {labels: value for (name, labels), value in samples.items() if name == "timesheet_things"}
+    assert gauges == {'{stat="hits"}': 3, '{stat="ratio"}': 0.25, '{stat="odd\\"stat"}': 1}
+    # Busiest endpoint (by total wall time) first.
+    assert text.index('endpoint="timesheet"') < text.index(label)
+
+
+def test_slow_statements_are_kept_with_their_plan(database):
+    metrics = profiling.RequestMetrics(window=10, slow_sql_ms=5)
+    sql = "SELECT  id FROM employees\n WHERE username = ?"
+    metrics.record("login", 0.1, [[sql, ("admin",), 0.006], ["SELECT 1", (), 0.001], ["COMMIT", None, 0.02]])
+    slow = metrics.snapshot()["slow"]
+    assert [(s["sql"], s["endpoint"]) for s in slow] == [("COMMIT", "login"), ("SELECT id FROM employees WHERE username = ?", "login")]
+    assert slow[0]["plan"] == []
+    assert any("employees" in line for line in slow[1]["plan"])
+    assert metrics.snapshot()["endpoints"][0]["slow_statements"] == 2
+    metrics.reset()
+    assert metrics.snapshot() == {"endpoints": [], "slow": []}
+
+
+@pytest.fixture
+def traced(app, monkeypatch):
+    """Profiled pooled connections, with every statement SQLite runs on them also seen by a trace callback. The app is
+    imported first, with profiling off, so its own per-request profile hooks stay unregistered."""
+    seen = []
+    open_conn = db._open_conn
+
+    def open_traced():
+        conn = open_conn()
+        conn.set_trace_callback(seen.append)
+        return conn
+
+    monkeypatch.setattr(config, "PROFILE_REQUESTS", True)
+    monkeypatch.setattr(db, "_open_conn", open_traced)
+    db.close_pool()
+    yield seen
+    db.profile_stop()
+    db.close_pool()
+
+
+def _expected(seen):
+    # The implicit BEGINs the sqlite3 module issues are not statements the code ran.
+    return [s for s in seen if s.strip() != "BEGIN"]
+
+
+def test_profiled_connection_records_every_statement(traced):
+    with db._conn() as conn:
+        assert isinstance(conn, db._ProfiledConnection)
+        traced.clear()
+        db.profile_start()
+        db.set_setting(conn, "a", "b")
+        conn.executemany("INSERT INTO app_settings (key, value) VALUES (?, ?)", [("k1", "1"), ("k2", "2")])
+        conn.commit()
+        assert [r["key"] for r in conn.execute("SELECT key FROM app_settings ORDER BY key")] == ["a", "k1", "k2"]
+        conn.execute("SELECT key FROM app_settings").fetchone()
+        recorded = db.profile_stop()
+    assert [r[0] for r in recorded][-4:] == ["INSERT INTO app_settings (key, value) VALUES (?, ?)", "COMMIT",
+                                              "SELECT key FROM app_settings ORDER BY key", "SELECT key FROM app_settings"]
+    assert recorded[-4][1] == ("k1", "1")  # executemany: one record, with the first parameter set
+    assert all(seconds >= 0 for _, _, seconds in recorded)
+    # One record per statement SQLite ran, except that executemany is one record for both rows.
+    assert len(recorded) == len(_expected(traced)) - 1
+    # Nothing is recorded with no profile open.
+    with db._conn() as conn:
+        db.set_setting(conn, "c", "d")
+    assert db.profile_stop() == []
+
+
+def test_request_statements_match_the_trace(traced, admin_client):
+    url = "/timesheet?week=2026-10-12"
+    admin_client.get(url)
+    traced.clear()
+    db.profile_start()
+    assert admin_client.get(url).status_code == 200
+    recorded = db.profile_stop()
+    assert recorded and len(recorded) == len(_expected(traced))
+    metrics = profiling.RequestMetrics(window=10, slow_sql_ms=1000)
+    metrics.record("timesheet", 0.1, recorded)
+    row = metrics.snapshot()["endpoints"][0]
+    assert (row["statements"], row["statements_max"]) == (len(recorded), len(recorded))
+
+
+@pytest.fixture
+def worker_client(app):
+    with db._conn() as conn:
+        worker = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = worker
+        session["full_name"] = "Worker One"
+        session["is_admin"] = False
+    return client
+
+
+def _metrics(client, prometheus=False, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token is not None else {}
+    return client.get("/admin/metrics" + ("?format=prometheus" if prometheus else ""), headers=headers)
+
+
+@pytest.mark.parametrize("prometheus", [False, True], ids=["html", "prometheus"])
+def test_metrics_refused_without_admin_or_token(app, worker_client, monkeypatch, prometheus):
+    anonymous = app.test_client()
+    assert _metrics(anonymous, prometheus).status_code == 302
+    assert _metrics(worker_client, prometheus).status_code == 403
+    # No token configured: a bearer header is not enough, even an empty one.
+    assert _metrics(anonymous, prometheus, token="").status_code == 302
+    monkeypatch.setattr(config, "METRICS_TOKEN", "s3cret")
+    assert _metrics(anonymous, prometheus, token="wrong").status_code == 302
+    assert _metrics(worker_client, prometheus, token="wrong").status_code == 403
+
+
+def test_metrics_token_serves_prometheus_only(app, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_TOKEN", "s3cret")
+    anonymous = app.test_client()
+    response = _metrics(anonymous, prometheus=True, token="s3cret")
+    assert response.status_code == 200
+    assert response.content_type == "text/plain; version=0.0.4; charset=utf-8"
+    samples = _parse(response.get_data(as_text=True))
+    assert {name for name, _ in samples} >= {"timesheet_db_pool", "timesheet_export_cache", "timesheet_data_version_checks"}
+    # The token is for the scraper: the HTML page still needs an admin.
+    assert _metrics(anonymous, token="s3cret").status_code == 302
+
+
+def test_metrics_served_to_admin(admin_client):
+    page = _metrics(admin_client)
+    assert page.status_code == 200 and page.content_type.startswith("text/html")
+    response = _metrics(admin_client, prometheus=True)
+    assert response.status_code == 200
+    _parse(response.get_data(as_text=True))
@@ -0,0 +1,143 @@
+"""
+The admin roster views and the week export must run a fixed number of SQL statements, whatever the headcount, and
+every signed-in request must load its employee row once.
+"""
+import re
+from datetime import date, timedelta
+
+import pytest
+
+import config
+import database as db
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+WEEK = date(2026, 3, 2)
+SHIFTS = ("day", "swing", "graveyard", None)
+PUNCHES = {
+    "day": ("07:00", "16:45", "11:30", "12:00"),
+    "swing": ("15:00", "23:30", "19:00", "19:30"),
+    "graveyard": ("22:00", "07:15", "23:45", "00:15"),
+}
+URLS = (
+    f"/timesheet?week={WEEK}",
+    f"/timesheet?week={WEEK}&shift=combined",
+    f"/timesheet?week={WEEK}&shift=day",
+    f"/timesheet?week={WEEK}&shift=graveyard",
+    f"/export/week/{WEEK}",
+    f"/export/week/{WEEK}?shift=combined",
+)
+
+
+def _seed_employees(first, count):
+    """Add employees first..first+count-1 with a Monday–Friday week of entries (Wednesday is PTO)."""
+    with db._conn() as conn:
+        for i in range(first, first + count):
+            shift = SHIFTS[i % len(SHIFTS)]
+            employee_id = db.create_employee(
+                conn, f"user{i:04d}", PASSWORD_HASH, f"Employee {i:04d}", shift=shift,
+                employment_type="contractor" if i % 5 == 0 else "full_time",
+            )
+            clock_in, clock_out, lunch_start, lunch_end = PUNCHES[shift or "day"]
+            for d in range(5):
+                work_date = WEEK + timedelta(days=d)
+                if d == 2:
+                    db.upsert_time_entry(conn, employee_id, work_date, notes="PTO", regular_hours=8)
+                    continue
+                hours, _ = logic.day_hours(clock_in, clock_out, lunch_start, lunch_end)
+                worked_shift = logic.classify_shift(clock_in, clock_out)
+                db.upsert_time_entry(
+                    conn, employee_id, work_date, clock_in=clock_in, clock_out=clock_out, lunch_start=lunch_start,
+                    lunch_end=lunch_end, notes="", regular_hours=hours, is_graveyard=int(worked_shift == "graveyard"),
+                    shift=worked_shift,
+                )
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Every SQL statement run on connections opened from here on."""
+    seen = []
+    open_conn = db._open_conn
+
+    def traced():
+        conn = open_conn()
+        conn.set_trace_callback(seen.append)
+        return conn
+
+    db.close_pool()
+    monkeypatch.setattr(db, "_open_conn", traced)
+    return seen
+
+
+def _count(client, statements, url):
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return len(statements)
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_statement_count_does_not_grow_with_employees(admin_client, statements, url):
+    _seed_employees(0, 12)
+    small = _count(admin_client, statements, url)
+    _seed_employees(12, 12)
+    large = _count(admin_client, statements, url)
+    assert large == small, f"{url}: {small} statements for 12 employees, {large} for 24"
+
+
+WORKER_URLS = (
+    f"/timesheet?week={WEEK}",
+    f"/api/timesheet/week?week={WEEK}",
+    f"/export/week/{WEEK}",
+    "/request-timeoff",
+    "/change-name",
+)
+
+
+@pytest.fixture
+def worker_client(app):
+    _seed_employees(0, 3)
+    worker = db.get_employee_by_username("user0001")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = worker["id"]
+        session["full_name"] = worker["full_name"]
+        session["is_admin"] = False
+    return client
+
+
+def _employee_loads(statements):
+    return [s for s in statements if re.search(r"FROM employees\s+WHERE id = ", s)]
+
+
+@pytest.mark.parametrize("url", WORKER_URLS)
+def test_signed_in_employee_is_loaded_once(worker_client, statements, url):
+    for _ in range(2):
+        statements.clear()
+        response = worker_client.get(url)
+        assert response.status_code == 200, url
+        assert len(_employee_loads(statements)) == 1, (url, _employee_loads(statements))
+
+
+@pytest.mark.parametrize("url", URLS[:2] + (f"/api/roster/week?week={WEEK}", "/admin/timeoff"))
+def test_signed_in_admin_is_loaded_once(admin_client, statements, url):
+    _seed_employees(0, 3)
+    _count(admin_client, statements, url)
+    assert len(_employee_loads(statements)) == 1, (url, _employee_loads(statements))
+
+
+def test_save_loads_the_employee_once(worker_client, statements):
+    statements.clear()
+    response = worker_client.post("/timesheet/save", json={"work_date": WEEK.isoformat(), "clock_in": "07:00", "clock_out": "15:30"})
+    assert response.get_json()["ok"]
+    assert len(_employee_loads(statements)) == 1
+
+
+def test_employee_cache_skips_the_load(worker_client, statements, monkeypatch):
+    monkeypatch.setattr(config, "EMPLOYEE_CACHE_TTL", 60)
+    url = f"/timesheet?week={WEEK}"
+    loads = []
+    for _ in range(3):
+        _count(worker_client, statements, url)
+        loads.append(len(_employee_loads(statements)))
+    assert loads == [1, 0, 0]
@@ -0,0 +1,186 @@
+"""
+Pay-period export (/export/range): one sheet per week matching the week export, or one summary sheet of weekly and
+period totals; mid-week dates widen to whole weeks, and the statement count does not grow with weeks or employees.
+"""
+import io
+from datetime import date, timedelta
+
+import pytest
+from openpyxl import load_workbook
+
+import database as db
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+FIRST_WEEK = date(2026, 3, 2)
+SHIFTS = ("day", "swing", "graveyard", None)
+PUNCHES = {
+    "day": ("07:00", "16:45", "11:30", "12:00"),
+    "swing": ("15:00", "23:30", "19:00", "19:30"),
+    "graveyard": ("22:00", "07:15", "23:45", "00:15"),
+}
+
+
+def _seed(first, count, weeks):
+    """Employees first..first+count-1 with entries in each of the first `weeks` weeks; the days worked vary by week so
+    some weeks run into overtime, and one day in each week is PTO."""
+    with db._conn() as conn:
+        for i in range(first, first + count):
+            shift = SHIFTS[i % len(SHIFTS)]
+            employee_id = db.create_employee(
+                conn, f"user{i:04d}", PASSWORD_HASH, f"Employee {i:04d}", shift=shift,
+                employment_type="contractor" if i % 5 == 0 else "full_time",
+            )
+            clock_in, clock_out, lunch_start, lunch_end = PUNCHES[shift or "day"]
+            for w in range(weeks):
+                week = FIRST_WEEK + timedelta(days=7 * w)
+                for d in range(3 + (i + w) % 5):
+                    work_date = week + timedelta(days=d)
+                    if d == (i + w) % 3:
+                        db.upsert_time_entry(conn, employee_id, work_date, notes="PTO", regular_hours=8)
+                        continue
+                    hours, _ = logic.day_hours(clock_in, clock_out, lunch_start, lunch_end)
+                    worked_shift = logic.classify_shift(clock_in, clock_out)
+                    db.upsert_time_entry(
+                        conn, employee_id, work_date, clock_in=clock_in, clock_out=clock_out, lunch_start=lunch_start,
+                        lunch_end=lunch_end, notes="", regular_hours=hours, is_graveyard=int(worked_shift == "graveyard"),
+                        shift=worked_shift,
+                    )
+
+
+def _workbook(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return load_workbook(io.BytesIO(response.data))
+
+
+def _values(ws, first_row=1):
+    return [list(row) for row in ws.iter_rows(min_row=first_row, values_only=True)]
+
+
+@pytest.fixture
+def seeded(database):
+    _seed(0, 12, 3)
+
+
+def test_weeks_layout_matches_the_week_exports(admin_client, seeded):
+    # Mid-week from/to: widened to the Mondays of their weeks.
+    wb = _workbook(admin_client, f"/export/range?from={FIRST_WEEK + timedelta(days=3)}&to={FIRST_WEEK + timedelta(days=15)}")
+    weeks = [FIRST_WEEK + timedelta(days=7 * w) for w in range(3)]
+    assert wb.sheetnames == [f"Week {w}" for w in weeks]
+    for w in weeks:
+        week = _workbook(admin_client, f"/export/week/{w}?shift=combined")["Combined"]
+        sheet = wb[f"Week {w}"]
+        assert sheet["A1"].value == f"Time Sheet Week {w} (All Shifts)"
+        # Same cells below the title row, same merged ranges.
+        assert _values(sheet, 2) == _values(week, 2)
+        assert {str(r) for r in sheet.merged_cells.ranges} == {str(r) for r in week.merged_cells.ranges}
+
+
+def test_weeks_layout_for_one_shift(admin_client, seeded):
+    last = FIRST_WEEK + timedelta(days=14)
+    response = admin_client.get(f"/export/range?from={last}&to={FIRST_WEEK}&shift=day")  # reversed: swapped
+    assert response.headers["Content-Disposition"].endswith(f"timesheet_{FIRST_WEEK}_{last + timedelta(days=6)}_weeks_day.xlsx")
+    wb = load_workbook(io.BytesIO(response.data))
+    for w in (FIRST_WEEK, FIRST_WEEK + timedelta(days=7), last):
+        week = _workbook(admin_client, f"/export/week/{w}?shift=day")[f"Week {w}"]
+        assert _values(wb[f"Week {w}"]) == _values(week)
+
+
+def test_summary_layout_totals_by_shift(admin_client, seeded):
+    weeks = [FIRST_WEEK + timedelta(days=7 * w) for w in range(3)]
+    ws = _workbook(admin_client, f"/export/range?from={weeks[0] + timedelta(days=6)}&to={weeks[-1] + timedelta(days=1)}&layout=summary")["Summary"]
+    rows = _values(ws)
+    assert rows[0][0] == f"Time Sheet Summary {weeks[0]} to {weeks[-1] + timedelta(days=6)}"
+    assert [v for v in rows[1] if v] == ["3/2 – 3/8", "3/9 – 3/15", "3/16 – 3/22", "Period total"]
+    assert rows[2] == ["No.", "Name"] + ["Attendance", "Overtime", "Total"] * 4
+
+    # Expected per shift: each employee's Attendance/Overtime/Total from that week's all-shifts export.
+    expected = {}
+    for w in weeks:
+        week = _workbook(admin_client, f"/export/week/{w}")
+        for shift in ("day", "swing", "graveyard"):
+            for row in _values(week[shift.capitalize()], 5):
+                expected.setdefault(shift, {}).setdefault(row[2], []).append(tuple(row[-3:]))
+    sections, shift = {}, None
+    for row in rows[3:]:
+        if row[1] is None:
+            shift = row[0].split()[0].lower()
+            continue
+        sections.setdefault(shift, {})[row[1]] = row[2:]
+    # Employees with no shift are exported in their own section, but only the three shifts have week sheets.
+    assert list(sections) == ["day", "swing", "graveyard", "unassigned"]
+    assert len(sections["unassigned"]) == 3
+    for shift, by_name in expected.items():
+        assert list(sections[shift]) == sorted(by_name, key=str.upper)
+        for name, per_week in by_name.items():
+            cells = sections[shift][name]
+            assert [tuple(cells[3 * i:3 * i + 3]) for i in range(3)] == per_week
+            assert cells[-3:] == [pytest.approx(sum(t[k] for t in per_week), abs=0.011) for k in range(3)]
+    assert any(t[1] for per_shift in expected.values() for per_week in per_shift.values() for t in per_week)
+
+    # One shift: only its section.
+    ws = _workbook(admin_client, f"/export/range?from={weeks[0]}&to={weeks[-1]}&layout=summary&shift=swing")["Summary"]
+    assert [row[0] for row in _values(ws, 4) if row[1] is None] == ["Swing shift"]
+
+
+@pytest.mark.parametrize("query, status", [
+    (f"from={FIRST_WEEK}&to={FIRST_WEEK + timedelta(days=7 * 52 + 6)}", 200),   # 53 weeks
+    (f"from={FIRST_WEEK + timedelta(days=6)}&to={FIRST_WEEK + timedelta(days=7 * 52)}", 200),
+    (f"from={FIRST_WEEK}&to={FIRST_WEEK + timedelta(days=7 * 53)}", 400),      # 54 weeks
+    (f"from={FIRST_WEEK + timedelta(days=7 * 53)}&to={FIRST_WEEK}", 400),
+    (f"from=2026-02-30&to={FIRST_WEEK}", 400),
+    (f"from={FIRST_WEEK}", 400),
+    ("from=&to=", 400),
+])
+def test_range_limits_and_bad_parameters(admin_client, database, query, status):
+    assert admin_client.get(f"/export/range?{query}").status_code == status
+
+
+def test_employees_are_refused(app):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = employee_id
+        session["full_name"] = "Worker One"
+        session["is_admin"] = False
+    response = client.get(f"/export/range?from={FIRST_WEEK}&to={FIRST_WEEK}")
+    assert response.status_code != 200 and not response.data.startswith(b"PK")
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Every SQL statement run on connections opened from here on."""
+    seen = []
+    open_conn = db._open_conn
+
+    def traced():
+        conn = open_conn()
+        conn.set_trace_callback(seen.append)
+        return conn
+
+    db.close_pool()
+    monkeypatch.setattr(db, "_open_conn", traced)
+    return seen
+
+
+def _count(client, statements, url):
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return len(statements)
+
+
+@pytest.mark.parametrize("query", ["", "&shift=day", "&layout=summary", "&layout=summary&shift=graveyard"])
+def test_statement_count_does_not_grow(admin_client, statements, query):
+    def url(weeks):
+        return f"/export/range?from={FIRST_WEEK}&to={FIRST_WEEK + timedelta(days=7 * weeks - 1)}{query}"
+
+    _seed(0, 8, 6)
+    _count(admin_client, statements, url(2))  # warm the connection and the employee cache
+    counts = {weeks: _count(admin_client, statements, url(weeks)) for weeks in (2, 6)}
+    _seed(8, 16, 6)
+    _count(admin_client, statements, url(6))  # reload the employee cache the seeding invalidated
+    counts["more employees"] = _count(admin_client, statements, url(6))
+    assert counts[2] == counts[6] == counts["more employees"], counts
@@ -0,0 +1,131 @@
+"""/timesheet/save-week: a whole week in one transaction, all or nothing, returning the recomputed week."""
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+WEEK = [
+    {"work_date": (MONDAY + timedelta(days=d)).isoformat(), "clock_in": "06:00", "clock_out": "17:30",
+     "lunch_start": "11:00", "lunch_end": "11:30", "notes": ""}
+    for d in range(5)
+] + [
+    {"work_date": (MONDAY + timedelta(days=5)).isoformat(), "clock_in": "22:00", "clock_out": "06:30", "notes": ""},
+    {"work_date": (MONDAY + timedelta(days=6)).isoformat(), "notes": "PTO"},
+]
+
+
+@pytest.fixture
+def workers(database):
+    with db._conn() as conn:
+        ids = [db.create_employee(conn, f"worker{i}", PASSWORD_HASH, f"Worker {i}", shift="day") for i in range(2)]
+        db.upsert_time_entry(conn, ids[0], MONDAY, clock_in="07:00", clock_out="15:30", lunch_start="11:30",
+                             lunch_end="12:00", notes="", regular_hours=8, shift="day")
+    return [db.get_employee_by_id(i) for i in ids]
+
+
+@pytest.fixture
+def worker_client(app, workers):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = workers[0]["id"]
+        session["full_name"] = workers[0]["full_name"]
+        session["is_admin"] = False
+    return client
+
+
+def _save(client, days, **extra):
+    return client.post("/timesheet/save-week", json={"week_start": (MONDAY + timedelta(days=2)).isoformat(), "days": days, **extra})
+
+
+def _entries(employee_id):
+    return [{k: e[k] for k in ("work_date", "clock_in", "clock_out", "lunch_start", "lunch_end", "regular_hours", "notes")}
+            for e in db.get_entries_for_week(employee_id, MONDAY)]
+
+
+def test_full_week(worker_client, workers):
+    response = _save(worker_client, WEEK)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"]
+    saved = _entries(workers[0]["id"])
+    assert [e["work_date"] for e in saved] == [d["work_date"] for d in WEEK]
+    assert saved[0] == {"work_date": "2026-10-12", "clock_in": "06:00", "clock_out": "17:30", "lunch_start": "11:00",
+                        "lunch_end": "11:30", "regular_hours": 11.0, "notes": ""}
+    assert saved[6]["notes"] == "PTO"
+    assert [d["shift"] for d in body["days"]] == ["day"] * 5 + ["graveyard", None]
+    assert [d["overtime_hours"] for d in body["days"]] == [3.0] * 5 + [0.5, 0]
+
+
+def test_returned_totals_match_week_totals(worker_client, workers):
+    body = _save(worker_client, WEEK).get_json()
+    totals = db.get_week_totals(MONDAY)[workers[0]["id"]]
+    assert (body["attendance"], body["overtime_total"], body["total_hours"]) == pytest.approx(
+        (totals["attendance"], totals["overtime_hours"], totals["total_hours"]))
+    assert sum(d["regular_hours"] for d in body["days"]) == pytest.approx(totals["regular_hours"])
+    # And the same figures the week JSON endpoint serves.
+    week = worker_client.get(f"/api/timesheet/week?week={MONDAY}").get_json()
+    assert (week["attendance"], week["overtime_total"], week["total_hours"], week["days"]) == (
+        body["attendance"], body["overtime_total"], body["total_hours"], body["days"])
+
+
+@pytest.mark.parametrize("bad_day, error", [
+    ({"work_date": "2026-10-32"}, "Invalid date"),
+    ({"work_date": "2026-10-19", "clock_in": "07:00", "clock_out": "15:00"}, "Date is not in this week"),
+    ("not a day", "Invalid date"),
+    ({"work_date": 5}, "Invalid date"),
+    ({"work_date": "2026-10-15", "clock_in": 7, "clock_out": "15:00"}, "Invalid clock_in"),
+    ({"work_date": "2026-10-15", "lunch_end": ["12:00"]}, "Invalid lunch_end"),
+    ({"work_date": "2026-10-15", "notes": 3}, "Invalid notes"),
+    ({"work_date": "2026-10-16", "notes": "Sick leave"}, "disapproved"),
+], ids=["invalid_date", "other_week", "not_an_object", "numeric_date", "numeric_clock", "list_lunch", "numeric_notes",
+        "disapproved_timeoff"])
+def test_one_invalid_day_rejects_the_week(worker_client, workers, bad_day, error):
+    rejected = db.create_timeoff_request(workers[0]["id"], date(2026, 10, 16), date(2026, 10, 16), "Sick leave")
+    db.set_timeoff_request_status(rejected, "rejected")
+    before, totals, version = _entries(workers[0]["id"]), db.get_week_totals(MONDAY), db.get_week_data_version(MONDAY)
+    response = _save(worker_client, WEEK[:3] + [bad_day] + WEEK[5:])
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+    assert _entries(workers[0]["id"]) == before
+    assert db.get_week_totals(MONDAY) == totals
+    assert db.get_week_data_version(MONDAY) == version
+
+
+@pytest.mark.parametrize("days", [[], WEEK + WEEK[:1], {"work_date": "2026-10-12"}], ids=["empty", "eight", "not_a_list"])
+def test_day_list_is_checked(worker_client, days):
+    assert _save(worker_client, days).status_code == 400
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"week_start": 20261012, "days": WEEK}, "Invalid week_start"),
+    ({"week_start": None, "days": WEEK}, "Invalid week_start"),
+    (["x"], "JSON object"),
+    ("2026-10-12", "JSON object"),
+], ids=["numeric_week_start", "null_week_start", "list_body", "string_body"])
+def test_malformed_body_is_rejected(worker_client, workers, body, error):
+    before = _entries(workers[0]["id"])
+    response = worker_client.post("/timesheet/save-week", json=body)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+    assert _entries(workers[0]["id"]) == before
+
+
+def test_non_admin_cannot_save_another_employee(worker_client, workers):
+    other = workers[1]["id"]
+    response = _save(worker_client, WEEK[:2], employee_id=other)
+    assert response.status_code == 200
+    assert _entries(other) == []
+    assert db.get_week_totals(MONDAY).get(other) is None
+    # The save went to the signed-in employee.
+    assert [e["clock_in"] for e in _entries(workers[0]["id"])] == ["06:00", "06:00"]
+
+
+def test_admin_saves_another_employee(admin_client, workers):
+    other = workers[1]["id"]
+    body = _save(admin_client, WEEK, employee_id=other).get_json()
+    assert body["ok"]
+    assert len(_entries(other)) == 7
+    assert body["total_hours"] == db.get_week_totals(MONDAY)[other]["total_hours"]
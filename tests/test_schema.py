@@ -0,0 +1,52 @@
+"""init_db: the user_version stamp of schema version and daily cap, and databases it does not know."""
+from datetime import date, timedelta
+
+import pytest
+
+import config
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+
+
+def _user_version():
+    with db._conn() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _restart():
+    db.close_pool()
+    db.init_db()
+
+
+def test_stamp_records_schema_version_and_cap(database):
+    assert _user_version() == db.SCHEMA_VERSION * 10000 + round(config.REGULAR_HOURS_PER_DAY * 100)
+
+
+def test_up_to_date_database_skips_migrations(monkeypatch, database):
+    migrations = []
+    monkeypatch.setattr(db, "_MIGRATIONS", (migrations.append,) * db.SCHEMA_VERSION)
+    _restart()
+    assert migrations == []
+
+
+def test_unversioned_database_rebuilds_week_totals(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker")
+        for d in range(6):  # six 9.5-hour days
+            db.upsert_time_entry(conn, employee_id, MONDAY + timedelta(days=d), clock_in="06:30", clock_out="16:30",
+                                 lunch_start="12:00", lunch_end="12:30", notes="", shift="day")
+        conn.execute("UPDATE employee_week_totals SET overtime_hours = 0, total_hours = 0")
+        conn.execute("PRAGMA user_version = 0")
+        conn.commit()
+    _restart()
+    assert db.get_week_totals(MONDAY)[employee_id]["overtime_hours"] > 0
+    assert _user_version() == db.SCHEMA_VERSION * 10000 + round(config.REGULAR_HOURS_PER_DAY * 100)
+
+
+def test_newer_database_is_refused(database):
+    with db._conn() as conn:
+        conn.execute(f"PRAGMA user_version = {(db.SCHEMA_VERSION + 1) * 10000 + 800}")
+    with pytest.raises(RuntimeError, match="newer than this code"):
+        _restart()
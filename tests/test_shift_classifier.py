@@ -0,0 +1,152 @@
+"""ShiftClassifier against a plain interval-overlap reference, with custom window lists, config changes and config.SHIFT_WINDOWS."""
+import random
+from datetime import date
+from fractions import Fraction
+
+import pytest
+
+import config
+import database as db
+import timesheet_batch as batch
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+DAY = logic.MINUTES_PER_DAY
+# More than the three configured shifts, including a window that wraps midnight and one that ends at midnight.
+CUSTOM = [("night", 20 * 60, 4 * 60), ("early", 4 * 60, 8 * 60), ("day", 8 * 60, 16 * 60), ("late", 16 * 60, 20 * 60),
+          ("evening", 18 * 60, 24 * 60)]
+
+
+def _reference_minutes(windows, in_min, out_min):
+    """Minutes of [in, out) (out past midnight when out <= in) inside each window, by adding up interval overlaps."""
+    if out_min <= in_min:
+        out_min += DAY
+    result = []
+    for _, start, end in windows:
+        start %= DAY
+        end = end % DAY if end < DAY else DAY
+        length = end - start if end > start else end + DAY - start
+        # Occurrences of the window on the days the shift can touch (the day before, for windows wrapping into it).
+        total = sum(max(0, min(out_min, s + length) - max(in_min, s)) for s in (start - DAY, start, start + DAY))
+        result.append(total)
+    return result
+
+
+def _reference_classify(windows, in_min, out_min):
+    minutes = _reference_minutes(windows, in_min, out_min)
+    return windows[minutes.index(max(minutes))][0]  # first listed wins a tie
+
+
+def _config_windows():
+    return [
+        ("graveyard", config.GRAVEYARD_START_HOUR * 60, config.GRAVEYARD_END_HOUR * 60),
+        ("swing", int(config.SWING_SHIFT_START_HOUR * 60), int(config.SWING_SHIFT_END_HOUR * 60)),
+        ("day", int(config.DAY_SHIFT_START_HOUR * 60), int(config.DAY_SHIFT_END_HOUR * 60)),
+    ]
+
+
+def _random_minutes(rnd, with_seconds):
+    minute = rnd.randrange(DAY)
+    return Fraction(minute) + (Fraction(rnd.randrange(60), 60) if with_seconds else 0)
+
+
+@pytest.mark.parametrize("windows", [_config_windows(), CUSTOM], ids=["config", "custom"])
+@pytest.mark.parametrize("with_seconds", [False, True], ids=["minutes", "seconds"])
+def test_matches_interval_overlap(windows, with_seconds):
+    classifier = logic.ShiftClassifier(windows)
+    rnd = random.Random(7)
+    pairs = [(_random_minutes(rnd, with_seconds), _random_minutes(rnd, with_seconds)) for _ in range(4000)]
+    pairs += [(m, m) for m in (0, 360, 1320)]  # clock out = clock in: 24 hours
+    for in_min, out_min in pairs:
+        want = _reference_minutes(windows, in_min, out_min)
+        got = classifier.minutes_in_windows(float(in_min), float(out_min))
+        assert got == pytest.approx([float(w) for w in want], abs=1e-6), (in_min, out_min)
+        best = sorted(want, reverse=True)
+        if best[0] - best[1] > Fraction(1, 1000) or best[0] == best[1] and not with_seconds:
+            assert classifier.classify_minutes(float(in_min), float(out_min)) == _reference_classify(windows, in_min, out_min)
+
+
+@pytest.mark.parametrize("clock_in, clock_out, expected", [
+    ("07:00", "15:30", "day"),
+    ("15:00", "23:45", "swing"),
+    ("22:00", "06:00", "graveyard"),
+    ("23:30", "07:30", "graveyard"),     # wraps midnight
+    ("05:00", "09:00", "day"),           # 1h graveyard, 2h day
+    ("14:00", "22:00", "swing"),
+    ("18:45", "02:45", "swing"),         # 5h swing, 4h45 graveyard
+    ("07:00:59", "15:30:30", "day"),
+    ("21:00:30", "05:00:30", "graveyard"),
+    ("", "15:30", None),
+    ("07:00", "bad", None),
+])
+def test_config_windows_against_reference(clock_in, clock_out, expected):
+    got = logic.classify_shift(clock_in, clock_out)
+    if expected is None:
+        assert got is None
+        return
+    in_min = logic.time_to_minutes(logic.parse_time(clock_in))
+    out_min = logic.time_to_minutes(logic.parse_time(clock_out))
+    assert got == _reference_classify(_config_windows(), in_min, out_min) == expected
+
+
+def test_ties_go_to_the_first_listed_window():
+    windows = [("a", 0, 600), ("b", 600, 1200)]
+    assert logic.ShiftClassifier(windows).classify("08:20", "11:40") == "a"   # 100 minutes in each
+    assert logic.ShiftClassifier(windows[::-1]).classify("08:20", "11:40") == "b"
+    assert logic.ShiftClassifier(windows).classify("08:20:30", "11:40:30") == "b"   # 99.5 vs 100.5
+    # Outside every window: all zero, so the first listed.
+    assert logic.ShiftClassifier([("a", 0, 60), ("b", 60, 120)]).classify("12:00", "13:00") == "a"
+
+
+def test_custom_windows():
+    classifier = logic.ShiftClassifier(CUSTOM)
+    assert classifier.names == ["night", "early", "day", "late", "evening"]
+    assert classifier.classify("05:00", "09:00") == "early"      # 3h early, 1h day
+    assert classifier.classify("16:00", "20:00") == "late"       # 4h late, 2h evening
+    assert classifier.classify("18:00", "23:59") == "evening"
+    assert classifier.classify("21:00", "03:00") == "night"
+    assert classifier.classify("03:00", "05:00") == "night"      # 1h each: night listed first
+    assert classifier.minutes_in_windows(22 * 60, 2 * 60) == [240, 0, 0, 0, 120]
+
+
+def test_classifier_rebuilt_after_config_change(monkeypatch):
+    classifier = logic.get_shift_classifier()
+    assert logic.get_shift_classifier() is classifier
+    assert logic.classify_shift("05:00", "11:00") == "day"
+    monkeypatch.setattr(config, "DAY_SHIFT_START_HOUR", 9.0)
+    rebuilt = logic.get_shift_classifier()
+    assert rebuilt is not classifier
+    assert logic.get_shift_classifier() is rebuilt
+    # 05:00-11:00 is now 1h graveyard and 2h day, 9:00 onwards.
+    assert logic.classify_shift("05:00", "11:00") == _reference_classify(_config_windows(), 300, 660) == "day"
+    monkeypatch.setattr(config, "GRAVEYARD_END_HOUR", 8)
+    assert logic.classify_shift("05:00", "11:00") == _reference_classify(_config_windows(), 300, 660) == "graveyard"
+
+
+def test_configured_windows(monkeypatch, database):
+    default = logic.get_shift_classifier()
+    monkeypatch.setattr(config, "SHIFT_WINDOWS", config._parse_shift_windows(
+        "Night=20-4, early=4-8,day=8-16,late=16-20,evening=18-24"))
+    classifier = logic.get_shift_classifier()
+    assert classifier is not default and logic.get_shift_classifier() is classifier
+    assert classifier.names == [name for name, _, _ in CUSTOM]
+    assert logic.shift_windows() == CUSTOM
+    assert logic.classify_shift("05:00", "09:00") == "early"
+    assert logic.classify_shift("21:00", "03:00") == "night"
+    assert list(batch.classify_shifts([300, 1260], [540, 180])) == ["early", "night"]
+
+    # The computed week and the saved entry keep the configured name.
+    entries = [{"work_date": "2026-10-12", "clock_in": "16:00", "clock_out": "20:00", "notes": "", "shift": None}]
+    assert logic.compute_weekly_overtime(entries)[0]["shift"] == "late"
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker", shift="day")
+        db.upsert_time_entry(conn, employee_id, date(2026, 10, 12), clock_in="16:00", clock_out="20:00", regular_hours=4,
+                             shift="late")
+        db.upsert_time_entry(conn, employee_id, date(2026, 10, 13), clock_in="07:00", clock_out="15:30", regular_hours=8.5,
+                             shift="swing")  # not a configured window
+    assert [e["shift"] for e in db.get_entries_for_week(employee_id, date(2026, 10, 12))] == ["late", None]
+
+    # Back to the day/swing/graveyard settings.
+    monkeypatch.setattr(config, "SHIFT_WINDOWS", config._parse_shift_windows(""))
+    assert logic.get_shift_classifier().names == ["graveyard", "swing", "day"]
+    assert logic.compute_weekly_overtime(entries)[0]["shift"] == "swing"
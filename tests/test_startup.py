@@ -0,0 +1,92 @@
+"""Starting several worker processes at once on one database: one migration, one default admin, no lock errors."""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import config
+import database as db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 6
+
+# argv: database path, go file (start once it exists), ready file or "" (see HOLD_MIGRATION_LOCK).
+# Prints one JSON line: whether this process ran migrations and created the admin, and when it finished.
+_WORKER_SCRIPT = """
+import json, os, sys, time
+import config
+config.DATABASE_PATH = sys.argv[1]
+import app, database as db
+migrated = []
+db._MIGRATIONS = tuple((lambda m: lambda conn: (migrated.append(m.__name__), m(conn)))(m) for m in db._MIGRATIONS)
+if sys.argv[3]:
+    # Hold the migration lock: once inside the first migration, say so and keep the write transaction open a while.
+    first = db._MIGRATIONS[0]
+    def held(conn):
+        first(conn)
+        open(sys.argv[3], "w").close()
+        time.sleep(1.5)
+    db._MIGRATIONS = (held,) + db._MIGRATIONS[1:]
+while not os.path.exists(sys.argv[2]):
+    time.sleep(0.002)
+db.init_db()
+created = db.ensure_admin("admin", "pbkdf2:sha256:1000$test$" + "0" * 64, "admin")
+app.create_app(start_notifier=False)
+print(json.dumps({"migrated": bool(migrated), "created": created, "finished": time.time()}))
+"""
+
+
+def _start(database_path, go, ready=""):
+    return subprocess.Popen([sys.executable, "-c", _WORKER_SCRIPT, database_path, go, ready], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def _finish(process):
+    out, err = process.communicate(timeout=60)
+    assert "database is locked" not in err
+    assert process.returncode == 0, err
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _check_database(database_path):
+    conn = sqlite3.connect(database_path)
+    try:
+        admins = conn.execute("SELECT username FROM employees WHERE is_admin = 1").fetchall()
+        user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    assert admins == [("admin",)]
+    assert user_version == db.SCHEMA_VERSION * 10000 + round(config.REGULAR_HOURS_PER_DAY * 100)
+
+
+def test_concurrent_workers_on_a_fresh_database(tmp_path):
+    database_path, go = str(tmp_path / "timesheet.db"), str(tmp_path / "go")
+    processes = [_start(database_path, go) for _ in range(WORKERS)]
+    time.sleep(1)  # let every worker import and wait on the go file
+    open(go, "w").close()
+    results = [_finish(p) for p in processes]
+    assert sum(r["created"] for r in results) == 1
+    assert sum(r["migrated"] for r in results) == 1
+    _check_database(database_path)
+
+
+def test_worker_waits_for_a_migration_in_progress(tmp_path):
+    database_path, go, ready = str(tmp_path / "timesheet.db"), str(tmp_path / "go"), str(tmp_path / "ready")
+    open(go, "w").close()
+    holder = _start(database_path, go, ready)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(ready):
+        assert holder.poll() is None and time.monotonic() < deadline, holder.stderr.read() if holder.poll() is not None else ""
+        time.sleep(0.01)
+    lock_taken = time.time()
+    # The holder is inside its migration transaction: these start now and must wait for it rather than fail.
+    waiters = [_start(database_path, go) for _ in range(3)]
+    held = _finish(holder)
+    results = [_finish(p) for p in waiters]
+    assert held["migrated"] and not any(r["migrated"] for r in results)
+    # None got past init_db before the holder committed (it keeps the lock 1.5 seconds after lock_taken).
+    assert all(r["finished"] >= lock_taken + 1.4 for r in results)
+    assert sum(r["created"] for r in [held] + results) == 1
+    _check_database(database_path)
@@ -0,0 +1,140 @@
+"""Bulk approve / disapprove of time-off requests: per-request results, one transaction, and the JSON and form routes."""
+from datetime import date
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+
+
+@pytest.fixture
+def batch(database):
+    """A pending request (Fri–Tue, two weeks), an approved one, a contractor's and one to reject."""
+    with db._conn() as conn:
+        worker = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker", shift="day")
+        contractor = db.create_employee(conn, "contractor", PASSWORD_HASH, "Contractor", employment_type="contractor")
+        db.upsert_time_entry(conn, worker, MONDAY, clock_in="07:00", clock_out="15:30", lunch_start="11:30",
+                             lunch_end="12:00", notes="", regular_hours=8, shift="day")
+    ids = {
+        "pending": db.create_timeoff_request(worker, date(2026, 10, 16), date(2026, 10, 20), "PTO", hours_per_day=6),
+        "approved": db.create_timeoff_request(worker, date(2026, 11, 2), date(2026, 11, 2), "Sick leave"),
+        "contractor": db.create_timeoff_request(contractor, MONDAY, MONDAY, "PTO"),
+        "reject": db.create_timeoff_request(worker, date(2026, 11, 9), date(2026, 11, 10), "Non Pay"),
+    }
+    db.set_timeoff_request_status(ids["approved"], "approved")
+    return worker, contractor, ids
+
+
+def _state():
+    """Everything a status change may touch, minus timestamps."""
+    with db._conn() as conn:
+        return {
+            "requests": conn.execute("SELECT id, status FROM time_off_requests ORDER BY id").fetchall(),
+            "entries": conn.execute("""
+                SELECT employee_id, work_date, clock_in, clock_out, regular_hours, overtime_hours, notes
+                FROM time_entries ORDER BY employee_id, work_date
+            """).fetchall(),
+            "totals": conn.execute("""
+                SELECT employee_id, week_start, regular_hours, overtime_hours, attendance, total_hours
+                FROM employee_week_totals ORDER BY employee_id, week_start
+            """).fetchall(),
+            "days": conn.execute("SELECT request_id, work_date, status FROM time_off_request_days ORDER BY request_id, work_date").fetchall(),
+            "versions": dict(conn.execute("SELECT scope, version FROM data_versions").fetchall()),
+        }
+
+
+def _as_tuples(state):
+    return {k: v if isinstance(v, dict) else [tuple(r) for r in v] for k, v in state.items()}
+
+
+def test_mixed_batch(batch):
+    worker, contractor, ids = batch
+    before = _as_tuples(_state())
+    approve = db.set_timeoff_request_statuses([ids["pending"], 9999, ids["approved"], ids["contractor"], ids["pending"]], "approved")
+    assert approve == [
+        {"id": ids["pending"], "ok": True, "previous_status": "pending", "days_applied": 5, "error": None},
+        {"id": 9999, "ok": False, "previous_status": None, "days_applied": 0, "error": "not found"},
+        {"id": ids["approved"], "ok": True, "previous_status": "approved", "days_applied": 0, "error": None},
+        {"id": ids["contractor"], "ok": True, "previous_status": "pending", "days_applied": 0, "error": None},
+    ]
+    reject = db.set_timeoff_request_statuses([ids["reject"]], "rejected")
+    assert reject == [{"id": ids["reject"], "ok": True, "previous_status": "pending", "days_applied": 0, "error": None}]
+    after = _as_tuples(_state())
+
+    assert dict(after["requests"]) == {ids["pending"]: "approved", ids["approved"]: "approved",
+                                       ids["contractor"]: "approved", ids["reject"]: "rejected"}
+    # Time entries, week totals, request days and data versions moved together.
+    added = sorted(set(after["entries"]) - set(before["entries"]))
+    assert added == [(worker, d, None, None, 6.0, 0.0, "PTO")
+                     for d in ("2026-10-16", "2026-10-17", "2026-10-18", "2026-10-19", "2026-10-20")]
+    assert not [e for e in after["entries"] if e[0] == contractor]
+    totals = {(r[0], r[1]): r[2:] for r in after["totals"]}
+    assert totals[worker, "2026-10-12"][0] == 8.0 + 3 * 6.0
+    assert totals[worker, "2026-10-19"][0] == 2 * 6.0
+    assert {(r[0], r[2]) for r in after["days"]} == {(ids["pending"], "approved"), (ids["approved"], "approved"),
+                                                    (ids["contractor"], "approved"), (ids["reject"], "rejected")}
+    for scope in ("timeoff", "week:2026-10-12", "week:2026-10-19"):
+        assert after["versions"][scope] > before["versions"].get(scope, 0), scope
+    assert db.get_week_totals(MONDAY)[worker]["regular_hours"] == totals[worker, "2026-10-12"][0]
+
+
+def test_failure_rolls_back_the_whole_batch(batch, monkeypatch):
+    _, _, ids = batch
+    before = _state()
+
+    def fail(conn, employee_id, week_start):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db, "_refresh_week_totals", fail)
+    with pytest.raises(RuntimeError):
+        db.set_timeoff_request_statuses([ids["reject"], ids["pending"]], "approved")
+    assert _as_tuples(_state()) == _as_tuples(before)
+
+
+def test_json_route(admin_client, batch):
+    _, _, ids = batch
+    response = admin_client.post("/admin/timeoff/requests/status", json={"status": "approved", "ids": [ids["pending"], 9999]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ok"] is False
+    assert [(r["id"], r["ok"], r["days_applied"]) for r in body["results"]] == [(ids["pending"], True, 5), (9999, False, 0)]
+    response = admin_client.post("/admin/timeoff/requests/status", json={"status": "rejected", "ids": [ids["reject"]]})
+    assert response.get_json()["ok"] is True
+
+
+@pytest.mark.parametrize("payload", [
+    {"status": "approved", "ids": "123"},
+    {"status": "approved", "ids": {"1": 1}},
+    {"status": "approved"},
+    {"status": "approved", "ids": ["x"]},
+    {"status": "cancelled", "ids": [1]},
+], ids=["string", "object", "missing", "not_int", "bad_status"])
+def test_json_route_rejects_bad_payloads(admin_client, batch, payload):
+    before = _state()
+    response = admin_client.post("/admin/timeoff/requests/status", json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["ok"] is False
+    assert _as_tuples(_state()) == _as_tuples(before)
+
+
+def test_form_route(admin_client, batch):
+    _, _, ids = batch
+    response = admin_client.post("/admin/timeoff/requests/status", data={
+        "status": "approved", "request_id": [str(ids["pending"]), "9999"], "from": "2026-10-01", "to": "2026-10-31",
+    })
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/admin/timeoff?from=2026-10-01&to=2026-10-31")
+    assert _flashes(admin_client) == [
+        ("message", "1 time off request(s) approved; added to employee timesheets."),
+        ("error", "1 selected request(s) could not be updated (not found)."),
+    ]
+    assert db.get_timeoff_request_by_id(ids["pending"])["status"] == "approved"
+    admin_client.post("/admin/timeoff/requests/status", data={"status": "approved"})
+    assert _flashes(admin_client) == [("error", "No requests selected.")]
+
+
+def _flashes(client):
+    with client.session_transaction() as session:
+        return session.pop("_flashes", [])
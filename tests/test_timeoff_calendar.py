@@ -0,0 +1,154 @@
+"""get_timeoff_calendar_month: pinned against the three-query merge it replaced, and its cache against request changes."""
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+YEAR = 2026
+SHIFTS = ("day", "swing", "graveyard", None, " ")
+
+
+def _request_days(start, end):
+    """One entry per day in [start, end] of each pending, approved or cancelled request by a non-admin, in request order."""
+    with db._conn() as conn:
+        rows = conn.execute("""
+            SELECT r.id, r.employee_id, e.full_name, e.shift, e.fa_mtf, r.from_date, r.to_date, r.notes, r.status
+            FROM time_off_requests r
+            JOIN employees e ON e.id = r.employee_id
+            WHERE r.status IN ('pending', 'approved', 'cancelled') AND (e.is_admin IS NULL OR e.is_admin = 0)
+            ORDER BY r.id
+        """).fetchall()
+    days = []
+    for r in rows:
+        d = max(date.fromisoformat(r["from_date"]), start)
+        while d <= min(date.fromisoformat(r["to_date"]), end):
+            days.append({"employee_id": r["employee_id"], "full_name": r["full_name"], "shift": r["shift"], "fa_mtf": r["fa_mtf"],
+                         "work_date": d.isoformat(), "notes": r["notes"], "status": r["status"]})
+            d += timedelta(days=1)
+    return days
+
+
+def _reference_month(year, month):
+    """The admin calendar's merge before get_timeoff_calendar_month: time-off entries and request days combined in Python."""
+    month_start = date(year, month, 1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    entries = db.get_timeoff_entries(month_start, month_end, exclude_admin=True)
+    request_entries = _request_days(month_start, month_end)
+    cancelled_set = {(e["employee_id"], e["work_date"]) for e in request_entries if e["status"] == "cancelled"}
+    seen = {(e["work_date"], e["employee_id"]) for e in entries}
+    merged = [dict(e, pending=False, cancelled=False) for e in entries]
+    for e in request_entries:
+        key = (e["work_date"], e["employee_id"])
+        if key not in seen:
+            seen.add(key)
+            merged.append(dict(e, pending=(e["status"] == "pending"), cancelled=(e["status"] == "cancelled")))
+    by_date = {}
+    for e in merged:
+        is_cancelled = (e["employee_id"], e["work_date"]) in cancelled_set or e.get("cancelled", False)
+        by_date.setdefault(e["work_date"], []).append({
+            "employee_id": e["employee_id"], "full_name": e["full_name"], "shift": e["shift"], "fa_mtf": e.get("fa_mtf"),
+            "notes": e["notes"], "pending": e.get("pending", False), "cancelled": is_cancelled,
+        })
+    shift_count_by_date = defaultdict(lambda: defaultdict(int))
+    for e in merged:
+        if e.get("cancelled") or (e["employee_id"], e["work_date"]) in cancelled_set:
+            continue
+        shift_count_by_date[e["work_date"]][(e.get("shift") or "").strip() or "(no shift)"] += 1
+    shift_counts = {d: dict(by_shift) for d, by_shift in shift_count_by_date.items()}
+    conflict_dates = {d for d, by_shift in shift_counts.items() if any(c >= 2 for c in by_shift.values())}
+    return by_date, shift_counts, conflict_dates
+
+
+@pytest.fixture
+def seeded(database):
+    """Employees on every shift (plus an admin and a contractor) with time-off entries and overlapping requests in all states."""
+    rnd = random.Random(1)
+    with db._conn() as conn:
+        employees = [
+            db.create_employee(conn, f"emp{i:02d}", PASSWORD_HASH, f"Emp {i:02d}", shift=SHIFTS[i % len(SHIFTS)],
+                               employment_type="contractor" if i == 3 else "full_time", fa_mtf="fa" if i % 4 == 0 else None)
+            for i in range(12)
+        ]
+        employees.append(db.create_employee(conn, "boss", PASSWORD_HASH, "Boss", is_admin=True, shift="day"))
+        for _ in range(60):
+            db.upsert_time_entry(conn, rnd.choice(employees), date(YEAR, 1, 1) + timedelta(days=rnd.randrange(365)),
+                                 notes=rnd.choice(db.TIME_OFF_NOTES), regular_hours=8)
+    for _ in range(150):
+        start = date(YEAR, 1, 1) + timedelta(days=rnd.randrange(-10, 365))
+        request_id = db.create_timeoff_request(rnd.choice(employees), start, start + timedelta(days=rnd.randrange(6)),
+                                               rnd.choice(db.TIME_OFF_NOTES))
+        action = rnd.random()
+        if action < 0.3:
+            db.set_timeoff_request_status(request_id, "approved")
+        elif action < 0.45:
+            db.set_timeoff_request_status(request_id, "rejected")
+        elif action < 0.6:
+            db.admin_discard_timeoff_request(request_id)
+    return employees
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_month_matches_three_query_merge(seeded, month):
+    by_date, shift_counts, conflict_dates = _reference_month(YEAR, month)
+    got = db.get_timeoff_calendar_month(YEAR, month)
+    # Every day of the month is present, empty when nobody is off.
+    assert {d: entries for d, entries in got["by_date"].items() if entries} == by_date
+    assert len(got["by_date"]) == (date(YEAR + month // 12, month % 12 + 1, 1) - date(YEAR, month, 1)).days
+    assert got["shift_counts"] == shift_counts
+    assert got["conflict_dates"] == conflict_dates
+
+
+def test_seed_covers_the_interesting_cases(seeded):
+    months = [db.get_timeoff_calendar_month(YEAR, m) for m in range(1, 13)]
+    entries = [e for m in months for day in m["by_date"].values() for e in day]
+    assert any(e["pending"] for e in entries) and any(e["cancelled"] for e in entries)
+    assert any(m["conflict_dates"] for m in months)
+    # Some day lists request days out of employee id order, so request order is what is being pinned.
+    assert any([e["employee_id"] for e in day if e["pending"]] != sorted(e["employee_id"] for e in day if e["pending"])
+               for m in months for day in m["by_date"].values())
+
+
+def _names(month, day):
+    return [(e["full_name"], e["pending"], e["cancelled"]) for e in db.get_timeoff_calendar_month(YEAR, month)["by_date"][day]]
+
+
+def test_cache_follows_request_changes(database):
+    with db._conn() as conn:
+        first = db.create_employee(conn, "first", PASSWORD_HASH, "First", shift="day")
+        second = db.create_employee(conn, "second", PASSWORD_HASH, "Second", shift="day")
+    day = date(YEAR, 3, 10)
+    calendar = db.get_timeoff_calendar_month(YEAR, 3)
+    assert db.get_timeoff_calendar_month(YEAR, 3) is calendar
+    assert calendar["by_date"][day.isoformat()] == []
+
+    created = db.create_timeoff_request(first, day, day, "PTO")
+    assert _names(3, day.isoformat()) == [("First", True, False)]
+    db.create_timeoff_request(second, day, day + timedelta(days=1), "Sick leave")
+    assert day.isoformat() in db.get_timeoff_calendar_month(YEAR, 3)["conflict_dates"]
+
+    db.set_timeoff_request_status(created, "approved")
+    assert _names(3, day.isoformat()) == [("First", False, False), ("Second", True, False)]
+
+    db.admin_discard_timeoff_request(created)
+    assert _names(3, day.isoformat()) == [("First", False, True), ("Second", True, False)]
+    calendar = db.get_timeoff_calendar_month(YEAR, 3)
+    assert calendar["shift_counts"][day.isoformat()] == {"day": 1}
+    assert day.isoformat() not in calendar["conflict_dates"]
+    # A request in March leaves April as it was.
+    april = db.get_timeoff_calendar_month(YEAR, 4)
+    db.create_timeoff_request(second, date(YEAR, 3, 20), date(YEAR, 3, 20), "PTO")
+    assert db.get_timeoff_calendar_month(YEAR, 4) == april
+
+
+def test_calendar_page_shows_shift_counts_on_conflicts(admin_client, seeded):
+    month = next(m for m in range(1, 13) if db.get_timeoff_calendar_month(YEAR, m)["conflict_dates"])
+    calendar = db.get_timeoff_calendar_month(YEAR, month)
+    day = min(calendar["conflict_dates"])
+    page = admin_client.get(f"/admin/timeoff/calendar?year={YEAR}&month={month}").data.decode()
+    counts = ", ".join(f"{shift}: {count}" for shift, count in sorted(calendar["shift_counts"][day].items()))
+    assert f"have this day off ({counts})" in page
+    assert page.count("cal-cell-conflict") - 1 == len(calendar["conflict_dates"])  # one more in the stylesheet
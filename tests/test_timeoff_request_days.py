@@ -0,0 +1,141 @@
+"""time_off_request_days: one row per day of every request, kept equal to the expanded from..to ranges by each write."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+
+def _expanded():
+    """The day rows every request should have, expanded in Python from time_off_requests."""
+    with db._conn() as conn:
+        requests = conn.execute("SELECT id, employee_id, from_date, to_date, status, notes FROM time_off_requests").fetchall()
+    rows = set()
+    for r in requests:
+        d, to_d = date.fromisoformat(r["from_date"]), date.fromisoformat(r["to_date"])
+        while d <= to_d:
+            rows.add((r["id"], r["employee_id"], d.isoformat(), r["status"], r["notes"]))
+            d += timedelta(days=1)
+    return rows
+
+
+def _days():
+    with db._conn() as conn:
+        rows = conn.execute("SELECT request_id, employee_id, work_date, status, notes FROM time_off_request_days").fetchall()
+    return {tuple(r) for r in rows}
+
+
+def _assert_in_sync():
+    days = _days()
+    assert days == _expanded()
+    return days
+
+
+@pytest.fixture
+def employees(database):
+    with db._conn() as conn:
+        return [db.create_employee(conn, f"emp{i}", PASSWORD_HASH, f"Emp {i}", shift="day",
+                                   employment_type="contractor" if i == 2 else "full_time") for i in range(4)]
+
+
+def test_each_write_keeps_days_in_sync(employees):
+    first, second = employees[:2]
+    # Across a month end, a year end and a leap day.
+    created = [
+        db.create_timeoff_request(first, date(2026, 10, 29), date(2026, 11, 3), "PTO"),
+        db.create_timeoff_request(second, date(2026, 12, 30), date(2027, 1, 2), "Sick leave"),
+        db.create_timeoff_request(first, date(2028, 2, 28), date(2028, 3, 1), "PTO"),
+        db.create_timeoff_request(second, date(2026, 10, 14), date(2026, 10, 14), "PTO"),
+    ]
+    assert all(created)
+    assert len(_assert_in_sync()) == 6 + 4 + 3 + 1
+    # Rejected before any row is written.
+    assert db.create_timeoff_request(first, date(2026, 10, 5), date(2026, 10, 1), "PTO") is None
+    assert db.create_timeoff_request(first, date(2026, 10, 1), date(2026, 10, 1), "Not a leave type") is None
+    _assert_in_sync()
+
+    assert db.set_timeoff_request_status(created[0], "approved")
+    assert {d[3] for d in _assert_in_sync() if d[0] == created[0]} == {"approved"}
+    assert db.set_timeoff_request_status(created[0], "rejected")
+    _assert_in_sync()
+    assert db.discard_timeoff_request(created[1], second)
+    assert {d[3] for d in _assert_in_sync() if d[0] == created[1]} == {"cancelled"}
+    assert not db.discard_timeoff_request(created[2], second)  # not theirs: nothing changes
+    _assert_in_sync()
+    assert db.admin_discard_timeoff_request(created[2])
+    _assert_in_sync()
+    db.update_timeoff_request_admin_notes(created[3], "covered by Emp 0")
+    _assert_in_sync()
+    assert db.delete_timeoff_request(created[3])
+    assert not any(d[0] == created[3] for d in _assert_in_sync())
+
+
+def test_bulk_status_keeps_days_in_sync(employees):
+    first, _, contractor, _ = employees
+    ids = [db.create_timeoff_request(employee, date(2026, 10, 12) + timedelta(days=i), date(2026, 10, 14) + timedelta(days=i), "PTO")
+           for i, employee in enumerate((first, contractor, first))]
+    results = db.set_timeoff_request_statuses(ids[:2] + [999999], "approved")
+    assert [r["ok"] for r in results] == [True, True, False]
+    days = _assert_in_sync()
+    assert {(d[0], d[3]) for d in days} == {(ids[0], "approved"), (ids[1], "approved"), (ids[2], "pending")}
+    db.set_timeoff_request_statuses(ids, "rejected")
+    assert {d[3] for d in _assert_in_sync()} == {"rejected"}
+
+
+def test_random_writes_keep_days_in_sync(employees):
+    rnd = random.Random(11)
+    live = []
+    for step in range(200):
+        action = rnd.random()
+        if action < 0.4 or not live:
+            start = date(2026, 1, 1) + timedelta(days=rnd.randrange(400))
+            request_id = db.create_timeoff_request(rnd.choice(employees), start, start + timedelta(days=rnd.randrange(10)),
+                                                   rnd.choice(db.TIME_OFF_NOTES))
+            live.append(request_id)
+        elif action < 0.6:
+            db.set_timeoff_request_status(rnd.choice(live), rnd.choice(("approved", "rejected")))
+        elif action < 0.7:
+            db.set_timeoff_request_statuses(rnd.sample(live, min(len(live), 5)), rnd.choice(("approved", "rejected")))
+        elif action < 0.8:
+            request_id = rnd.choice(live)
+            db.discard_timeoff_request(request_id, db.get_timeoff_request_by_id(request_id)["employee_id"])
+        elif action < 0.9:
+            db.admin_discard_timeoff_request(rnd.choice(live))
+        else:
+            request_id = live.pop(rnd.randrange(len(live)))
+            assert db.delete_timeoff_request(request_id)
+        if step % 10 == 0:
+            _assert_in_sync()
+    assert len(_assert_in_sync()) > 100
+
+
+def test_deleting_an_employee_removes_their_days(employees):
+    for employee in employees[:2]:
+        db.create_timeoff_request(employee, date(2026, 10, 12), date(2026, 10, 16), "PTO")
+    with db._conn() as conn:
+        db.delete_employee(conn, employees[0])
+    assert {d[1] for d in _assert_in_sync()} == {employees[1]}
+
+
+def test_migration_backfills_existing_requests(employees):
+    rnd = random.Random(3)
+    for _ in range(40):
+        start = date(2026, 1, 1) + timedelta(days=rnd.randrange(365))
+        request_id = db.create_timeoff_request(rnd.choice(employees), start, start + timedelta(days=rnd.randrange(8)), "PTO")
+        if rnd.random() < 0.5:
+            db.set_timeoff_request_status(request_id, rnd.choice(("approved", "rejected")))
+    expected = _assert_in_sync()
+    # A database from before the table existed: the requests are there, their days are not.
+    with db._conn() as conn:
+        conn.execute("DROP TABLE time_off_request_days")
+        conn.execute("PRAGMA user_version = 0")
+        conn.commit()
+    db.close_pool()
+    db.init_db()
+    assert _assert_in_sync() == expected
+    # Once backfilled, a later init leaves the table as it is.
+    db.close_pool()
+    db.init_db()
+    assert _days() == expected
@@ -0,0 +1,116 @@
+"""Admin time-off request list: keyset pages, filters, the shown total, and actions that keep the list's filters."""
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+START = date(2026, 10, 5)
+CREATED = "2026-10-01T09:00:00"
+
+
+@pytest.fixture
+def requests(database):
+    """Three employees with 23 requests over three statuses and all types; every fifth shares one created_at."""
+    with db._conn() as conn:
+        employees = [db.create_employee(conn, f"worker{i}", PASSWORD_HASH, f"Worker {i}") for i in range(3)]
+    ids = []
+    for i in range(23):
+        from_d = START + timedelta(days=i)
+        request_id = db.create_timeoff_request(employees[i % 3], from_d, from_d + timedelta(days=i % 4),
+                                               db.TIME_OFF_NOTES[i % 3])
+        ids.append(request_id)
+    with db._conn() as conn:
+        for i, request_id in enumerate(ids):
+            created_at = CREATED if i % 5 == 0 else f"2026-10-01T10:{i:02d}:00"
+            status = ("pending", "approved", "rejected")[i % 3]
+            conn.execute("UPDATE time_off_requests SET created_at = ?, status = ? WHERE id = ?", (created_at, status, request_id))
+        conn.commit()
+    return employees, ids
+
+
+def _all_pages(limit, **filters):
+    rows, before = [], None
+    while True:
+        page, before = db.list_timeoff_requests(before=before, limit=limit, **filters)
+        assert len(page) <= limit
+        rows += page
+        if before is None:
+            return rows
+
+
+def _expected(**filters):
+    """Matching requests, newest first, without going through the SQL filters."""
+    rows = [r for r in db.get_all_timeoff_requests()
+            if (not filters.get("status") or r["status"] == filters["status"])
+            and (not filters.get("employee_id") or r["employee_id"] == filters["employee_id"])
+            and (not filters.get("notes") or r["notes"] == filters["notes"])
+            and (not filters.get("overlap_from")
+                 or (r["from_date"] <= filters["overlap_to"].isoformat() and r["to_date"] >= filters["overlap_from"].isoformat()))]
+    return sorted(rows, key=lambda r: (r["created_at"], r["id"]), reverse=True)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+def test_pages_have_no_duplicates_or_gaps(requests, limit):
+    rows = _all_pages(limit)
+    assert [r["id"] for r in rows] == [r["id"] for r in _expected()]
+    assert len(rows) == 23
+    # The requests sharing one created_at are paged by id.
+    assert [r["id"] for r in rows if r["created_at"] == CREATED] == sorted(requests[1][::5], reverse=True)
+
+
+@pytest.mark.parametrize("filters", [
+    {"status": "approved"},
+    {"notes": "PTO"},
+    {"employee_id": "employee"},
+    {"overlap_from": START + timedelta(days=6), "overlap_to": START + timedelta(days=8)},
+    {"status": "pending", "notes": "Sick leave", "overlap_from": START, "overlap_to": START + timedelta(days=12)},
+], ids=["status", "type", "employee", "overlap", "combined"])
+def test_each_filter_pages_and_counts_the_same_rows(requests, filters):
+    employees, _ = requests
+    if filters.get("employee_id") == "employee":
+        filters = {"employee_id": employees[1]}
+    want = [r["id"] for r in _expected(**filters)]
+    assert 0 < len(want) < 23
+    assert [r["id"] for r in _all_pages(2, **filters)] == want
+    assert db.count_timeoff_requests(**filters) == len(want)
+
+
+def test_count_matches_the_listed_rows_for_a_request_without_employee(requests):
+    with db._conn() as conn:
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("""
+            INSERT INTO time_off_requests (employee_id, from_date, to_date, notes, hours_per_day, status, created_at, updated_at)
+            VALUES (9999, '2026-10-05', '2026-10-05', 'PTO', 8, 'pending', ?, ?)
+        """, (CREATED, CREATED))
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys=ON")
+    assert db.count_timeoff_requests() == len(_all_pages(50)) == 23
+
+
+def test_overlap_filter_uses_the_date_index(database):
+    where, args = db._timeoff_request_filter_sql(overlap_from=START, overlap_to=START)
+    with db._conn() as conn:
+        plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN SELECT id FROM time_off_requests r WHERE {where}", args))
+    assert "idx_time_off_requests_dates" in plan
+
+
+def test_actions_keep_the_list_filters(admin_client, requests):
+    employees, ids = requests
+    filters = {"req_status": "pending", "req_type": "Sick leave", "req_employee": str(employees[0]), "req_overlap": "1"}
+    form = {"from": "2026-10-01", "to": "2026-10-31", **filters}
+    page = admin_client.get("/admin/timeoff", query_string=form).data.decode()
+    more = admin_client.get("/admin/timeoff/requests", query_string={**form, "before": "2026-12-31T00:00:00|1"}).get_json()
+    for name, value in filters.items():
+        assert f'<input type="hidden" name="{name}" value="{value}">' in page
+        assert f'<input type="hidden" name="{name}" value="{value}">' in more["html"]
+    for url in (f"/admin/timeoff/request/{ids[0]}/approve", f"/admin/timeoff/request/{ids[3]}/reject",
+                f"/admin/timeoff/request/{ids[6]}/discard", f"/admin/timeoff/request/{ids[9]}/delete",
+                f"/admin/timeoff/request/{ids[12]}/notes", "/admin/timeoff/requests/status"):
+        response = admin_client.post(url, data={**form, "status": "approved", "request_id": str(ids[15])})
+        assert response.status_code == 302, url
+        location = urlsplit(response.headers["Location"])
+        assert location.path == "/admin/timeoff"
+        assert parse_qs(location.query) == {k: [v] for k, v in form.items()}, url
@@ -0,0 +1,157 @@
+"""timesheet_batch must give exactly what the per-row reference functions in timesheet_logic give."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import config
+import timesheet_batch as batch
+import timesheet_logic as logic
+
+EMPTY = (None, "", "  ", "7", "ab:cd", "25:00")
+# (clock_in, clock_out, lunch_start, lunch_end)
+EDGE_CASES = [
+    ("07:00", "15:30", "11:30", "12:00"),   # plain day shift
+    ("07:00", "17:45", "12:00", "12:30"),   # daily overtime
+    ("15:00", "23:45", "19:00", "19:30"),   # swing
+    ("22:00", "06:30", "02:00", "02:30"),   # overnight
+    ("22:00", "07:15", "23:45", "00:15"),   # overnight, lunch wraps midnight
+    ("08:00", "16:00", "23:50", "00:20"),   # lunch wraps midnight on a day shift
+    ("08:00", "16:00", "12:30", "12:00"),   # lunch end before start: treated as wrapping
+    ("09:00", "10:00", "10:00", "18:00"),   # lunch longer than the shift
+    ("07:00", "07:00", None, None),         # clock out = clock in: a 24-hour shift
+    ("00:00", "23:59", "", ""),             # midnight to midnight
+    ("23:59", "00:00", None, "12:00"),      # one-minute overnight shift, half a lunch
+    ("06:00", "14:30", "12:00", None),      # lunch start only: no deduction
+    ("21:00", "05:00", None, None),         # graveyard / swing tie-break territory
+    ("14:00", "22:00", None, None),
+    ("05:00", "13:00", None, None),
+    ("07:01", "15:32", "11:29", "12:03"),   # minutes that are not multiples of 3 (rounding to cents)
+    (None, "15:30", "11:30", "12:00"),      # missing punches
+    ("07:00", None, None, None),
+    ("", "", "", ""),
+    (None, None, None, None),
+    ("ab:cd", "15:30", None, None),
+    ("07:00", "25:00", None, None),
+]
+# Times with seconds, including totals that land on half a hundredth of an hour (18 seconds past a multiple of 36).
+SECONDS_CASES = [
+    ("07:00:00", "15:30:30", "11:30:00", "12:00:00"),   # 8h 0m 30s: 8.008 hours
+    ("07:00:59", "15:30:00", "11:30:10", "12:00:45"),   # 7h 58m 26s
+    ("03:00:30", "10:00:00", None, None),               # 2h 59m 30s graveyard, 3h day (a tie without the seconds)
+    ("07:00:00", "07:00:18", None, None),               # 18 seconds: 0.005 hours
+    ("07:00:00", "07:00:54", None, None),               # 54 seconds: 0.015 hours
+    ("06:59:42", "15:00:00", "12:00:00", "12:00:00"),   # 8h 0m 18s, and a zero-length lunch (it wraps: 24 hours)
+    ("22:00:30", "06:00:15", None, None),
+    ("21:00:30", "05:00:30", "01:00:01", "01:30:19"),
+    ("08:20:30", "11:40:30", None, None),
+    ("23:59:59", "00:00:00", None, None),
+    ("00:00:01", "00:00:00", None, None),
+    ("12:00:00", "12:00:00", "12:00:09", "12:00:27"),   # 24 hours less 18 seconds of lunch
+]
+
+
+def _random_time(rnd, seconds=False):
+    if rnd.random() < 0.1:
+        return rnd.choice(EMPTY)
+    if seconds:
+        return f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}"
+    return f"{rnd.randrange(24):02d}:{rnd.randrange(60):02d}"
+
+
+def _week_start(d):
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def _random_rows(n, seed=5, seconds=False):
+    rnd = random.Random(seed)
+    return [tuple(_random_time(rnd, seconds) for _ in range(4)) for _ in range(n)]
+
+
+def _compute_days(rows):
+    return batch.compute_days(*(batch.to_minutes([row[i] for row in rows]) for i in range(4)))
+
+
+@pytest.fixture(params=[8.0, 7.5, 10.0, 12.25], ids=lambda cap: f"cap={cap}")
+def daily_cap(request, monkeypatch):
+    monkeypatch.setattr(config, "REGULAR_HOURS_PER_DAY", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("rows", [EDGE_CASES, SECONDS_CASES, _random_rows(5000), _random_rows(5000, seconds=True)],
+                         ids=["edge_cases", "seconds", "random", "random_seconds"])
+def test_days_match_reference(daily_cap, rows):
+    computed = _compute_days(rows)
+    for i, (clock_in, clock_out, lunch_start, lunch_end) in enumerate(rows):
+        expected = logic.compute_weekly_overtime([{
+            "work_date": "2026-10-12", "clock_in": clock_in, "clock_out": clock_out,
+            "lunch_start": lunch_start, "lunch_end": lunch_end, "notes": "", "regular_hours": 0, "overtime_hours": 0,
+        }])[0]
+        got = {key: computed[key][i] for key in ("total_hours", "regular_hours", "overtime_hours", "shift")}
+        want = {
+            "total_hours": logic.day_hours(clock_in, clock_out, lunch_start, lunch_end)[0],
+            "regular_hours": expected["regular_hours"],
+            "overtime_hours": expected["overtime_hours"],
+            "shift": logic.classify_shift(clock_in, clock_out),
+        }
+        assert got == want, rows[i]
+        assert want["shift"] == expected["shift"]
+
+
+def test_seconds_are_kept():
+    assert batch.to_minutes(["07:00:30", "07:00", "23:59:59", "", None, "07:00:61"]).tolist() == [420.5, 420, 1439 + 59 / 60, -1, -1, -1]
+    computed = _compute_days(SECONDS_CASES)
+    for i, row in enumerate(SECONDS_CASES):
+        assert computed["total_hours"][i] == logic.day_hours(*row)[0], row
+        assert computed["shift"][i] == logic.classify_shift(row[0], row[1]), row
+    # The same rows cut to whole minutes come out differently: the seconds are not dropped.
+    whole_minutes = _compute_days([tuple(t[:5] if t else t for t in row) for row in SECONDS_CASES])
+    assert list(computed["total_hours"][:2]) == [8.01, 7.97] and list(whole_minutes["total_hours"][:2]) == [8.0, 8.0]
+    assert (computed["shift"][2], whole_minutes["shift"][2]) == ("day", "graveyard")
+
+
+def test_weekly_totals_match_reference(daily_cap):
+    rnd = random.Random(11)
+    monday = date(2026, 10, 5)
+    rows = []  # (employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end)
+    for employee_id in range(1, 41):
+        long_days = employee_id % 3 == 0  # six 11-hour days: over 40 regular hours and daily overtime
+        for d in range(21):
+            if not long_days and rnd.random() < 0.3:
+                continue
+            if long_days and d % 7 == 6:
+                continue
+            if long_days:
+                clock_in, clock_out, lunch_start, lunch_end = "06:00", "17:30", "11:00", "11:30"
+            else:
+                clock_in, clock_out, lunch_start, lunch_end = (_random_time(rnd) for _ in range(4))
+            rows.append((employee_id, monday + timedelta(days=d), clock_in, clock_out, lunch_start, lunch_end))
+    computed = _compute_days([row[2:] for row in rows])
+    totals = batch.weekly_totals(
+        [row[0] for row in rows], [row[1].isoformat() for row in rows], computed["regular_hours"], computed["overtime_hours"],
+    )
+    got = {
+        (int(totals["employee_id"][i]), str(totals["week_start"][i])): {
+            key: float(totals[key][i]) for key in ("regular_hours", "overtime_hours", "attendance", "total_hours")
+        }
+        for i in range(len(totals["employee_id"]))
+    }
+
+    weeks = {}
+    for employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end in rows:
+        weeks.setdefault((employee_id, _week_start(work_date)), []).append({
+            "work_date": work_date.isoformat(), "clock_in": clock_in, "clock_out": clock_out, "lunch_start": lunch_start,
+            "lunch_end": lunch_end, "notes": "", "regular_hours": 0, "overtime_hours": 0,
+        })
+    want = {}
+    for key, entries in weeks.items():
+        days = logic.compute_weekly_overtime(entries)
+        regular = round(sum(d["regular_hours"] for d in days), 2)
+        overtime = round(sum(d["overtime_hours"] for d in days), 2)
+        attendance = min(regular, 40)
+        want[key] = {"regular_hours": regular, "overtime_hours": overtime, "attendance": attendance,
+                     "total_hours": round(attendance + overtime, 2)}
+
+    assert got == want
+    assert any(w["regular_hours"] > 40 for w in want.values())
+    assert any(w["overtime_hours"] > 0 for w in want.values())
@@ -0,0 +1,174 @@
+"""Badge imports: punch pairing, the per-day layout, the reject report, XLSX cells and the week totals left behind."""
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+
+import openpyxl
+import pytest
+
+import database as db
+import timesheet_import as imp
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+
+
+@pytest.fixture
+def workers(database):
+    with db._conn() as conn:
+        return {badge: db.create_employee(conn, f"worker{badge}", PASSWORD_HASH, f"Worker {badge}", badge_id=badge)
+                for badge in ("1001", "1002")}
+
+
+def _csv(rows):
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return io.BytesIO(out.getvalue().encode("utf-8"))
+
+
+def _punches(*stamps):
+    """Sorted [(datetime, row number)] from 'YYYY-MM-DD HH:MM' strings, numbered from row 2 like a file after its header."""
+    return [(datetime.fromisoformat(s), row_no) for row_no, s in enumerate(stamps, 2)]
+
+
+def _entry(employee_id, work_date):
+    entries = [e for e in db.get_entries_for_week(employee_id, work_date) if e["work_date"] == work_date.isoformat()]
+    return entries[0] if entries else None
+
+
+def _reasons(result):
+    return {r["row"]: r["reason"] for r in result["rejects"]}
+
+
+@pytest.mark.parametrize("stamps, expected", [
+    (("2026-10-12 22:00", "2026-10-13 06:30"), [("2, 3", date(2026, 10, 12), ("22:00", "06:30", None, None))]),
+    (("2026-10-12 07:00", "2026-10-12 11:30", "2026-10-12 12:00", "2026-10-12 15:30"),
+     [("2, 3, 4, 5", MONDAY, ("07:00", "15:30", "11:30", "12:00"))]),
+    (("2026-10-12 07:00",), [("2", MONDAY, "Single punch (missing clock in or clock out)")]),
+    (("2026-10-12 07:00", "2026-10-12 11:30", "2026-10-12 12:00"),
+     [("2, 3, 4", MONDAY, "Odd number of punches (3) in one shift")]),
+    (tuple(f"2026-10-12 {h:02d}:00" for h in range(7, 13)), [("2, 3, 4, 5, 6, 7", MONDAY, "More than 4 punches (6) in one shift")]),
+    (("2026-10-12 06:00", "2026-10-12 10:00", "2026-10-12 18:00", "2026-10-12 22:00"),
+     [("2, 3", MONDAY, ("06:00", "10:00", None, None)), ("4, 5", MONDAY, ("18:00", "22:00", None, None))]),
+    (("2026-10-12 07:00", "2026-10-12 07:00", "2026-10-12 15:30"),
+     [("3", MONDAY, "Duplicate punch (same time as row 2)"), ("2, 4", MONDAY, ("07:00", "15:30", None, None))]),
+], ids=["overnight", "lunch", "single", "odd", "more_than_4", "two_shifts", "duplicate"])
+def test_pair_punches(stamps, expected):
+    got = [(", ".join(map(str, rows)), work_date, result) for rows, work_date, result in imp._pair_punches(_punches(*stamps))]
+    assert got == expected
+
+
+def test_punch_file(workers):
+    result = imp.import_file(_csv([
+        ["Badge", "Timestamp"],
+        ["1001", "2026-10-12 22:00"], ["1001", "2026-10-13 06:30"],                # overnight
+        ["1002", "2026-10-12 07:00"], ["1002", "2026-10-12 07:00"],                # double swipe
+        ["1002", "2026-10-12 11:30"], ["1002", "2026-10-12 12:00"], ["1002", "2026-10-12 15:30"],
+        ["1002", "2026-10-12 20:00"], ["1002", "2026-10-12 23:00"],                # second shift the same day
+        ["1002", "2026-10-14 07:00"],                                              # single punch
+        ["9999", "2026-10-12 07:00"],                                              # unknown badge
+        ["1001", "not a time"],
+    ]), "punches.csv")
+    assert (result["layout"], result["rows"], result["imported"]) == ("punches", 12, 2)
+    assert _reasons(result) == {
+        "5": "Duplicate punch (same time as row 4)",
+        "9, 10": "Second shift on the same day (one time entry per day)",
+        "11": "Single punch (missing clock in or clock out)",
+        "12": "Unknown badge / employee",
+        "13": "Invalid punch date/time",
+    }
+    # Every data row is either in an imported day (rows 2-3 and 4, 6-8) or in the reject report.
+    rejected_rows = sum(len(r["row"].split(", ")) for r in result["rejects"])
+    assert rejected_rows + 2 + 4 == result["rows"]
+    overnight = _entry(workers["1001"], MONDAY)
+    assert (overnight["clock_in"], overnight["clock_out"], overnight["shift"]) == ("22:00", "06:30", "graveyard")
+    assert overnight["regular_hours"] == logic.day_hours("22:00", "06:30", None, None)[0]
+    day = _entry(workers["1002"], MONDAY)
+    assert (day["clock_in"], day["clock_out"], day["lunch_start"], day["lunch_end"]) == ("07:00", "15:30", "11:30", "12:00")
+    assert day["regular_hours"] == 8.0
+
+
+def test_day_file(workers):
+    result = imp.import_file(_csv([
+        ["Employee ID", "Work Date", "Clock In", "Clock Out", "Lunch Start", "Lunch End"],
+        ["1001", "10/12/2026", "7:00 AM", "3:30 PM", "11:30 AM", "12:00 PM"],
+        ["1001", "2026-10-13", "07:00", "17:00", "", ""],
+        ["1001", "2026-10-13", "08:00", "16:00", "", ""],     # duplicate day
+        ["1002", "2026-10-12", "07:00", "", "", ""],          # no clock out
+        ["1002", "12/99/2026", "07:00", "15:00", "", ""],     # invalid date
+        ["4242", "2026-10-12", "07:00", "15:00", "", ""],     # unknown badge
+        ["", "2026-10-12", "07:00", "15:00", "", ""],         # no badge at all
+        ["", "", "", "", "", ""],                             # blank line: not a data row
+    ]), "days.csv")
+    assert (result["layout"], result["rows"], result["imported"]) == ("days", 7, 2)
+    assert _reasons(result) == {
+        "4": "Duplicate day (already imported from row 3)",
+        "5": "Missing or invalid clock in / clock out",
+        "6": "Invalid date",
+        "7": "Unknown badge / employee",
+        "8": "No badge or employee given",
+    }
+    entries = db.get_entries_for_week(workers["1001"], MONDAY)
+    assert [(e["work_date"], e["clock_in"], e["clock_out"], e["regular_hours"]) for e in entries] == [
+        ("2026-10-12", "07:00", "15:30", 8.0), ("2026-10-13", "07:00", "17:00", 10.0),
+    ]
+    report = list(csv.reader(io.StringIO(imp.reject_report_csv(result["rejects"]))))
+    assert report[0] == imp.REJECT_REPORT_HEADERS
+    assert report[1] == ["4", "1001", "2026-10-13", "Duplicate day (already imported from row 3)"]
+    assert len(report) == 1 + len(result["rejects"])
+
+
+def test_import_without_employee_column_is_refused(workers):
+    with pytest.raises(ValueError, match="No badge"):
+        imp.import_file(_csv([["Date", "Clock In", "Clock Out"], ["2026-10-12", "07:00", "15:00"]]), "days.csv")
+
+
+def test_xlsx_day_fractions_and_time_cells(workers):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Badge", "Date", "Clock In", "Clock Out", "Lunch Start", "Lunch End"])
+    ws.append([1001, datetime(2026, 10, 12), 0.25, 0.6875, 0.5, 0.5208333333])   # 06:00, 16:30, 12:00, 12:30 as day fractions
+    ws.append([1001, date(2026, 10, 13), time(22, 0), time(6, 30, 40), None, None])
+    ws.append([1002, "2026-10-12", 0.9999999, 0.3333333, None, None])             # 24:00 rounds to 00:00
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    result = imp.import_file(buf, "badges.xlsx")
+    assert (result["layout"], result["imported"], result["rejects"]) == ("days", 3, [])
+    first = _entry(workers["1001"], MONDAY)
+    assert (first["clock_in"], first["clock_out"], first["lunch_start"], first["lunch_end"]) == ("06:00", "16:30", "12:00", "12:30")
+    assert first["regular_hours"] == 10.0
+    second = _entry(workers["1001"], MONDAY + timedelta(days=1))
+    assert (second["clock_in"], second["clock_out"], second["shift"]) == ("22:00", "06:30", "graveyard")
+    third = _entry(workers["1002"], MONDAY)
+    assert (third["clock_in"], third["clock_out"]) == ("00:00", "08:00")
+
+
+@pytest.mark.parametrize("value, expected", [
+    (0.0, "00:00"), (0.5, "12:00"), (0.75, "18:00"), (0.0104166667, "00:15"), (time(7, 5, 59), "07:05"),
+    (datetime(2026, 10, 12, 23, 59), "23:59"), ("7:05 pm", "19:05"), ("0705", "07:05"), ("07:05:30", "07:05"),
+    (1.5, None), ("", None), (None, None), ("later", None),
+])
+def test_parse_time(value, expected):
+    assert imp._parse_time(value) == expected
+
+
+def test_week_totals_consistent_after_import(workers):
+    rows = [["Badge", "Date", "Clock In", "Clock Out"]]
+    for badge in workers:
+        for d in range(15):  # two weeks and a day, with overtime days
+            rows.append([badge, (MONDAY + timedelta(days=d)).isoformat(), "06:00", "17:30" if d % 2 else "15:00"])
+    imp.import_file(_csv(rows), "days.csv")
+    db.import_time_entries([(workers["1001"], MONDAY, "08:00", "12:00", None, None, 4.0, 0.0, 0, "day", None)], batch_size=1)
+    weeks = (MONDAY, MONDAY + timedelta(days=7), MONDAY + timedelta(days=14))
+    imported = _totals(weeks)
+    assert imported[MONDAY][workers["1001"]]["overtime_hours"] > 0
+    assert set(imported[MONDAY + timedelta(days=14)]) == set(workers.values())
+    db.rebuild_week_totals()
+    assert _totals(weeks) == imported
+
+
+def _totals(weeks):
+    return {week: {employee_id: {k: v for k, v in row.items() if k != "updated_at"} for employee_id, row in db.get_week_totals(week).items()}
+            for week in weeks}
@@ -0,0 +1,106 @@
+"""Week ETags: 304 for an unchanged week, and a new tag after a save, a time-off change or a deploy."""
+from datetime import date, timedelta
+
+import pytest
+
+import database as db
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+URLS = (f"/api/timesheet/week?week={MONDAY}", f"/timesheet?week={MONDAY}")
+ADMIN_URLS = (f"/api/roster/week?week={MONDAY}", f"/api/roster/week?week={MONDAY}&shift=day", f"/timesheet?week={MONDAY}&shift=day")
+
+
+@pytest.fixture
+def worker(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+        db.upsert_time_entry(conn, employee_id, MONDAY, clock_in="07:00", clock_out="15:30", lunch_start="11:30",
+                             lunch_end="12:00", notes="", regular_hours=8, shift="day")
+    return db.get_employee_by_id(employee_id)
+
+
+@pytest.fixture
+def worker_client(app, worker):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = worker["id"]
+        session["full_name"] = worker["full_name"]
+        session["is_admin"] = False
+    return client
+
+
+def _etags(client, urls):
+    tags = {}
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.headers["Cache-Control"] == "private, no-cache"
+        tags[url] = response.headers["ETag"]
+    return tags
+
+
+def _assert_not_modified(client, tags):
+    for url, etag in tags.items():
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert (response.status_code, response.data) == (304, b""), url
+        assert response.headers["ETag"] == etag
+
+
+def _assert_all_changed(before, after):
+    assert all(before[url] != after[url] for url in before), (before, after)
+
+
+@pytest.mark.parametrize("client_name, urls", [("worker_client", URLS), ("admin_client", ADMIN_URLS)])
+def test_unchanged_week_is_not_modified(request, worker, client_name, urls):
+    client = request.getfixturevalue(client_name)
+    tags = _etags(client, urls)
+    _assert_not_modified(client, tags)
+    assert client.get(urls[0], headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_save_changes_the_etag(worker_client, admin_client, worker):
+    tags, admin_tags = _etags(worker_client, URLS), _etags(admin_client, ADMIN_URLS)
+    response = worker_client.post("/timesheet/save", json={"work_date": (MONDAY + timedelta(days=1)).isoformat(),
+                                                           "clock_in": "07:00", "clock_out": "16:00"})
+    assert response.get_json()["ok"]
+    _assert_all_changed(tags, _etags(worker_client, URLS))
+    _assert_all_changed(admin_tags, _etags(admin_client, ADMIN_URLS))
+    # The new body is served, and is then itself not modified.
+    body = worker_client.get(URLS[0], headers={"If-None-Match": tags[URLS[0]]}).get_json()
+    assert [d["work_date"] for d in body["days"] if d["clock_in"]] == [MONDAY.isoformat(), (MONDAY + timedelta(days=1)).isoformat()]
+    _assert_not_modified(worker_client, _etags(worker_client, URLS))
+
+
+def test_timeoff_changes_the_etag(worker_client, admin_client, worker):
+    tags, admin_tags = _etags(worker_client, URLS), _etags(admin_client, ADMIN_URLS)
+    request_id = db.create_timeoff_request(worker["id"], MONDAY + timedelta(days=3), MONDAY + timedelta(days=3), "PTO")
+    created, admin_created = _etags(worker_client, URLS), _etags(admin_client, ADMIN_URLS)
+    _assert_all_changed(tags, created)
+    _assert_all_changed(admin_tags, admin_created)
+    db.set_timeoff_request_status(request_id, "rejected")
+    _assert_all_changed(created, _etags(worker_client, URLS))
+    _assert_all_changed(admin_created, _etags(admin_client, ADMIN_URLS))
+
+
+def test_new_build_changes_the_etag(worker_client, worker, monkeypatch):
+    import app as appmod
+
+    tags = _etags(worker_client, URLS)
+    monkeypatch.setattr(appmod, "BUILD_TOKEN", appmod.BUILD_TOKEN + "-next")
+    after = _etags(worker_client, URLS)
+    _assert_all_changed(tags, after)
+    assert worker_client.get(URLS[0], headers={"If-None-Match": tags[URLS[0]]}).status_code == 200
+
+
+def test_build_token_follows_the_templates(tmp_path, monkeypatch):
+    import app as appmod
+
+    assert appmod._build_token() == appmod.BUILD_TOKEN
+    template = tmp_path / "templates" / "page.html"
+    template.parent.mkdir()
+    template.write_text("v1")
+    monkeypatch.setattr(appmod, "__file__", str(tmp_path / "app.py"))
+    first = appmod._build_token()
+    template.write_text("version 2")
+    assert appmod._build_token() != first
@@ -0,0 +1,159 @@
+"""employee_week_totals: lookups by any day of the week, rebuilds after REGULAR_HOURS_PER_DAY changes, and the SQL hours
+views agreeing with timesheet_logic."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import config
+import database as db
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+
+
+def _seed_week():
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker", shift="day")
+        for d in range(6):
+            db.upsert_time_entry(
+                conn, employee_id, MONDAY + timedelta(days=d), clock_in="07:00", clock_out="16:00",
+                lunch_start="12:00", lunch_end="12:30", notes="", regular_hours=8.5, shift="day",
+            )
+    return employee_id
+
+
+def _user_version():
+    with db._conn() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _restart(monkeypatch, **settings):
+    """Run init_db as a process started with these config settings would."""
+    for name, value in settings.items():
+        monkeypatch.setattr(config, name, value)
+    db.close_pool()
+    db.init_db()
+
+
+@pytest.fixture
+def long_days(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker")
+        for d in range(6):  # six 9.5-hour days
+            db.upsert_time_entry(conn, employee_id, MONDAY + timedelta(days=d), clock_in="06:30", clock_out="16:30",
+                                 lunch_start="12:00", lunch_end="12:30", notes="", shift="day")
+    return employee_id
+
+
+def _totals(employee_id):
+    totals = db.get_week_totals(MONDAY)[employee_id]
+    return totals["regular_hours"], totals["overtime_hours"], totals["attendance"], totals["total_hours"]
+
+
+def test_week_totals_for_any_day_of_the_week(database):
+    employee_id = _seed_week()
+    expected = db.get_week_totals(MONDAY)
+    assert expected[employee_id]["week_start"] == MONDAY.isoformat()
+    assert expected[employee_id]["attendance"] == 40
+    for d in range(7):
+        day = MONDAY + timedelta(days=d)
+        assert db.get_week_totals(day) == expected, day
+        assert db.get_week_totals(day.isoformat()) == expected, day
+
+
+def test_range_totals_for_mid_week_bounds(database):
+    employee_id = _seed_week()
+    tuesday, next_sunday = MONDAY + timedelta(days=1), MONDAY + timedelta(days=13)
+    assert db.get_week_totals_for_range(tuesday, next_sunday) == db.get_week_totals_for_range(MONDAY, MONDAY + timedelta(days=7))
+    assert set(db.get_week_totals_for_range(tuesday, next_sunday)) == {(employee_id, MONDAY.isoformat())}
+    assert db.get_period_totals(tuesday, tuesday) == db.get_period_totals(MONDAY, MONDAY)
+    assert db.get_period_totals(tuesday, tuesday)[employee_id]["attendance"] == 40
+
+
+def test_cap_change_rebuilds_week_totals(monkeypatch, long_days):
+    _restart(monkeypatch, REGULAR_HOURS_PER_DAY=8.0)
+    assert _totals(long_days) == (48.0, 9.0, 40.0, 49.0)
+    _restart(monkeypatch, REGULAR_HOURS_PER_DAY=9.25)
+    assert _totals(long_days) == (55.5, 1.5, 40.0, 41.5)
+    assert _user_version() == db.SCHEMA_VERSION * 10000 + 925
+    # The rebuilt totals match what saving every entry again would give.
+    with db._conn() as conn:
+        for d in range(6):
+            db.upsert_time_entry(conn, long_days, MONDAY + timedelta(days=d), clock_in="06:30", clock_out="16:30",
+                                 lunch_start="12:00", lunch_end="12:30", notes="", shift="day")
+    assert _totals(long_days) == (55.5, 1.5, 40.0, 41.5)
+
+
+def test_unchanged_cap_skips_rebuild(monkeypatch, long_days):
+    rebuilds = []
+    monkeypatch.setattr(db, "_rebuild_week_totals", rebuilds.append)
+    _restart(monkeypatch)
+    assert rebuilds == []
+
+
+def _reference_week_totals(entries):
+    """Weekly totals for one employee week computed in Python from compute_weekly_overtime, as before the SQL views."""
+    computed = logic.compute_weekly_overtime(entries)
+    total_reg = sum(c["regular_hours"] for c in computed)
+    total_ot = sum(c["overtime_hours"] for c in computed)
+    worked = [c for c in computed if c.get("notes") not in db.TIME_OFF_NOTES]
+    return {
+        "regular_hours": total_reg,
+        "overtime_hours": total_ot,
+        "attendance": min(total_reg, 40),
+        "total_hours": min(total_reg, 40) + total_ot,
+        "worked_regular_hours": sum(c["regular_hours"] for c in worked),
+        "worked_overtime_hours": sum(c["overtime_hours"] for c in worked),
+    }
+
+
+def _random_entry(rnd):
+    """upsert_time_entry keywords: day, swing and overnight punches, lunches across midnight, time off, stored hours."""
+    def hhmm(minute):
+        return f"{minute // 60 % 24:02d}:{minute % 60:02d}"
+
+    kind = rnd.random()
+    notes = rnd.choice(["", "", "", "Non Pay", " Non Pay ", "PTO", "Sick leave", "late"])
+    if kind < 0.15:
+        # Time off or a manual entry: stored hours, no clock times.
+        return {"notes": notes, "regular_hours": rnd.choice([0, 4, 8, 9.5, 12.25])}
+    start = rnd.randrange(1440)
+    end = start + rnd.choice([0, rnd.randrange(1, 900), rnd.randrange(600, 1000)])  # 0: a full 24 hours
+    entry = {"clock_in": hhmm(start), "clock_out": hhmm(end), "notes": notes}
+    if rnd.random() < 0.7:
+        lunch = start + rnd.randrange(0, 720)
+        entry.update(lunch_start=hhmm(lunch), lunch_end=hhmm(lunch + rnd.choice([0, 30, 45, 60, 1000])))
+    if kind > 0.8:
+        # Saved by the app: the hours it computed are stored alongside the punches, and then win over them.
+        entry["clock_in"] += f":{rnd.randrange(60):02d}"
+        entry["regular_hours"], _ = logic.day_hours(entry["clock_in"], entry["clock_out"], entry.get("lunch_start"), entry.get("lunch_end"))
+        entry["overtime_hours"] = rnd.choice([0, 0, 1.5])
+    return entry
+
+
+@pytest.mark.parametrize("cap", [8.0, 9.25])
+def test_sql_hours_match_compute_weekly_overtime(monkeypatch, database, cap):
+    _restart(monkeypatch, REGULAR_HOURS_PER_DAY=cap)
+    rnd = random.Random(int(cap * 100))
+    with db._conn() as conn:
+        employees = [db.create_employee(conn, f"worker{i}", PASSWORD_HASH, f"Worker {i}") for i in range(12)]
+        for employee_id in employees:
+            for d in range(21):
+                if rnd.random() < 0.8:
+                    db.upsert_time_entry(conn, employee_id, MONDAY + timedelta(days=d), **_random_entry(rnd))
+        rows = conn.execute("SELECT id, regular_hours, overtime_hours FROM time_entry_hours").fetchall()
+    by_entry = {r["id"]: (r["regular_hours"], r["overtime_hours"]) for r in rows}
+    for week in (MONDAY, MONDAY + timedelta(days=7), MONDAY + timedelta(days=14)):
+        totals = db.get_week_totals(week)
+        for employee_id in employees:
+            entries = db.get_entries_for_week(employee_id, week)
+            computed = logic.compute_weekly_overtime(entries)
+            assert {c["id"]: (c["regular_hours"], c["overtime_hours"]) for c in computed} == \
+                {e["id"]: by_entry[e["id"]] for e in entries}
+            expected = _reference_week_totals(entries)
+            actual = {k: totals[employee_id][k] for k in expected}
+            assert actual == pytest.approx(expected, abs=1e-9), (employee_id, week)
+    assert len(by_entry) > 150
+    assert any(overtime for _, overtime in by_entry.values())
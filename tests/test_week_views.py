@@ -0,0 +1,78 @@
+"""Timesheet pages and week exports for any date in a week show that whole week (Monday–Sunday)."""
+import io
+from datetime import date, timedelta
+
+import openpyxl
+import pytest
+
+import database as db
+import timesheet_logic as logic
+from conftest import PASSWORD_HASH
+
+MONDAY = date(2026, 10, 12)
+TUESDAY = MONDAY + timedelta(days=1)
+SUNDAY = MONDAY + timedelta(days=6)
+
+
+@pytest.fixture
+def worker(database):
+    with db._conn() as conn:
+        employee_id = db.create_employee(conn, "worker", PASSWORD_HASH, "Worker One", shift="day")
+        for d in range(5):
+            hours, _ = logic.day_hours("07:00", "16:15", "12:00", "12:30")
+            db.upsert_time_entry(
+                conn, employee_id, MONDAY + timedelta(days=d), clock_in="07:00", clock_out="16:15",
+                lunch_start="12:00", lunch_end="12:30", notes="", regular_hours=hours, shift="day",
+            )
+    return db.get_employee_by_id(employee_id)
+
+
+@pytest.fixture
+def worker_client(app, worker):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = worker["id"]
+        session["full_name"] = worker["full_name"]
+        session["is_admin"] = False
+    return client
+
+
+def _cells(response):
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.data))
+    return {ws.title: [[c.value for c in row] for row in ws.iter_rows()] for ws in workbook.worksheets}
+
+
+def _filename(response):
+    return response.headers["Content-Disposition"].split("filename=")[1]
+
+
+@pytest.mark.parametrize("day", [TUESDAY, SUNDAY])
+def test_timesheet_page_for_mid_week_date(worker_client, admin_client, worker, day):
+    for client, query in ((worker_client, ""), (admin_client, f"&employee_id={worker['id']}"), (admin_client, "&shift=day")):
+        monday_page = client.get(f"/timesheet?week={MONDAY}{query}")
+        page = client.get(f"/timesheet?week={day}{query}")
+        assert page.status_code == monday_page.status_code == 200
+        assert page.data == monday_page.data
+        assert b"43.75" in page.data  # the week's total hours
+
+
+@pytest.mark.parametrize("day", [TUESDAY, SUNDAY])
+def test_week_export_for_mid_week_date(worker_client, admin_client, worker, day):
+    for client, query in ((admin_client, ""), (admin_client, "?shift=combined"), (worker_client, "")):
+        monday_export = client.get(f"/export/week/{MONDAY}{query}")
+        export = client.get(f"/export/week/{day}{query}")
+        assert _filename(export) == _filename(monday_export)
+        assert MONDAY.isoformat() in _filename(export)
+        cells = _cells(export)
+        assert cells == _cells(monday_export)
+        assert any(43.75 in row for rows in cells.values() for row in rows)  # the week's total hours
+
+
+def test_week_entry_lookups_for_mid_week_date(worker):
+    entries = db.get_entries_for_week(worker["id"], MONDAY)
+    assert len(entries) == 5
+    assert db.get_entries_for_week(worker["id"], TUESDAY) == entries
+    assert db.get_entries_for_week(worker["id"], SUNDAY.isoformat()) == entries
+    assert db.get_entries_for_week_by_employee(TUESDAY) == {worker["id"]: entries}
+    assert [e["work_date"] for e in db.get_all_entries_for_week(SUNDAY)] == [e["work_date"] for e in entries]
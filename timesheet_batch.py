@@ -0,0 +1,135 @@
+"""
+Vectorized (NumPy) hours, overtime and shift for many time entries at once.
+Same rules as timesheet_logic.day_hours, classify_shift and compute_weekly_overtime, applied to
+columnar minute-of-day arrays in one pass instead of per-row Python calls. Used for bulk work
+(payroll across the plant, imports); the per-row functions remain the reference implementation.
+Times are float minutes since midnight with seconds as fractions of a minute (as timesheet_logic.time_to_minutes),
+and every step uses the same float operations as the per-row code, so results match it exactly, seconds included.
+MISSING (-1) marks an empty clock/lunch time.
+"""
+import numpy as np
+
+import config
+import timesheet_logic as logic
+
+MISSING = -1
+MINUTES_PER_DAY = logic.MINUTES_PER_DAY
+
+
+def to_minutes(values):
+    """Convert 'HH:MM' or 'HH:MM:SS' strings (None/'' allowed) to a float minute-of-day array; MISSING where empty or invalid."""
+    out = np.full(len(values), MISSING, dtype=np.float64)
+    for i, v in enumerate(values):
+        t = logic.parse_time(v) if v else None
+        if t:
+            out[i] = logic.time_to_minutes(t)
+    return out
+
+
+def _as_minutes(values, n):
+    if values is None:
+        return np.full(n, MISSING, dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _window_tables(classifier):
+    """NumPy copies of the classifier's 48-hour prefix sums and per-minute inside flags (windows x minutes), cached on it."""
+    tables = getattr(classifier, "_numpy_tables", None)
+    if tables is None:
+        prefix = np.asarray(classifier.prefix, dtype=np.int64)
+        tables = classifier._numpy_tables = (prefix, np.diff(prefix, axis=1))
+    return tables
+
+
+def _minutes_before(tables, t):
+    # ShiftClassifier._minutes_before for every row: whole minutes from the prefix sums plus the part-minute, if inside.
+    prefix, inside = tables
+    whole = t.astype(np.int64)
+    return prefix[:, whole] + (t - whole) * inside[:, whole]
+
+
+def classify_shifts(in_min, out_min, classifier=None):
+    """Shift name per row (object array; None without clock in/out) using the shared ShiftClassifier's prefix sums."""
+    classifier = classifier or logic.get_shift_classifier()
+    in_min = np.asarray(in_min, dtype=np.float64)
+    out_min = np.asarray(out_min, dtype=np.float64)
+    has_clock = (in_min >= 0) & (out_min >= 0)
+    start = np.where(has_clock, in_min, 0)
+    end = np.where(has_clock, np.where(out_min <= in_min, out_min + MINUTES_PER_DAY, out_min), 0)
+    tables = _window_tables(classifier)
+    minutes = _minutes_before(tables, end) - _minutes_before(tables, start)
+    # argmax returns the first maximum, which is the classifier's tie-break order.
+    names = np.array(classifier.names + [None], dtype=object)
+    return names[np.where(has_clock, np.argmax(minutes, axis=0), len(classifier.names))]
+
+
+def worked_minutes(in_min, out_min, lunch_start=None, lunch_end=None):
+    """Worked minutes per row: (out - in) minus lunch, overnight-aware like timesheet_logic.day_hours. 0 without clock in/out."""
+    in_min = np.asarray(in_min, dtype=np.float64)
+    out_min = np.asarray(out_min, dtype=np.float64)
+    n = len(in_min)
+    ls = _as_minutes(lunch_start, n)
+    le = _as_minutes(lunch_end, n)
+    has_clock = (in_min >= 0) & (out_min >= 0)
+    total = np.where(out_min <= in_min, out_min + MINUTES_PER_DAY, out_min) - in_min
+    has_lunch = (ls >= 0) & (le >= 0)
+    lunch = np.where(le <= ls, le + MINUTES_PER_DAY, le) - ls
+    total = np.where(has_lunch, np.maximum(0, total - lunch), total)
+    return np.where(has_clock, total, 0)
+
+
+def _minutes_to_cents(minutes):
+    """round(minutes / 60, 2) (timesheet_logic.minutes_to_hours) in hundredths of an hour, for float minutes."""
+    # In whole seconds s the result is s / 36 rounded, exact unless s / 36 ends in .5 (s % 36 == 18, never for whole
+    # minutes). Those rows are rounded as the per-row code rounds its float, which may fall either side of the half.
+    minutes = np.asarray(minutes, dtype=np.float64)
+    seconds = np.rint(minutes * 60).astype(np.int64)
+    cents = (2 * seconds + 36) // 72
+    halves = np.flatnonzero(seconds % 36 == 18)
+    if len(halves):
+        cents[halves] = [round(logic.minutes_to_hours(m) * 100) for m in minutes[halves].tolist()]
+    return cents
+
+
+def compute_days(clock_in, clock_out, lunch_start=None, lunch_end=None):
+    """
+    Day hours, daily overtime and shift for every row in one vectorized pass.
+    clock_in, clock_out, lunch_start, lunch_end: minute-of-day arrays (MISSING = empty); see to_minutes.
+    Returns dict of arrays: total_hours, regular_hours, overtime_hours (floats, 2 decimals), shift (object: day/swing/graveyard/None).
+    Matches compute_weekly_overtime for entries whose hours come from clock times.
+    """
+    in_min = np.asarray(clock_in, dtype=np.float64)
+    out_min = np.asarray(clock_out, dtype=np.float64)
+    cents = _minutes_to_cents(worked_minutes(in_min, out_min, lunch_start, lunch_end))
+    cap_cents = int(round(config.REGULAR_HOURS_PER_DAY * 100))
+    return {
+        "total_hours": cents / 100,
+        "regular_hours": np.minimum(cents, cap_cents) / 100,
+        "overtime_hours": np.maximum(0, cents - cap_cents) / 100,
+        "shift": classify_shifts(in_min, out_min),
+    }
+
+
+def weekly_totals(employee_ids, work_dates, regular_hours, overtime_hours):
+    """
+    Sum daily hours per (employee, Monday week_start).
+    work_dates: ISO date strings or datetime64[D]. Sums are taken in hundredths of an hour, so they are exact to the cent.
+    Returns dict of arrays: employee_id, week_start (datetime64[D]), regular_hours, overtime_hours, attendance (capped at 40), total_hours.
+    """
+    employee_ids = np.asarray(employee_ids, dtype=np.int64)
+    days = np.asarray(work_dates, dtype="datetime64[D]")
+    # 1970-01-01 was a Thursday: shift so Monday = 0.
+    week_start = days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+    key = employee_ids * 1_000_000 + week_start.astype(np.int64)
+    keys, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    reg_cents = np.bincount(inverse, weights=np.rint(np.asarray(regular_hours) * 100), minlength=len(keys)).astype(np.int64)
+    ot_cents = np.bincount(inverse, weights=np.rint(np.asarray(overtime_hours) * 100), minlength=len(keys)).astype(np.int64)
+    attendance_cents = np.minimum(reg_cents, 40 * 100)
+    return {
+        "employee_id": employee_ids[first],
+        "week_start": week_start[first],
+        "regular_hours": reg_cents / 100,
+        "overtime_hours": ot_cents / 100,
+        "attendance": attendance_cents / 100,
+        "total_hours": (attendance_cents + ot_cents) / 100,
+    }
@@ -0,0 +1,296 @@
+"""
+Streaming Excel (.xlsx) writers for the timesheet, time-off and employee exports.
+Sheets are openpyxl write-only sheets whose cells reference shared named styles, so rows are written
+out as they are produced instead of building a full cell object model. The finished workbook is spooled
+to a temporary file that the caller streams to the client in chunks.
+openpyxl is imported on first use, so importing this module (at app startup) stays cheap.
+"""
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+DAY_NAMES = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+SHIFT_ORDER = ("day", "swing", "graveyard", "unassigned")
+
+
+def _named_styles():
+    """Every cell style used by the exports. Names are workbook-local."""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+    from openpyxl.styles.fonts import DEFAULT_FONT
+
+    thin = Side(style="thin")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+    grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+    blue_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    orange_fill = PatternFill(start_color="ED7D31", end_color="ED7D31", fill_type="solid")
+    bold = Font(bold=True)
+    date_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    return [
+        NamedStyle("ts_title", font=Font(bold=True, color="FFFFFF"), fill=blue_fill, border=border, alignment=Alignment(horizontal="center")),
+        NamedStyle("ts_report_title", font=bold, fill=yellow_fill, border=border, alignment=Alignment(horizontal="center")),
+        # Cells covered by a one-row merge keep the range's outline: top/bottom, plus right on the last cell.
+        NamedStyle("ts_merged", font=DEFAULT_FONT, border=Border(top=thin, bottom=thin)),
+        NamedStyle("ts_merged_end", font=DEFAULT_FONT, border=Border(right=thin, top=thin, bottom=thin)),
+        NamedStyle("ts_cell", font=DEFAULT_FONT, border=border),
+        NamedStyle("ts_grey", font=DEFAULT_FONT, fill=grey_fill, border=border),
+        NamedStyle("ts_orange", font=DEFAULT_FONT, fill=orange_fill, border=border),
+        NamedStyle("ts_date", font=DEFAULT_FONT, fill=grey_fill, border=border, alignment=date_alignment),
+        NamedStyle("ts_date_saturday", font=DEFAULT_FONT, fill=orange_fill, border=border, alignment=date_alignment),
+        NamedStyle("ts_header", font=bold, fill=grey_fill, border=border),
+        NamedStyle("ts_header_orange", font=bold, fill=orange_fill, border=border),
+    ]
+
+
+def new_workbook():
+    """Write-only workbook with the export named styles registered."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    return wb
+
+
+def save_to_tempfile(wb):
+    """Save the workbook to a temporary file (rewound) for chunked streaming; the file is deleted when closed."""
+    out = tempfile.TemporaryFile()
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+class WorkbookCache:
+    """
+    LRU cache of finished workbook bytes, bounded by total size. Each key (e.g. week + shift mode) holds one entry
+    stamped with the data version it was built from; a lookup with any other version is a miss, and the next put replaces it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (version, bytes)
+        self._size = 0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def put(self, key, version, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (version, data)
+            self._size += len(data)
+            self._counters["stores"] += 1
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return counters: hits, misses, stores, evictions, entries, bytes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._size
+        return stats
+
+
+def _cell(ws, value=None, style="ts_cell"):
+    from openpyxl.cell import WriteOnlyCell
+
+    c = WriteOnlyCell(ws, value=value)
+    c.style = style
+    return c
+
+
+def _merged_row(ws, first, width):
+    """Cells for a one-row merge of `width` columns starting with `first` (already a cell)."""
+    if width == 1:
+        return [first]
+    return [first] + [_cell(ws, style="ts_merged") for _ in range(width - 2)] + [_cell(ws, style="ts_merged_end")]
+
+
+def _merge(ws, row, start_col, end_col):
+    from openpyxl.utils import get_column_letter
+
+    ws.merged_cells.add(f"{get_column_letter(start_col)}{row}:{get_column_letter(end_col)}{row}")
+
+
+# --- Weekly timesheet ---
+
+NUM_DAY_COLS = 7 * 3
+SUMMARY_COLS = 3
+DAY_COL_START = 4  # A=No., B=Test, C=Name; then 7*3 day cols; then summary
+TOTAL_COLS = 3 + NUM_DAY_COLS + SUMMARY_COLS
+
+
+def _write_timesheet_header(ws, title, dates_in_week):
+    """Rows 1–4: blue title, empty bordered row, date+day (Sat orange), No./Test/Name then Attendance/Overtime/Remark per day."""
+    summary_col_start = DAY_COL_START + NUM_DAY_COLS
+    _merge(ws, 1, 1, TOTAL_COLS)
+    ws.append(_merged_row(ws, _cell(ws, title, "ts_title"), TOTAL_COLS))
+    ws.append([_cell(ws) for _ in range(TOTAL_COLS)])
+    row3 = [_cell(ws, style="ts_grey") for _ in range(1, DAY_COL_START)]
+    for i, d in enumerate(dates_in_week):
+        col_start = DAY_COL_START + i * 3
+        _merge(ws, 3, col_start, col_start + 2)
+        style = "ts_date_saturday" if d.weekday() == 5 else "ts_date"
+        row3 += _merged_row(ws, _cell(ws, f"{d.month}/{d.day}\n{DAY_NAMES[d.weekday()]}", style), 3)
+    row3 += [_cell(ws, style="ts_grey") for _ in range(summary_col_start, TOTAL_COLS + 1)]
+    ws.append(row3)
+    row4_headers = ["No.", "Test", "Name"] + [h for _ in dates_in_week for h in ("Attendance", "Overtime", "Remark")] + ["Attendance", "Overtime", "Total"]
+    row4 = []
+    for col, h in enumerate(row4_headers, 1):
+        saturday = DAY_COL_START + 5 * 3 <= col < DAY_COL_START + 6 * 3
+        row4.append(_cell(ws, h, "ts_header_orange" if col in (1, 2) or saturday else "ts_header"))
+    ws.append(row4)
+
+
+def _employee_row(ws, idx, emp, dates_in_week):
+    row = [_cell(ws, idx, "ts_orange"), _cell(ws, "Test", "ts_orange"), _cell(ws, emp["full_name"])]
+    for d in dates_in_week:
+        day_data = emp.get("days", {}).get(d.isoformat(), {})
+        att = day_data.get("attendance", 0) or 0
+        ot = day_data.get("overtime", 0) or 0
+        rem = day_data.get("remark", "") or ""
+        att_val = round(att, 2) if att else ""
+        ot_val = round(ot, 2) if ot else ""
+        if rem and not att and not ot:
+            att_val = ""
+            ot_val = ""
+        row += [_cell(ws, att_val), _cell(ws, ot_val), _cell(ws, rem)]
+    row += [
+        _cell(ws, round(emp.get("attendance", 0), 2)),
+        _cell(ws, round(emp.get("overtime_total", 0), 2)),
+        _cell(ws, round(emp.get("total_hours", 0), 2)),
+    ]
+    return row
+
+
+def write_timesheet_sheet(wb, rows, sheet_title, shift_label, dates_in_week):
+    """One weekly timesheet sheet: header rows then one row per employee ({full_name, days, attendance, overtime_total, total_hours})."""
+    ws = wb.create_sheet(sheet_title)
+    _write_timesheet_header(ws, f"Time Sheet {shift_label}", dates_in_week)
+    for idx, emp in enumerate(rows, 1):
+        ws.append(_employee_row(ws, idx, emp, dates_in_week))
+    return ws
+
+
+def write_combined_sheet(wb, rows_per_shift, dates_in_week, sheet_title="Combined", title="Time Sheet Combined (All Shifts)"):
+    """One combined sheet with shifts separated by section rows; same per-day Attendance/Overtime/Remark layout."""
+    ws = wb.create_sheet(sheet_title)
+    _write_timesheet_header(ws, title, dates_in_week)
+    current_row = 5
+    for shift_key in SHIFT_ORDER:
+        rows = rows_per_shift.get(shift_key, [])
+        if not rows:
+            continue
+        _merge(ws, current_row, 1, TOTAL_COLS)
+        ws.append(_merged_row(ws, _cell(ws, f"{shift_key.capitalize()} shift", "ts_header"), TOTAL_COLS))
+        current_row += 1
+        for idx, emp in enumerate(rows, 1):
+            ws.append(_employee_row(ws, idx, emp, dates_in_week))
+            current_row += 1
+    return ws
+
+
+def write_period_summary_sheet(wb, rows_per_shift, week_starts, title):
+    """
+    One sheet of weekly totals for a multi-week period: No., Name, then Attendance/Overtime/Total per week and for the
+    whole period. rows_per_shift: {shift: [{full_name, weeks: {week_iso: (attendance, overtime, total)}, attendance,
+    overtime_total, total_hours}]}; shifts are separated by section rows like the combined sheet.
+    """
+    ws = wb.create_sheet("Summary")
+    width = 2 + 3 * (len(week_starts) + 1)
+    _merge(ws, 1, 1, width)
+    ws.append(_merged_row(ws, _cell(ws, title, "ts_title"), width))
+    row2 = [_cell(ws, style="ts_grey"), _cell(ws, style="ts_grey")]
+    for i, ws_date in enumerate(list(week_starts) + [None]):
+        col_start = 3 + i * 3
+        _merge(ws, 2, col_start, col_start + 2)
+        if ws_date is None:
+            label = "Period total"
+        else:
+            we = ws_date + timedelta(days=6)
+            label = f"{ws_date.month}/{ws_date.day} – {we.month}/{we.day}"
+        row2 += _merged_row(ws, _cell(ws, label, "ts_date"), 3)
+    ws.append(row2)
+    headers = ["No.", "Name"] + ["Attendance", "Overtime", "Total"] * (len(week_starts) + 1)
+    ws.append([_cell(ws, h, "ts_header") for h in headers])
+    current_row = 4
+    for shift_key in SHIFT_ORDER:
+        rows = rows_per_shift.get(shift_key, [])
+        if not rows:
+            continue
+        _merge(ws, current_row, 1, width)
+        ws.append(_merged_row(ws, _cell(ws, f"{shift_key.capitalize()} shift", "ts_header"), width))
+        current_row += 1
+        for idx, emp in enumerate(rows, 1):
+            row = [_cell(ws, idx, "ts_orange"), _cell(ws, emp["full_name"])]
+            for ws_date in week_starts:
+                att, ot, total = emp["weeks"].get(ws_date.isoformat(), (0, 0, 0))
+                row += [_cell(ws, round(att, 2)), _cell(ws, round(ot, 2)), _cell(ws, round(total, 2))]
+            row += [
+                _cell(ws, round(emp["attendance"], 2)),
+                _cell(ws, round(emp["overtime_total"], 2)),
+                _cell(ws, round(emp["total_hours"], 2)),
+            ]
+            ws.append(row)
+            current_row += 1
+    return ws
+
+
+# --- Reports ---
+
+def _write_report(wb, sheet_title, title, headers, rows):
+    ws = wb.create_sheet(sheet_title)
+    _merge(ws, 1, 1, len(headers))
+    ws.append(_merged_row(ws, _cell(ws, title, "ts_report_title"), len(headers)))
+    ws.append([_cell(ws, h, "ts_header") for h in headers])
+    for values in rows:
+        ws.append([_cell(ws, v) for v in values])
+    return ws
+
+
+def write_timeoff_sheet(wb, entries, from_d, to_d):
+    """Time-off report: No., Employee, Date, Day, Type per time-off day."""
+    def rows():
+        for idx, row in enumerate(entries, 1):
+            d = date.fromisoformat(row["work_date"])
+            yield [idx, row["full_name"], row["work_date"], DAY_NAMES[d.weekday()], row["notes"]]
+    return _write_report(wb, "Time Off", f"Time Off Report — {from_d} to {to_d}", ["No.", "Employee", "Date", "Day", "Type"], rows())
+
+
+def write_employees_sheet(wb, employees):
+    """Employee list: No., Full name, Username, Shift, Status, FA / MTF, Admin, Updated."""
+    def rows():
+        for idx, e in enumerate(employees, 1):
+            shift_val = (e.get("shift") or "").strip()
+            shift_display = shift_val.capitalize() if shift_val in ("day", "swing", "graveyard") else ("—" if not shift_val else shift_val)
+            status = "Contractor" if (e.get("employment_type") or "").strip().lower() == "contractor" else "Full time"
+            fa_mtf = (e.get("fa_mtf") or "").strip().upper() or "—"
+            updated = (e.get("updated_at") or "")[:10] if e.get("updated_at") else "—"
+            yield [idx, e.get("full_name") or "", e.get("username") or "—", shift_display, status, fa_mtf,
+                   "Yes" if e.get("is_admin") else "No", updated]
+    headers = ["No.", "Full name", "Username", "Shift", "Status", "FA / MTF", "Admin", "Updated"]
+    return _write_report(wb, "Employees", "Employees", headers, rows())
@@ -0,0 +1,270 @@
+"""
+Bulk import of badge / clock-system exports (CSV or XLSX) into time_entries.
+Rows are read one at a time (csv module, openpyxl read-only mode) and matched to employees by badge id, username or
+full name. Two layouts are accepted: one row per day (date, clock in, clock out, optional lunch start/end), or raw
+punches (timestamp, or date + time), which are paired per employee into shifts. Hours and shift for every imported
+day are computed in one vectorized pass (timesheet_batch) and written with database.import_time_entries.
+Rows that cannot be used are collected in a reject report instead of stopping the import.
+"""
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+
+import database as db
+import timesheet_logic as logic
+
+# Accepted header spellings per field, compared lower-case with '_' and '-' read as spaces.
+HEADER_ALIASES = {
+    "badge": ("badge", "badge id", "badge no", "badge number", "card", "card number", "employee id", "employee no", "emp id"),
+    "username": ("username", "user", "login"),
+    "name": ("name", "full name", "employee", "employee name"),
+    "date": ("date", "work date", "punch date"),
+    "time": ("time", "punch time"),
+    "timestamp": ("timestamp", "punch", "datetime", "date time", "punch datetime"),
+    "clock_in": ("clock in", "in", "time in"),
+    "clock_out": ("clock out", "out", "time out"),
+    "lunch_start": ("lunch start", "lunch out"),
+    "lunch_end": ("lunch end", "lunch in"),
+}
+# Punches alternate in/out. Off the clock longer than this after an out punch starts a new shift (lunch and breaks are shorter);
+# an in punch with no further punch within MAX_STRETCH_MINUTES is left without an out.
+SHIFT_GAP_MINUTES = 4 * 60
+MAX_STRETCH_MINUTES = 16 * 60
+REJECT_REPORT_HEADERS = ["Row", "Badge / employee", "Date", "Reason"]
+
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d-%b-%Y")
+_TIME_FORMATS = ("%I:%M %p", "%I:%M:%S %p", "%I:%M%p", "%H%M")
+
+
+def read_rows(fileobj, filename):
+    """Yield (row number, list of cell values) from a CSV or XLSX file, header row included. Does not load the whole file."""
+    if (filename or "").lower().endswith((".xlsx", ".xlsm")):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            for row_no, values in enumerate(wb.worksheets[0].iter_rows(values_only=True), 1):
+                yield row_no, list(values)
+        finally:
+            wb.close()
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+        for row_no, values in enumerate(csv.reader(text), 1):
+            yield row_no, values
+
+
+def _map_headers(header):
+    """{field: column index} for the header cells that match HEADER_ALIASES (first match wins)."""
+    columns = {}
+    for idx, cell in enumerate(header):
+        name = " ".join(str(cell or "").strip().lower().replace("_", " ").replace("-", " ").split())
+        for field, aliases in HEADER_ALIASES.items():
+            if name in aliases and field not in columns:
+                columns[field] = idx
+    return columns
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def _parse_time(value):
+    """'HH:MM' for a time cell (time/datetime, Excel day fraction, 'HH:MM[:SS]', 'h:mm AM'), else None. Seconds are dropped."""
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return f"{value.hour:02d}:{value.minute:02d}"
+    if isinstance(value, float) and 0 <= value < 1:
+        minutes = int(round(value * 24 * 60)) % (24 * 60)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    text = _text(value)
+    if not text:
+        return None
+    t = logic.parse_time(text)
+    if t is None:
+        for fmt in _TIME_FORMATS:
+            try:
+                t = datetime.strptime(text.upper(), fmt).time()
+                break
+            except ValueError:
+                pass
+    return f"{t.hour:02d}:{t.minute:02d}" if t else None
+
+
+def _parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value.replace(second=0, microsecond=0)
+    text = _text(value).replace("T", " ")
+    day_text, _, time_text = text.partition(" ")
+    d = _parse_date(day_text)
+    t = _parse_time(time_text.strip())
+    if d is None or t is None:
+        return None
+    return datetime.combine(d, time(int(t[:2]), int(t[3:])))
+
+
+def _employee_lookup(employees):
+    """Lookup tables: badge id, username (lower-case) and full name (lower-case) -> employee id."""
+    by_badge, by_username, by_name = {}, {}, {}
+    for e in employees:
+        if e.get("badge_id"):
+            by_badge[e["badge_id"].strip()] = e["id"]
+        by_username.setdefault((e.get("username") or "").strip().lower(), e["id"])
+        by_name.setdefault((e.get("full_name") or "").strip().lower(), e["id"])
+    return by_badge, by_username, by_name
+
+
+def _pair_punches(punches):
+    """
+    Split one employee's punches (sorted [(datetime, row number)]) into shifts and yield (row numbers, day values or reject reason).
+    Day values: (work_date, clock_in, clock_out, lunch_start, lunch_end); the work date is the date of the first punch.
+    A punch at the same time as the one before it (a double swipe) is left out of the shift and rejected on its own.
+    """
+    shifts = []
+    for punch in punches:
+        if shifts and punch[0] == shifts[-1][-1][0]:
+            yield [punch[1]], punch[0].date(), f"Duplicate punch (same time as row {shifts[-1][-1][1]})"
+            continue
+        gap_limit = MAX_STRETCH_MINUTES if shifts and len(shifts[-1]) % 2 else SHIFT_GAP_MINUTES
+        if not shifts or punch[0] - shifts[-1][-1][0] >= timedelta(minutes=gap_limit):
+            shifts.append([])
+        shifts[-1].append(punch)
+    for shift in shifts:
+        rows = [row_no for _, row_no in shift]
+        times = [ts.strftime("%H:%M") for ts, _ in shift]
+        if len(shift) == 1:
+            yield rows, shift[0][0].date(), "Single punch (missing clock in or clock out)"
+        elif len(shift) % 2:
+            yield rows, shift[0][0].date(), f"Odd number of punches ({len(shift)}) in one shift"
+        elif len(shift) > 4:
+            yield rows, shift[0][0].date(), f"More than 4 punches ({len(shift)}) in one shift"
+        elif shift[-1][0] - shift[0][0] >= timedelta(hours=24):
+            yield rows, shift[0][0].date(), "Shift longer than 24 hours"
+        else:
+            lunch = (times[1], times[2]) if len(shift) == 4 else (None, None)
+            yield rows, shift[0][0].date(), (times[0], times[-1]) + lunch
+
+
+def import_file(fileobj, filename, employees=None):
+    """
+    Import a badge export. Each employee day found replaces that day's time entry (clock times, hours, shift; notes cleared).
+    Returns {"layout": "days" | "punches", "rows": data rows read, "imported": days written, "rejects": [reject dicts]}.
+    Raises ValueError when the file has no usable header.
+    """
+    by_badge, by_username, by_name = _employee_lookup(db.list_employees() if employees is None else employees)
+    rows = read_rows(fileobj, filename)
+    header = next(rows, None)
+    columns = _map_headers(header[1]) if header else {}
+    if not {"badge", "username", "name"} & columns.keys():
+        raise ValueError("No badge, username or name column found in the header row.")
+    if {"date", "clock_in", "clock_out"} <= columns.keys():
+        layout = "days"
+    elif "timestamp" in columns or {"date", "time"} <= columns.keys():
+        layout = "punches"
+    else:
+        raise ValueError("Need Date + Clock in + Clock out columns, or Timestamp (or Date + Time) punch columns.")
+
+    def cell(values, field):
+        idx = columns.get(field)
+        return values[idx] if idx is not None and idx < len(values) else None
+
+    rejects = []
+
+    def reject(row_nos, who, work_date, reason):
+        rejects.append({"row": ", ".join(str(n) for n in row_nos), "employee": who,
+                        "date": work_date.isoformat() if work_date else "", "reason": reason})
+
+    days = {}  # (employee_id, work_date) -> (row numbers, clock_in, clock_out, lunch_start, lunch_end)
+    punches = {}  # employee_id -> [(datetime, row number)]
+    labels = {}  # employee_id -> identifier as written in the file, for the reject report
+    data_rows = 0
+    for row_no, values in rows:
+        if not any(_text(v) for v in values):
+            continue
+        data_rows += 1
+        badge, username, name = _text(cell(values, "badge")), _text(cell(values, "username")), _text(cell(values, "name"))
+        who = badge or username or name
+        employee_id = by_badge.get(badge) or by_username.get((username or badge).lower()) or by_name.get(name.lower())
+        if not employee_id:
+            reject([row_no], who, None, "Unknown badge / employee" if who else "No badge or employee given")
+            continue
+        labels.setdefault(employee_id, who)
+        if layout == "punches":
+            if "timestamp" in columns:
+                ts = _parse_timestamp(cell(values, "timestamp"))
+            else:
+                d, t = _parse_date(cell(values, "date")), _parse_time(cell(values, "time"))
+                ts = datetime.combine(d, time(int(t[:2]), int(t[3:]))) if d and t else None
+            if ts is None:
+                reject([row_no], who, None, "Invalid punch date/time")
+                continue
+            punches.setdefault(employee_id, []).append((ts, row_no))
+            continue
+        work_date = _parse_date(cell(values, "date"))
+        clock_in, clock_out = _parse_time(cell(values, "clock_in")), _parse_time(cell(values, "clock_out"))
+        lunch_start, lunch_end = _parse_time(cell(values, "lunch_start")), _parse_time(cell(values, "lunch_end"))
+        if work_date is None:
+            reject([row_no], who, None, "Invalid date")
+        elif not clock_in or not clock_out:
+            reject([row_no], who, work_date, "Missing or invalid clock in / clock out")
+        elif (employee_id, work_date) in days:
+            reject([row_no], who, work_date, f"Duplicate day (already imported from row {days[employee_id, work_date][0][0]})")
+        else:
+            days[employee_id, work_date] = ([row_no], clock_in, clock_out, lunch_start, lunch_end)
+
+    for employee_id, emp_punches in punches.items():
+        emp_punches.sort()
+        for row_nos, work_date, result in _pair_punches(emp_punches):
+            if isinstance(result, str):
+                reject(row_nos, labels[employee_id], work_date, result)
+            elif (employee_id, work_date) in days:
+                reject(row_nos, labels[employee_id], work_date, "Second shift on the same day (one time entry per day)")
+            else:
+                days[employee_id, work_date] = (row_nos,) + result
+
+    import timesheet_batch as batch  # numpy; loaded on the first import rather than at app startup
+
+    keys = list(days)
+    computed = batch.compute_days(
+        batch.to_minutes([days[k][1] for k in keys]),
+        batch.to_minutes([days[k][2] for k in keys]),
+        batch.to_minutes([days[k][3] for k in keys]),
+        batch.to_minutes([days[k][4] for k in keys]),
+    )
+    entries = []
+    for i, (employee_id, work_date) in enumerate(keys):
+        _, clock_in, clock_out, lunch_start, lunch_end = days[employee_id, work_date]
+        shift = computed["shift"][i]
+        # Same values as a manual save: the whole day goes in regular_hours; overtime is split weekly.
+        entries.append((employee_id, work_date, clock_in, clock_out, lunch_start, lunch_end,
+                        float(computed["total_hours"][i]), 0.0, 1 if shift == "graveyard" else 0, shift, None))
+    rejects.sort(key=lambda r: int(r["row"].split(",")[0]))
+    return {"layout": layout, "rows": data_rows, "imported": db.import_time_entries(entries) if entries else 0, "rejects": rejects}
+
+
+def reject_report_csv(rejects):
+    """Reject report as CSV text (Row, Badge / employee, Date, Reason)."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(REJECT_REPORT_HEADERS)
+    for r in rejects:
+        writer.writerow([r["row"], r["employee"], r["date"], r["reason"]])
+    return out.getvalue()
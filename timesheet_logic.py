@@ -34,20 +34,93 @@ def minutes_to_hours(minutes):
     return round(minutes / 60, 2)
 
 
-def _overlap_minutes(seg_lo, seg_hi, w_lo, w_hi):
-    """Minutes of segment [seg_lo, seg_hi] that fall in window [w_lo, w_hi]. All in 0..1440."""
-    return max(0, min(seg_hi, w_hi) - max(seg_lo, w_lo))
-
+class ShiftClassifier:
+    """
+    Classifies a clock-in/clock-out pair by which named shift window holds the most work minutes.
+    windows: list of (name, start_minute, end_minute) in tie-break order (first listed wins a tie).
+    A window whose end is at or before its start wraps past midnight (e.g. graveyard 22:00–06:00).
+    Built once: a per-minute prefix sum over a 48-hour timeline per window makes each overlap an O(1) lookup.
+    """
 
-def _minutes_in_window(in_min, out_min, w_start_min, w_end_min):
-    """Minutes of shift [in_min, out_min] that fall in same-day window [w_start_min, w_end_min]. Handles overnight (out_min > 1440)."""
-    total = 0
-    if out_min <= MINUTES_PER_DAY:
-        total += _overlap_minutes(in_min, out_min, w_start_min, w_end_min)
-    else:
-        total += _overlap_minutes(in_min, MINUTES_PER_DAY, w_start_min, w_end_min)
-        total += _overlap_minutes(0, out_min - MINUTES_PER_DAY, w_start_min, w_end_min)
-    return total
+    TIMELINE_MINUTES = 2 * MINUTES_PER_DAY
+
+    def __init__(self, windows):
+        self.names = [name for name, _, _ in windows]
+        self._inside = []
+        self.prefix = []  # prefix[i][t] = minutes of window i in [0, t) on the 48-hour timeline
+        for _, start, end in windows:
+            start %= MINUTES_PER_DAY
+            end = end % MINUTES_PER_DAY if end < MINUTES_PER_DAY else MINUTES_PER_DAY
+            if end > start:
+                in_day = [start <= m < end for m in range(MINUTES_PER_DAY)]
+            else:
+                in_day = [m >= start or m < end for m in range(MINUTES_PER_DAY)]
+            inside = in_day + in_day
+            prefix = [0]
+            for flag in inside:
+                prefix.append(prefix[-1] + flag)
+            self._inside.append(inside)
+            self.prefix.append(prefix)
+
+    @classmethod
+    def from_config(cls):
+        """Windows from shift_windows(): config.SHIFT_WINDOWS, or day, swing and graveyard with ties to graveyard, then swing."""
+        return cls(shift_windows())
+
+    def _minutes_before(self, i, t):
+        """Minutes of window i in [0, t) on the 48-hour timeline; t may be fractional (seconds)."""
+        whole = int(t)
+        covered = self.prefix[i][whole]
+        if t != whole:
+            covered += (t - whole) * self._inside[i][whole]
+        return covered
+
+    def minutes_in_windows(self, in_min, out_min):
+        """Work minutes in each window for a shift from in_min to out_min (minutes since midnight; overnight if out <= in)."""
+        if out_min <= in_min:
+            out_min += MINUTES_PER_DAY
+        return [self._minutes_before(i, out_min) - self._minutes_before(i, in_min) for i in range(len(self.names))]
+
+    def classify_minutes(self, in_min, out_min):
+        minutes = self.minutes_in_windows(in_min, out_min)
+        best = 0
+        for i in range(1, len(minutes)):
+            if minutes[i] > minutes[best]:
+                best = i
+        return self.names[best]
+
+    def classify(self, clock_in_str, clock_out_str):
+        """Shift name for 'HH:MM' clock in/out strings, or None if either is missing or invalid."""
+        clock_in = parse_time(clock_in_str)
+        clock_out = parse_time(clock_out_str)
+        if not clock_in or not clock_out:
+            return None
+        return self.classify_minutes(time_to_minutes(clock_in), time_to_minutes(clock_out))
+
+
+def shift_windows():
+    """[(name, start_minute, end_minute)] in tie-break order from config.SHIFT_WINDOWS, else the day/swing/graveyard settings."""
+    if config.SHIFT_WINDOWS:
+        return [(name, round(start * 60), round(end * 60)) for name, start, end in config.SHIFT_WINDOWS]
+    return [
+        ("graveyard", config.GRAVEYARD_START_HOUR * 60, config.GRAVEYARD_END_HOUR * 60),
+        ("swing", int(config.SWING_SHIFT_START_HOUR * 60), int(config.SWING_SHIFT_END_HOUR * 60)),
+        ("day", int(config.DAY_SHIFT_START_HOUR * 60), int(config.DAY_SHIFT_END_HOUR * 60)),
+    ]
+
+
+_classifier = None
+_classifier_config = None
+
+
+def get_shift_classifier():
+    """Shared ShiftClassifier for the current config; rebuilt only when the shift windows change."""
+    global _classifier, _classifier_config
+    key = tuple(shift_windows())
+    if _classifier is None or key != _classifier_config:
+        _classifier = ShiftClassifier(key)
+        _classifier_config = key
+    return _classifier
 
 
 def classify_shift(clock_in_str, clock_out_str):
@@ -56,30 +129,9 @@ def classify_shift(clock_in_str, clock_out_str):
     Day: DAY_SHIFT_START to DAY_SHIFT_END (e.g. 7:00–15:30).
     Swing: SWING_SHIFT_START to SWING_SHIFT_END (e.g. 15:00–23:45).
     Graveyard: GRAVEYARD_START to GRAVEYARD_END (22:00–06:00).
-    Returns "day", "swing", or "graveyard". Returns None if no clock in/out.
+    Returns "day", "swing", or "graveyard" (or a config.SHIFT_WINDOWS name when set). Returns None if no clock in/out.
     """
-    clock_in = parse_time(clock_in_str)
-    clock_out = parse_time(clock_out_str)
-    if not clock_in or not clock_out:
-        return None
-    in_min = time_to_minutes(clock_in)
-    out_min = time_to_minutes(clock_out)
-    if out_min <= in_min:
-        out_min += MINUTES_PER_DAY
-    day_start = int(config.DAY_SHIFT_START_HOUR * 60)
-    day_end = int(config.DAY_SHIFT_END_HOUR * 60)
-    swing_start = int(config.SWING_SHIFT_START_HOUR * 60)
-    swing_end = int(config.SWING_SHIFT_END_HOUR * 60)
-    grav_start = config.GRAVEYARD_START_HOUR * 60
-    grav_end = config.GRAVEYARD_END_HOUR * 60
-    day_min = _minutes_in_window(in_min, out_min, day_start, day_end)
-    swing_min = _minutes_in_window(in_min, out_min, swing_start, swing_end)
-    grav_min = _minutes_in_window(in_min, out_min, 0, grav_end) + _minutes_in_window(in_min, out_min, grav_start, MINUTES_PER_DAY)
-    if grav_min >= day_min and grav_min >= swing_min:
-        return "graveyard"
-    if swing_min >= day_min:
-        return "swing"
-    return "day"
+    return get_shift_classifier().classify(clock_in_str, clock_out_str)
 
 
 def is_graveyard_shift(clock_in_str, clock_out_str):
@@ -136,9 +188,10 @@ def compute_weekly_overtime(entries):
     entries: list of dicts for one employee, one week, sorted by work_date.
     Returns list of entries with regular_hours, overtime_hours, shift, is_graveyard set.
     Daily rule: working hours (after lunch deduction) over REGULAR_HOURS_PER_DAY = overtime for that day.
-    Shift = day/swing/graveyard from classify_shift (most work minutes in that window).
+    Shift = day/swing/graveyard (or a config.SHIFT_WINDOWS name) from classify_shift (most work minutes in that window).
     """
     cap = config.REGULAR_HOURS_PER_DAY
+    shift_names = get_shift_classifier().names
     result = []
     for e in entries:
         day_total = _day_total_hours(e)
@@ -147,7 +200,7 @@ def compute_weekly_overtime(entries):
             classified = classify_shift(e.get("clock_in"), e.get("clock_out"))
             if classified:
                 shift = classified
-        if shift not in ("day", "swing", "graveyard"):
+        if shift not in shift_names:
             shift = None
         regular = round(min(day_total, cap), 2)
         overtime = round(max(0, day_total - cap), 2)
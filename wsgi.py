@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers; every worker process runs create_app() (safe to do concurrently).
+  Linux:   gunicorn --workers 4 --threads 8 --bind 0.0.0.0:5050 wsgi:app
+  Windows: waitress-serve --threads 16 --port 5050 wsgi:app
+"""
+from app import create_app
+
+app = create_app()